@@ -5,7 +5,8 @@ This module defines the shared state structure that all agents use to communicat
 Based on the architecture document's Data Contract specification.
 """
 
-from typing import TypedDict, Dict, List, Optional
+import operator
+from typing import Annotated, TypedDict, Dict, List, Optional
 
 
 class AgentState(TypedDict):
@@ -16,6 +17,7 @@ class AgentState(TypedDict):
     # Input
     query: str                          # User's original question
     company_id: str                     # Target company ID (e.g., "2330")
+    resolution: Optional[Dict]          # How company_id was resolved (confidence, candidates)
     
     # Intermediate results from each agent
     basic_info: Optional[Dict]          # Company basic profile
@@ -26,6 +28,10 @@ class AgentState(TypedDict):
     
     # Quality control
     validation_status: Optional[bool]   # Whether passed quality check
+    validation: Optional[Dict]          # Checked statements with citations (from Evaluator)
     
     # Final output
     final_report: Optional[str]         # Final rendered Markdown report
+    
+    # Run trace
+    cache_hits: Annotated[List[str], operator.add]  # Nodes served from the node cache
@@ -12,6 +12,10 @@ from agent_state import AgentState
 from tools.mock_rag import query_earnings_calls, format_earnings_call_summary
 
 
+# Number of earnings calls summarized in the report
+EARNINGS_CALL_LIMIT = 2
+
+
 def earnings_call_analyst_node(state: AgentState) -> Dict:
     """
     Earnings Call Analyst Agent node function.
@@ -25,9 +29,10 @@ def earnings_call_analyst_node(state: AgentState) -> Dict:
         Updated state dict with earnings_call_summary
     """
     company_id = state.get("company_id", "2330")
+    query = state.get("query", "")
     
-    # Query earnings calls
-    calls = query_earnings_calls(company_id, limit=2)
+    # Query earnings calls, ranked by relevance to the user's question
+    calls = query_earnings_calls(company_id, limit=EARNINGS_CALL_LIMIT, query=query)
     
     if calls:
         summary = format_earnings_call_summary(calls)
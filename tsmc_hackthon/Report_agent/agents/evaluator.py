@@ -0,0 +1,462 @@
+"""
+Evaluation Agent
+
+Checks the final report against the data it was built from, using the
+LLM only for what rules cannot settle:
+
+1. The report is split into its template sections (tools.report_render)
+   and each section into statements: table rows, list items, sentences.
+   Statements without facts (numbers, dates, quarters, companies) are
+   not claims and are skipped.
+2. Each statement is checked against its section's evidence with
+   tools.fact_check. Each section has its own evidence, typed by unit
+   and metric where the source is structured: the financial store values
+   and changes for the financial table, peer statistics for the peer
+   comparison, the retrieved earnings calls and news articles, and the
+   supply chain graph entries.
+3. Only the statements the rules cannot support are sent to the LLM, in
+   one call with their sections' evidence. Statements still unsupported
+   are flagged at the end of the report with their closest sources.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+import json
+import math
+import os
+import re
+import sys
+import time
+sys.path.append(str(__file__).rsplit("\\", 2)[0])
+
+from agent_state import AgentState
+from agents.reporter import FINANCIAL_TABLE_QUARTERS, LATEST_CHANGE_KEYS
+from llm_config import invoke_llm, logger
+from tools.entity_resolver import get_entity_resolver
+from tools.fact_check import AMOUNT, DAYS, PERCENT, EvidenceIndex, extract_facts, find_metric, has_facts
+from tools.financial_store import MONEY, RATIO
+from tools.mock_bigquery import get_financial_store
+from tools.peer_stats import get_peer_stats
+from tools.report_render import DISCLAIMER, SECTIONS, SENTIMENT_EMOJI, TEMPLATE_LINES, pick
+
+
+# Send statements the rules cannot support to the LLM (EVALUATOR_LLM=0 to disable)
+LLM_ENABLED = os.getenv("EVALUATOR_LLM", "1") != "0"
+# At most this many statements, with this much evidence text, per LLM call
+LLM_MAX_STATEMENTS = 20
+LLM_MAX_EVIDENCE_CHARS = 12000
+
+# Flagged statements listed in the report
+MAX_FLAGS_SHOWN = 10
+
+_SECTION_NAMES = {key: heading.strip("● :") for key, heading, _, _, _ in SECTIONS}
+_NODE_FIELDS = ("id", "name", "country", "category", "role", "tags", "relationship_description")
+_RULE_LINE = re.compile(r"^\|?[\s|:\-]+\|?$")
+_SENTENCE_END = re.compile(r"(?<=[。！？；])|(?<=[.!?;])\s+")
+
+
+def split_sections(report: str) -> Dict[str, str]:
+    """
+    Bodies of the report's template sections.
+    
+    Args:
+        report: Markdown rendered by tools.report_render.render_markdown
+    
+    Returns:
+        Section key (see SECTIONS) -> body, without the placeholder line.
+    """
+    starts = []
+    for key, heading, level, placeholder, _ in SECTIONS:
+        marker = f"\n{'#' * level} {heading}\n"
+        position = report.find(marker)
+        if position >= 0:
+            starts.append((position, position + len(marker), key))
+    starts.sort()
+    end_of_report = report.find(DISCLAIMER)
+    if end_of_report < 0:
+        end_of_report = len(report)
+    
+    sections = {}
+    for i, (_, body_start, key) in enumerate(starts):
+        body_end = starts[i + 1][0] if i + 1 < len(starts) else end_of_report
+        sections[key] = report[body_start:body_end]
+    return sections
+
+
+def iter_statements(body: str) -> Iterator[str]:
+    """Table rows, list items and sentences of a section body."""
+    for line in body.splitlines():
+        line = line.strip()
+        if not line or line in TEMPLATE_LINES or _RULE_LINE.match(line):
+            continue
+        if line.startswith("|"):
+            yield line
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip()
+            if sentence:
+                yield sentence
+
+
+def _json_text(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _store_units(store, metric: str) -> Tuple[Optional[str], Optional[str]]:
+    """Fact units of a store metric's values and of its QoQ/YoY changes."""
+    kind = store.kinds.get(metric)
+    if kind == MONEY:
+        return AMOUNT, PERCENT
+    if kind == RATIO:
+        return PERCENT, PERCENT
+    unit = DAYS if store.units.get(metric) == "days" else None
+    return unit, unit
+
+
+def _change_facts(change, metric: Optional[str]) -> List[Dict]:
+    """Typed facts of a preformatted change such as "38.8%" or "+5.8 ppts"."""
+    return [
+        {"value": number.value, "unit": number.unit, "metric": metric}
+        for number in extract_facts(str(change))["numbers"]
+    ]
+
+
+def financial_evidence(company_id: str, finance_data: Dict) -> List[Dict]:
+    """
+    What the financial table is built from, as typed facts.
+    
+    The store's quarterly values and QoQ/YoY changes; a precomputed change
+    from the company record only where the store has none (the reporter's
+    fallback); and the financial agent's latest-quarter data only when the
+    company is not in the store (the basic table).
+    """
+    items = []
+    try:
+        store = get_financial_store()
+        record = store.get(company_id) or {}
+        table = store.company_table(company_id, FINANCIAL_TABLE_QUARTERS)
+        quarters = store.quarter_window(company_id, n=FINANCIAL_TABLE_QUARTERS)
+    except Exception as e:
+        logger.error(f"Failed to load financial store: {e}")
+        store, record, table, quarters = None, {}, None, []
+    if table is not None:
+        quarters = table["quarters"]
+        latest_changes = record.get("latest_changes", {})
+        for metric, values in table["values"].items():
+            value_unit, change_unit = _store_units(store, metric)
+            fact_metric = find_metric(metric.replace("_", " "))
+            facts = [{"value": value, "unit": value_unit, "metric": fact_metric} for value in values]
+            for period in ("qoq", "yoy"):
+                change = table[period][metric]
+                if math.isnan(change):
+                    key = f"{LATEST_CHANGE_KEYS.get(metric, metric)}_{period}"
+                    facts += _change_facts(latest_changes.get(key, ""), fact_metric)
+                else:
+                    facts.append({"value": change, "unit": change_unit, "metric": fact_metric})
+            items.append({
+                "source": f"financial store: {company_id} {metric} {quarters[0]}–{quarters[-1]}",
+                "text": " ".join(quarters),
+                "facts": facts,
+                "companies": [company_id],
+            })
+    elif finance_data:
+        revenue = finance_data.get("revenue") or {}
+        gross_margin = finance_data.get("gross_margin") or {}
+        facts = _change_facts(revenue.get("yoy_growth", ""), "revenue")
+        facts += _change_facts(gross_margin.get("qoq_change", ""), "gross_margin")
+        if isinstance(gross_margin.get("value"), (int, float)):
+            facts.append({"value": gross_margin["value"], "unit": PERCENT, "metric": "gross_margin"})
+        if isinstance(revenue.get("value"), (int, float)):
+            unit = revenue.get("unit", "USD")
+            value = store.to_usd(revenue["value"], unit) if store is not None else revenue["value"]
+            facts.append({"value": value, "unit": AMOUNT, "metric": "revenue"})
+        items.append({
+            "source": f"financial data: {company_id}",
+            "text": " ".join(quarters),
+            "facts": facts,
+            "companies": [company_id],
+        })
+    return items
+
+
+def peer_evidence(company_id: str) -> List[Dict]:
+    """The company's peer group statistics, typed by metric and unit."""
+    try:
+        peers = get_peer_stats().company(company_id)
+    except Exception as e:
+        logger.error(f"Failed to load peer statistics: {e}")
+        peers = None
+    if peers is None:
+        return []
+    facts = []
+    for entry in peers["metrics"].values():
+        metric = find_metric(entry["label"])
+        unit = {"%": PERCENT, "days": DAYS}.get(entry["unit"])
+        facts.extend(
+            {"value": value, "unit": unit, "metric": metric}
+            for value in (entry["value"], entry["median"]) if not math.isnan(value)
+        )
+        if not math.isnan(entry["percentile"]):
+            facts.append({"value": entry["percentile"], "unit": PERCENT, "metric": metric})
+    return [{
+        "source": f"peer statistics: {peers['category']}",
+        "text": f"{peers['category']}: {', '.join(peers['peers'])}",
+        "facts": facts,
+        "numbers": [len(peers["peers"])],
+        "companies": [company_id],
+    }]
+
+
+def document_evidence(summary: str, kind: str) -> List[Dict]:
+    """
+    One evidence item per retrieved document of an agent's summary.
+    
+    Args:
+        summary: Earnings call or news summary (documents start with a
+            "### " heading, see tools.report_render)
+        kind: Prefix of the citations, e.g. "News"
+    
+    Returns:
+        List of evidence items, cited by document heading.
+    """
+    items = []
+    blocks = re.split(r"^(?=### )", summary or "", flags=re.MULTILINE)
+    for block in blocks:
+        if not block.strip():
+            continue
+        first_line = block.strip().splitlines()[0]
+        title = first_line.lstrip("#").strip()
+        for emoji in SENTIMENT_EMOJI.values():
+            title = title.removeprefix(emoji).strip()
+        items.append({"source": f"{kind}: {title}", "text": block})
+    return items
+
+
+def graph_evidence(company_id: str, basic_info: Dict, sc_analysis: Dict) -> List[Dict]:
+    """Supply chain graph entries of the company, its related companies and risk paths."""
+    groups = ("customers", "suppliers", "partners", "competitors")
+    items = [{
+        "source": f"supply chain graph: {basic_info.get('name', company_id)}",
+        "text": _json_text(pick(basic_info, _NODE_FIELDS)),
+        "numbers": [len(sc_analysis.get(group) or []) for group in groups],
+        "companies": [company_id],
+    }]
+    for group in groups:
+        for node in sc_analysis.get(group) or []:
+            fields = pick(node, _NODE_FIELDS)
+            items.append({
+                "source": f"supply chain graph: {fields.get('name', 'Unknown')} ({group})",
+                "text": _json_text(fields),
+                "companies": [fields["id"]] if "id" in fields else [],
+            })
+    risk = sc_analysis.get("risk_transmission") or {}
+    for direction in ("upstream", "downstream"):
+        for exposure in risk.get(direction, []):
+            path = " → ".join(exposure.get("path", []))
+            items.append({
+                "source": f"supply chain graph: {path}",
+                "text": path,
+                "numbers": [exposure.get("tier", 0), exposure.get("risk_score", 0)],
+                "companies": [exposure["id"]] if "id" in exposure else [],
+            })
+    return items
+
+
+def build_evidence(state: AgentState) -> Dict[str, List[Dict]]:
+    """Section key -> evidence items the section is checked against."""
+    company_id = state.get("company_id", "")
+    finance_data = (state.get("finance_results") or {}).get("raw_data") or {}
+    return {
+        "financial_status": financial_evidence(company_id, finance_data),
+        "peer_comparison": peer_evidence(company_id),
+        "earnings_call": document_evidence(state.get("earnings_call_summary") or "", "Earnings call"),
+        "news": document_evidence(state.get("news_summary") or "", "News"),
+        "supply_chain": graph_evidence(
+            company_id, state.get("basic_info") or {}, state.get("supply_chain_analysis") or {}
+        ),
+    }
+
+
+def check_report(report: str, evidence: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    Rule-based check of every statement in the report.
+    
+    Args:
+        report: Final Markdown report
+        evidence: build_evidence() output
+    
+    Returns:
+        List of {'section', 'text', 'supported', 'method', 'missing',
+        'citations'} for statements with facts, in report order.
+    """
+    resolver = get_entity_resolver()
+    results = []
+    for key, body in split_sections(report).items():
+        index = EvidenceIndex(evidence.get(key, []), resolver)
+        for statement in iter_statements(body):
+            facts = extract_facts(statement, resolver)
+            if not has_facts(facts):
+                continue
+            check = index.check(facts)
+            results.append({
+                "section": key,
+                "text": statement,
+                "supported": check["supported"],
+                "method": "rules" if check["supported"] else None,
+                "missing": check["missing"],
+                "citations": check["citations"],
+            })
+    return results
+
+
+def _evidence_text(items: List[Dict], limit: int) -> str:
+    """Evidence items as prompt text, cut at limit characters."""
+    parts = []
+    size = 0
+    for item in items:
+        text = f"[{item['source']}]\n{item.get('text', '')}"
+        values = [
+            " ".join(str(part) for part in (fact.get("metric"), f"{fact['value']:g}", fact.get("unit")) if part)
+            for fact in item.get("facts", ())
+        ] + [f"{value:g}" for value in item.get("numbers", ())]
+        if values:
+            text += f"\nvalues: {', '.join(values)}"
+        if size + len(text) > limit:
+            break
+        parts.append(text)
+        size += len(text)
+    return "\n\n".join(parts)
+
+
+def verify_with_llm(statements: List[Dict], evidence: Dict[str, List[Dict]]) -> int:
+    """
+    Ask the LLM about statements the rules could not support.
+    
+    Statements the LLM finds supported are updated in place (method
+    "llm", citation from the answer). LLM errors leave them unsupported.
+    
+    Args:
+        statements: Unsupported check_report() entries
+        evidence: build_evidence() output
+    
+    Returns:
+        Number of statements sent to the LLM.
+    """
+    batch = statements[:LLM_MAX_STATEMENTS]
+    if not batch:
+        return 0
+    
+    sections = list(dict.fromkeys(s["section"] for s in batch))
+    per_section = LLM_MAX_EVIDENCE_CHARS // len(sections)
+    evidence_text = "\n\n".join(
+        f"## {_SECTION_NAMES[key]}\n\n{_evidence_text(evidence.get(key, []), per_section)}" for key in sections
+    )
+    numbered = "\n".join(f"{i}. ({_SECTION_NAMES[s['section']]}) {s['text']}" for i, s in enumerate(batch, start=1))
+    
+    system_prompt = """你是嚴謹的財報查核員，只根據提供的資料判斷陳述是否有依據。
+單位換算（例如億美元與 USD B）與四捨五入視為相符；資料中沒有的數字或事實視為無依據。
+只輸出 JSON 陣列，不要其他文字。"""
+    user_prompt = f"""資料：
+
+{evidence_text}
+
+待查核陳述：
+
+{numbered}
+
+請對每一則陳述輸出 {{"id": 編號, "supported": true/false, "source": "依據的資料標題（方括號內文字）"}}。"""
+
+    try:
+        answer = invoke_llm(system_prompt, user_prompt, temperature=0.0)
+        verdicts = json.loads(answer[answer.index("["):answer.rindex("]") + 1])
+    except Exception as e:
+        logger.error(f"LLM verification failed, statements stay unverified: {e}")
+        return len(batch)
+    
+    for verdict in verdicts:
+        if not isinstance(verdict, dict) or not verdict.get("supported"):
+            continue
+        try:
+            statement = batch[int(verdict.get("id")) - 1]
+        except (TypeError, ValueError, IndexError):
+            continue
+        statement["supported"] = True
+        statement["method"] = "llm"
+        if verdict.get("source"):
+            statement["citations"] = [str(verdict["source"])]
+    return len(batch)
+
+
+def format_flags(flagged: List[Dict]) -> str:
+    """Report section listing unsupported statements and their closest sources."""
+    lines = [
+        "### ⚠️ Unverified Statements:",
+        "",
+        "*The statements below could not be matched to the financial store or the retrieved documents.*",
+        "",
+    ]
+    for statement in flagged[:MAX_FLAGS_SHOWN]:
+        line = f"- **{_SECTION_NAMES[statement['section']]}:** {statement['text']} — not found: {', '.join(statement['missing'])}"
+        if statement["citations"]:
+            line += f"; closest source: {'; '.join(statement['citations'][:2])}"
+        lines.append(line)
+    if len(flagged) > MAX_FLAGS_SHOWN:
+        lines.append(f"- ... and {len(flagged) - MAX_FLAGS_SHOWN} more")
+    return "\n".join(lines) + "\n"
+
+
+def _insert_before_footer(report: str, section: str) -> str:
+    """Insert a section before the report's closing rule and disclaimer."""
+    position = report.rfind("\n---\n", 0, max(report.find(DISCLAIMER), 0))
+    if position < 0:
+        return report.rstrip("\n") + "\n\n---\n\n" + section
+    return f"{report[:position]}\n---\n\n{section}{report[position:]}"
+
+
+def evaluator_node(state: AgentState) -> Dict:
+    """
+    Evaluation Agent node function.
+    
+    Checks the report's statements against the source data, flags those
+    without support in the report and sets validation_status.
+    
+    Args:
+        state: Current agent state
+    
+    Returns:
+        Updated state dict with final_report, validation_status and
+        validation (checked statements with their citations)
+    """
+    report = state.get("final_report") or ""
+    if not report or report.startswith("Error"):
+        return {"validation_status": False, "validation": None}
+    
+    start = time.perf_counter()
+    evidence = build_evidence(state)
+    statements = check_report(report, evidence)
+    unsupported = [s for s in statements if not s["supported"]]
+    rules_seconds = time.perf_counter() - start
+    
+    llm_checked = verify_with_llm(unsupported, evidence) if LLM_ENABLED else 0
+    flagged = [s for s in statements if not s["supported"]]
+    
+    validation = {
+        "checked": len(statements),
+        "supported_by_rules": len(statements) - len(unsupported),
+        "llm_checked": llm_checked,
+        "flagged": len(flagged),
+        "rules_seconds": round(rules_seconds, 4),
+        "statements": statements,
+    }
+    logger.info(
+        f"Evaluation: {len(statements) - len(flagged)}/{len(statements)} statements supported "
+        f"({validation['supported_by_rules']} by rules in {rules_seconds * 1000:.1f} ms, "
+        f"{llm_checked} sent to the LLM)"
+    )
+    
+    if flagged:
+        report = _insert_before_footer(report, format_flags(flagged))
+    return {
+        "final_report": report,
+        "validation_status": not flagged,
+        "validation": validation
+    }
@@ -9,14 +9,20 @@ import sys
 sys.path.append(str(__file__).rsplit("\\", 2)[0])
 
 from agent_state import AgentState
-from tools.mock_rag import query_news, format_news_summary
+from tools.mock_rag import query_recent_news, format_news_summary
+
+
+# Report template: latest key news within 30 days, around 20 articles
+NEWS_WINDOW_DAYS = 30
+NEWS_LIMIT = 20
 
 
 def news_agent_node(state: AgentState) -> Dict:
     """
     News Agent node function.
     
-    Queries recent news and formats it into a summary.
+    Queries the latest news (30-day window, up to 20 articles) and formats
+    it into a summary.
     
     Args:
         state: Current agent state
@@ -25,9 +31,11 @@ def news_agent_node(state: AgentState) -> Dict:
         Updated state dict with news_summary
     """
     company_id = state.get("company_id", "2330")
+    query = state.get("query", "")
     
-    # Query news
-    articles = query_news(company_id, limit=5)
+    # Query news: latest articles within 30 days, newest first; when the
+    # window holds more, keep those most relevant to the user's question
+    articles = query_recent_news(company_id, days=NEWS_WINDOW_DAYS, limit=NEWS_LIMIT, query=query)
     
     if articles:
         summary = format_news_summary(articles)
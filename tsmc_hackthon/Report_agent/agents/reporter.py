@@ -4,112 +4,101 @@ Reporter Agent - AI Supply Chain Analysis Report Template
 Generates standardized reports following the TSMC Hackathon template format.
 """
 
-from typing import Dict
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime
-import json
+import math
 import sys
-import os
 sys.path.append(str(__file__).rsplit("\\", 2)[0])
 
 from agent_state import AgentState
 from llm_config import invoke_llm, get_system_prompt, format_llm_prompt, logger
+from tools.mock_bigquery import get_financial_store, query_extended_financial_data
+from tools.peer_stats import get_peer_stats
+from tools.report_render import format_supply_chain_analysis, render_json, render_markdown, report_model, table
+from tools.section_cache import ENABLED as SECTION_CACHE_ENABLED, SectionCache, section_key
+
+
+# Financial table rows: (metric, label, divisor, number format)
+FINANCIAL_TABLE_ROWS = [
+    ("revenue", "Revenue (USD B)", 1_000_000_000, ".2f"),
+    ("gross_margin", "Gross Margin (%)", 1, ".2f"),
+    ("doi_days", "DOI (days)", 1, ".1f"),
+]
+FINANCIAL_TABLE_QUARTERS = 5
+
+# Peer companies listed by name in the peer comparison section
+PEER_NAMES_SHOWN = 8
+PEER_TABLE_HEADERS = ("Metric", "Company", "Peer Median", "Percentile in Peer Group")
+
+# Bump when a section's rendering changes, so cached sections are redone
+SECTION_VERSION = 2
+_section_cache = SectionCache()
+
+# Precomputed strings in financials_extended.json, used only when the
+# history is too short to compute a change
+LATEST_CHANGE_KEYS = {"revenue": "revenue", "gross_margin": "gross_margin", "doi_days": "doi"}
 
 
 def load_extended_financial_data(company_id: str) -> Dict:
     """Load extended financial data with quarterly history."""
     try:
-        data_path = os.path.join(
-            os.path.dirname(__file__), 
-            "..", 
-            "data", 
-            "financials_extended.json"
-        )
-        with open(data_path, 'r', encoding='utf-8') as f:
-            all_data = json.load(f)
-        return all_data.get(company_id, {})
+        return query_extended_financial_data(company_id)
     except Exception as e:
         logger.error(f"Failed to load extended financial data: {e}")
         return {}
 
 
+def _financial_table_header(quarters: list) -> str:
+    """Markdown header rows for the financial table."""
+    return (
+        f"| Company Financial Indices | Calendar YQ {'|' * len(quarters)} Latest || \n"
+        f"|---------------------------|{'---------|' * len(quarters)}-----|-----|\n"
+        f"|                           | {' | '.join(quarters)} | QoQ | YoY |\n"
+    )
+
+
 def format_financial_table(company_id: str, finance_data: Dict) -> str:
     """
     Format financial data into the standardized table format.
     
     Generates a table with:
-    - Calendar YQ: 2024Q3, 2024Q4, 2025Q1, 2025Q2, 2025Q3
+    - Calendar YQ: the last 5 quarters up to the company's latest report
     - Latest: QoQ, YoY
     - Three metrics: Revenue (USD), Gross Margin (%), DOI (days)
+    
+    Values and changes come from the columnar FinancialStore, which
+    computes the table for all covered companies in one array operation.
     """
-    # Try to load extended data first
-    extended_data = load_extended_financial_data(company_id)
+    try:
+        store = get_financial_store()
+        table = store.company_table(company_id, FINANCIAL_TABLE_QUARTERS)
+    except Exception as e:
+        logger.error(f"Failed to load financial store: {e}")
+        table = None
     
-    if not extended_data or "quarterly_data" not in extended_data:
+    if table is None:
         # Fallback to basic data
         return format_basic_financial_table(finance_data)
     
-    company_name = extended_data.get("company_name", "Unknown")
-    currency = extended_data.get("currency", "USD")
-    quarterly_data = extended_data.get("quarterly_data", {})
-    latest_changes = extended_data.get("latest_changes", {})
-    latest_quarter = extended_data.get("latest_quarter", {})
-    
-    # Define quarter order
-    quarters = ["2024Q3", "2024Q4", "2025Q1", "2025Q2", "2025Q3"]
-    
-    # Helper function to convert currency
-    def convert_to_usd_billions(value, unit):
-        if unit == "TWD":
-            return value / 31_000_000_000  # TWD to USD billions
-        else:
-            return value / 1_000_000_000  # Already USD, convert to billions
-    
-    # Build revenue row
-    revenue_row = [company_name, "Revenue (USD B)"]
-    for q in quarters:
-        if q in quarterly_data:
-            rev = quarterly_data[q].get("revenue", {})
-            value = convert_to_usd_billions(rev.get("value", 0), rev.get("unit", currency))
-            revenue_row.append(f"{value:.2f}")
-        else:
-            revenue_row.append("-")
-    revenue_row.append(latest_changes.get("revenue_qoq", "X"))
-    revenue_row.append(latest_changes.get("revenue_yoy", "X"))
-    
-    # Build gross margin row
-    gm_row = ["", "Gross Margin (%)"]
-    for q in quarters:
-        if q in quarterly_data:
-            gm = quarterly_data[q].get("gross_margin", {})
-            value = gm.get("value", 0)
-            gm_row.append(f"{value:.2f}")
-        else:
-            gm_row.append("-")
-    gm_row.append(latest_changes.get("gross_margin_qoq", "X"))
-    gm_row.append(latest_changes.get("gross_margin_yoy", "X"))
-    
-    # Build DOI row
-    doi_row = ["", "DOI (days)"]
-    for q in quarters:
-        if q in quarterly_data:
-            doi = quarterly_data[q].get("doi_days", {})
-            value = doi.get("value", 0)
-            doi_row.append(f"{value:.1f}")
-        else:
-            doi_row.append("-")
-    doi_row.append(latest_changes.get("doi_qoq", "X"))
-    doi_row.append(latest_changes.get("doi_yoy", "X"))
-    
-    # Format as markdown table
-    table = f"""| Company Financial Indices | Calendar YQ ||||| Latest || 
-|---------------------------|---------|---------|---------|---------|---------|-----|-----|
-|                           | 2024Q3  | 2024Q4  | 2025Q1  | 2025Q2  | 2025Q3  | QoQ | YoY |
-| {revenue_row[0]} - {revenue_row[1]} | {revenue_row[2]} | {revenue_row[3]} | {revenue_row[4]} | {revenue_row[5]} | {revenue_row[6]} | {revenue_row[7]} | {revenue_row[8]} |
-| {gm_row[1]} | {gm_row[2]} | {gm_row[3]} | {gm_row[4]} | {gm_row[5]} | {gm_row[6]} | {gm_row[7]} | {gm_row[8]} |
-| {doi_row[1]} | {doi_row[2]} | {doi_row[3]} | {doi_row[4]} | {doi_row[5]} | {doi_row[6]} | {doi_row[7]} | {doi_row[8]} |
-"""
+    record = store.get(company_id)
+    company_name = record.get("company_name", "Unknown")
+    latest_changes = record.get("latest_changes", {})
     
-    return table
+    lines = []
+    for row, (metric, label, divisor, number_format) in enumerate(FINANCIAL_TABLE_ROWS):
+        cells = [
+            "-" if math.isnan(value) else format(value / divisor, number_format)
+            for value in table["values"].get(metric, [math.nan] * len(table["quarters"]))
+        ]
+        for period, changes in (("qoq", table["qoq"]), ("yoy", table["yoy"])):
+            change = store.format_change(metric, changes.get(metric, math.nan))
+            if change is None:
+                change = latest_changes.get(f"{LATEST_CHANGE_KEYS.get(metric, metric)}_{period}", "X")
+            cells.append(change)
+        name = f"{company_name} - {label}" if row == 0 else label
+        lines.append(f"| {name} | {' | '.join(cells)} |")
+    
+    return _financial_table_header(table["quarters"]) + "\n".join(lines) + "\n"
 
 
 def format_basic_financial_table(finance_data: Dict) -> str:
@@ -121,31 +110,62 @@ def format_basic_financial_table(finance_data: Dict) -> str:
     revenue = finance_data.get("revenue", {})
     gm = finance_data.get("gross_margin", {})
     
-    # Convert revenue
-    currency = revenue.get("unit", "USD")
-    rev_value = revenue.get("value", 0)
-    if currency == "TWD":
-        rev_usd = rev_value / 31_000_000_000
-    else:
-        rev_usd = rev_value / 1_000_000_000
-    
-    table = f"""| Company Financial Indices | Calendar YQ ||||| Latest || 
-|---------------------------|---------|---------|---------|---------|---------|-----|-----|
-|                           | 2024Q3  | 2024Q4  | 2025Q1  | 2025Q2  | 2025Q3  | QoQ | YoY |
-| {company_name} - Revenue (USD B) | - | - | - | - | {rev_usd:.2f} | - | {revenue.get('yoy_growth', 'N/A')} |
-| Gross Margin (%) | - | - | - | - | {gm.get('value', 'N/A')} | {gm.get('qoq_change', 'N/A')} | - |
-| DOI (days) | - | - | - | - | - | X | X |
+    # Convert revenue with the store's FX rate table
+    try:
+        store = get_financial_store()
+        quarters = store.quarter_window(n=FINANCIAL_TABLE_QUARTERS)
+        rev_usd = store.to_usd(revenue.get("value", 0), revenue.get("unit", "USD")) / 1_000_000_000
+    except Exception as e:
+        logger.error(f"Failed to load financial store: {e}")
+        quarters = ["-"] * FINANCIAL_TABLE_QUARTERS
+        rev_usd = revenue.get("value", 0) / 1_000_000_000
+    
+    empty = " | ".join(["-"] * (len(quarters) - 1))
+    table = _financial_table_header(quarters) + f"""| {company_name} - Revenue (USD B) | {empty} | {rev_usd:.2f} | - | {revenue.get('yoy_growth', 'N/A')} |
+| Gross Margin (%) | {empty} | {gm.get('value', 'N/A')} | {gm.get('qoq_change', 'N/A')} | - |
+| DOI (days) | {empty} | - | X | X |
 
 *Note: Historical quarterly data not available. Only latest quarter shown.*
 """
     return table
 
 
-def extract_earnings_key_points(earnings_summary: str) -> str:
+def format_peer_comparison(company_id: str) -> str:
+    """
+    Format the company's standing within its graph category.
+    
+    Reads the precomputed peer table (tools.peer_stats); no LLM call.
+    Percentiles read "better than X% of peers", so a lower DOI ranks
+    higher.
+    """
+    try:
+        peers = get_peer_stats().company(company_id)
+    except Exception as e:
+        logger.error(f"Failed to load peer statistics: {e}")
+        peers = None
+    
+    if peers is None or len(peers["peers"]) < 2:
+        return "*No peer group available for this company.*\n"
+    
+    names = ", ".join(peers["peers"][:PEER_NAMES_SHOWN]) + (", ..." if len(peers["peers"]) > PEER_NAMES_SHOWN else "")
+    rows = []
+    for entry in peers["metrics"].values():
+        unit = f" {entry['unit']}" if entry["unit"] not in ("", "%") else entry["unit"]
+        value = "-" if math.isnan(entry["value"]) else f"{entry['value']:.1f}{unit}"
+        median = "-" if math.isnan(entry["median"]) else f"{entry['median']:.1f}{unit}"
+        percentile = "-" if math.isnan(entry["percentile"]) else f"{entry['percentile']:.0f}%"
+        rows.append((entry["label"], value, median, percentile))
+    group = f"**Peer group:** {peers['category']} ({len(peers['peers'])} companies: {names})\n\n"
+    return group + table(PEER_TABLE_HEADERS, rows)
+
+
+def extract_earnings_key_points(earnings_summary: str, raise_errors: bool = False) -> str:
     """
     Extract or format earnings call summary to 5 key points.
     
     Uses LLM to distill the summary into exactly 5 concise bullet points.
+    On LLM failure the summary is returned as is, or the error is
+    re-raised if raise_errors is set.
     """
     if not earnings_summary or earnings_summary == "無法說會數據":
         return "*No earnings call data available.*\n"
@@ -164,15 +184,19 @@ def extract_earnings_key_points(earnings_summary: str) -> str:
         key_points = invoke_llm(system_prompt, user_prompt, temperature=0.2)
         return key_points
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Failed to extract key points: {e}")
         return earnings_summary
 
 
-def extract_news_highlights(news_summary: str) -> str:
+def extract_news_highlights(news_summary: str, raise_errors: bool = False) -> str:
     """
     Extract news highlights (around 20 news items within 30 days).
     
     Uses LLM to format news into concise bullet points.
+    On LLM failure the summary is returned as is, or the error is
+    re-raised if raise_errors is set.
     """
     if not news_summary or news_summary == "無新聞數據":
         return "*No recent news available.*\n"
@@ -191,115 +215,79 @@ def extract_news_highlights(news_summary: str) -> str:
         formatted_news = invoke_llm(system_prompt, user_prompt, temperature=0.1)
         return formatted_news
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Failed to format news: {e}")
         return news_summary
 
 
-def format_supply_chain_analysis(sc_analysis: Dict) -> str:
+def render_section(
+    name: str,
+    inputs: Any,
+    render: Callable[[], str],
+    reused: List[str],
+    fallback: Optional[Callable[[], str]] = None
+) -> str:
     """
-    Format supply chain analysis into three sections:
-    1. Summary of target company status
-    2. Vertical analysis (upstream suppliers, downstream customers)
-    3. Horizontal analysis (competitors, partners)
+    Render a report section, or reuse it from the section cache.
+    
+    Args:
+        name: Section name (listed in `reused` on a cache hit)
+        inputs: Everything the section is built from; the cache key is a
+            hash of these and SECTION_VERSION
+        render: Builds the section text
+        reused: List the names of reused sections are appended to
+        fallback: Builds the text if render fails; fallback text is not
+            cached, so the section is retried next time
+    
+    Returns:
+        The section text.
     """
-    summary = sc_analysis.get("summary", "")
-    
-    # Section 1: Summary
-    section1 = f"**<1. Summary target company status>**\n\n{summary if summary else '*No summary available.*'}\n"
-    
-    # Section 2: Vertical analysis
-    section2 = "\n**<2. Supply chain analysis - vertical>**\n\n"
-    section2 += "*Analysis of upstream suppliers and downstream customers in the value chain.*\n\n"
-    
-    customers = sc_analysis.get("customers", [])
-    suppliers = sc_analysis.get("suppliers", [])
-    
-    if customers:
-        section2 += "**Key Customers (Downstream):**\n\n"
-        for customer in customers[:8]:  # Top 8
-            if isinstance(customer, dict):
-                name = customer.get('name', 'Unknown')
-                country = customer.get('country', '')
-                category = customer.get('category', '')
-                desc = customer.get('relationship_description', '')
-                tags = ', '.join(customer.get('tags', []))
-                section2 += f"- **{name}** ({country}, {category})\n"
-                if tags:
-                    section2 += f"  - *Tags:* {tags}\n"
-                if desc:
-                    section2 += f"  - {desc}\n"
-            else:
-                section2 += f"- {customer}\n"
-        section2 += "\n"
-    
-    if suppliers:
-        section2 += "**Key Suppliers (Upstream):**\n\n"
-        for supplier in suppliers[:8]:  # Top 8
-            if isinstance(supplier, dict):
-                name = supplier.get('name', 'Unknown')
-                country = supplier.get('country', '')
-                category = supplier.get('category', '')
-                desc = supplier.get('relationship_description', '')
-                tags = ', '.join(supplier.get('tags', []))
-                section2 += f"- **{name}** ({country}, {category})\n"
-                if tags:
-                    section2 += f"  - *Tags:* {tags}\n"
-                if desc:
-                    section2 += f"  - {desc}\n"
-            else:
-                section2 += f"- {supplier}\n"
-        section2 += "\n"
-    
-    if not customers and not suppliers:
-        section2 += "*No vertical supply chain data available.*\n\n"
-    
-    # Section 3: Horizontal analysis
-    section3 = "**<3. Supply chain analysis - horizontal>**\n\n"
-    section3 += "*Analysis of competitors and partners in the same industry segment.*\n\n"
-    
-    competitors = sc_analysis.get("competitors", [])
-    partners = sc_analysis.get("partners", [])
-    
-    if competitors:
-        section3 += "**Main Competitors:**\n\n"
-        for competitor in competitors[:6]:  # Top 6
-            if isinstance(competitor, dict):
-                name = competitor.get('name', 'Unknown')
-                country = competitor.get('country', '')
-                category = competitor.get('category', '')
-                tags = ', '.join(competitor.get('tags', []))
-                section3 += f"- **{name}** ({country}, {category})\n"
-                if tags:
-                    section3 += f"  - *Tags:* {tags}\n"
-            else:
-                section3 += f"- {competitor}\n"
-        section3 += "\n"
-    
-    if partners:
-        section3 += "**Strategic Partners:**\n\n"
-        for partner in partners[:6]:
-            if isinstance(partner, dict):
-                name = partner.get('name', 'Unknown')
-                country = partner.get('country', '')
-                category = partner.get('category', '')
-                desc = partner.get('relationship_description', '')
-                tags = ', '.join(partner.get('tags', []))
-                section3 += f"- **{name}** ({country}, {category})\n"
-                if tags:
-                    section3 += f"  - *Tags:* {tags}\n"
-                if desc:
-                    section3 += f"  - {desc}\n"
-            else:
-                section3 += f"- {partner}\n"
-        section3 += "\n"
-    
-    if not competitors and not partners:
-        section3 += "*No horizontal supply chain data available.*\n\n"
-    
-    return section1 + section2 + section3
-
-
-def generate_template_report(state: AgentState) -> str:
+    key = section_key(name, {"version": SECTION_VERSION, "inputs": inputs}) if SECTION_CACHE_ENABLED else None
+    if SECTION_CACHE_ENABLED:
+        cached = _section_cache.get(key)
+        if cached is not None:
+            reused.append(name)
+            return cached
+    try:
+        text = render()
+    except Exception as e:
+        if fallback is None:
+            raise
+        logger.error(f"Section '{name}' failed, using fallback: {e}")
+        return fallback()
+    if SECTION_CACHE_ENABLED:
+        _section_cache.put(key, text)
+    return text
+
+
+def _financial_section_inputs(company_id: str, finance_data: Dict) -> Dict:
+    """Everything the financial table depends on."""
+    try:
+        store = get_financial_store()
+        return {
+            "company_id": company_id,
+            "finance_data": finance_data,
+            "record": store.get(company_id),
+            "rates": store.rates,
+            "store_quarters": store.quarters[-1:],
+            "quarters": FINANCIAL_TABLE_QUARTERS,
+        }
+    except Exception as e:
+        logger.error(f"Failed to load financial store: {e}")
+        return {"company_id": company_id, "finance_data": finance_data, "record": None}
+
+
+def _peer_section_inputs(company_id: str) -> Optional[Dict]:
+    """The company's peer statistics, which the peer section is built from."""
+    try:
+        return get_peer_stats().company(company_id)
+    except Exception as e:
+        logger.error(f"Failed to load peer statistics: {e}")
+        return None
+
+
+def generate_template_report(state: AgentState, output_format: str = "markdown") -> str:
     """
     Generate AI Supply Chain Analysis Report following the standard template.
     
@@ -313,6 +301,7 @@ def generate_template_report(state: AgentState) -> str:
     ├─────────────────────────────────────────────┤
     │ Financial Status:                           │
     │ [3-metric table with 5 quarters + QoQ/YoY]  │
+    │ Peer Comparison (percentiles in category)   │
     ├─────────────────────────────────────────────┤
     │ AI Analysis:                                │
     │ ● Earnings Call (5 key points)              │
@@ -322,18 +311,30 @@ def generate_template_report(state: AgentState) -> str:
     │   - Vertical (suppliers/customers)          │
     │   - Horizontal (competitors/partners)       │
     └─────────────────────────────────────────────┘
+    
+    Sections are memoized by a hash of their inputs (tools.section_cache);
+    only sections whose inputs changed are re-rendered, and the report
+    lists the reused ones.
+    
+    Args:
+        state: Current agent state
+        output_format: "markdown" or "json" (the same section model,
+            see tools.report_render)
+    
+    Returns:
+        The rendered report.
     """
     # Extract all data
-    basic_info = state.get("basic_info", {})
+    basic_info = state.get("basic_info") or {}
     company_name = basic_info.get("name", "Unknown")
     company_id = state.get("company_id", "Unknown")
     
-    finance_results = state.get("finance_results", {})
-    finance_data = finance_results.get("raw_data", {})
+    finance_results = state.get("finance_results") or {}
+    finance_data = finance_results.get("raw_data") or {}
     
-    earnings_summary = state.get("earnings_call_summary", "")
-    news_summary = state.get("news_summary", "")
-    sc_analysis = state.get("supply_chain_analysis", {})
+    earnings_summary = state.get("earnings_call_summary") or ""
+    news_summary = state.get("news_summary") or ""
+    sc_analysis = state.get("supply_chain_analysis") or {}
     
     # Determine latest earnings call quarter
     fiscal_year = finance_data.get("fiscal_year", "2025")
@@ -346,60 +347,55 @@ def generate_template_report(state: AgentState) -> str:
         lq = extended_data["latest_quarter"]
         latest_earnings = f"{lq.get('fiscal_year', fiscal_year)} {lq.get('fiscal_quarter', 'Q'+fiscal_quarter)}"
     
-    # Build report
-    report = f"""# AI Supply Chain Analysis Report
-
-**Create date:** {datetime.now().strftime("%Y/%m/%d")}
-
----
-
-**Company:** {company_name}
-
-**Latest Earnings Call (Calendar Year):** {latest_earnings}
-
----
-
-## Financial Status:
-
-{format_financial_table(company_id, finance_data)}
-
----
-
-## AI Analysis:
-
-### ● Latest Earnings Call Transcript - QA Session Summary:
-
-<5 key points>
-
-{extract_earnings_key_points(earnings_summary)}
-
----
-
-### ● News Summary:
-
-<Latest key news within 30 days, around 20 news>
-
-{extract_news_highlights(news_summary)}
-
----
-
-### ● Supply Chain Analysis:
-
-{format_supply_chain_analysis(sc_analysis)}
-
----
-
-*此報告由 Multi-Agent System 自動生成，結合結構化數據與 AI 分析，僅供參考。*
-"""
-    
-    return report
+    # Render each section, reusing those whose inputs are unchanged
+    reused: List[str] = []
+    financial_section = render_section(
+        "Financial Status", _financial_section_inputs(company_id, finance_data),
+        lambda: format_financial_table(company_id, finance_data), reused
+    )
+    peer_section = render_section(
+        "Peer Comparison", _peer_section_inputs(company_id),
+        lambda: format_peer_comparison(company_id), reused
+    )
+    earnings_section = render_section(
+        "Earnings Call", earnings_summary,
+        lambda: extract_earnings_key_points(earnings_summary, raise_errors=True), reused,
+        fallback=lambda: earnings_summary
+    )
+    news_section = render_section(
+        "News Summary", news_summary,
+        lambda: extract_news_highlights(news_summary, raise_errors=True), reused,
+        fallback=lambda: news_summary
+    )
+    supply_chain_section = render_section(
+        "Supply Chain Analysis", sc_analysis,
+        lambda: format_supply_chain_analysis(sc_analysis), reused
+    )
+    if reused:
+        logger.info(f"Reused cached sections: {', '.join(reused)}")
+    
+    model = report_model(
+        company_name,
+        latest_earnings,
+        datetime.now().strftime("%Y/%m/%d"),
+        {
+            "financial_status": financial_section,
+            "peer_comparison": peer_section,
+            "earnings_call": earnings_section,
+            "news": news_section,
+            "supply_chain": supply_chain_section,
+        },
+        reused
+    )
+    return render_json(model) if output_format == "json" else render_markdown(model)
 
 
 def reporter_node(state: AgentState) -> Dict:
     """
     Reporter Agent node function (Template-based).
     
-    Generates a standardized AI Supply Chain Analysis Report.
+    Generates a standardized AI Supply Chain Analysis Report; the
+    evaluator node checks it and sets validation_status.
     
     Args:
         state: Current agent state
@@ -419,6 +415,5 @@ def reporter_node(state: AgentState) -> Dict:
         report = f"Error generating report: {str(e)}"
     
     return {
-        "final_report": report,
-        "validation_status": True
+        "final_report": report
     }
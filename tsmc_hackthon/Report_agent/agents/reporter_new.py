@@ -4,21 +4,40 @@ Reporter Agent (Template-Based)
 Generates AI Supply Chain Analysis Report following the standardized template.
 """
 
-from typing import Dict
+from typing import Dict, Optional, Tuple
 from datetime import datetime
 import sys
 sys.path.append(str(__file__).rsplit("\\", 2)[0])
 
 from agent_state import AgentState
 from llm_config import invoke_llm, get_system_prompt, logger
+from agents.reporter import FINANCIAL_TABLE_QUARTERS
+from tools.mock_bigquery import get_financial_store
+from tools.report_render import format_supply_chain_analysis, render_json, render_markdown, report_model, table
 
 
-def format_financial_status_table(finance_data: Dict) -> str:
+def financial_table_headers(company_id: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Header row of the financial table.
+    
+    The quarter columns are the last FINANCIAL_TABLE_QUARTERS quarters up
+    to the company's latest reported quarter in the financial store (or
+    the store's latest quarter for an unknown company).
+    """
+    try:
+        quarters = get_financial_store().quarter_window(company_id, n=FINANCIAL_TABLE_QUARTERS)
+    except Exception as e:
+        logger.error(f"Failed to load financial store: {e}")
+        quarters = ["-"] * FINANCIAL_TABLE_QUARTERS
+    return ("Company Financial Indices", *quarters, "QoQ", "YoY")
+
+
+def format_financial_status_table(finance_data: Dict, company_id: Optional[str] = None) -> str:
     """
     Format financial data into a time-series table.
     
     Expected format:
-    - Calendar YQ: 2024Q3, 2024Q4, 2025Q1, 2025Q2, 2025Q3
+    - Calendar YQ: the last 5 quarters up to the company's latest report
     - Latest: QoQ, YoY
     - Metrics: Revenue (USD), Gross Margin (%), DOI (days)
     """
@@ -46,22 +65,20 @@ def format_financial_status_table(finance_data: Dict) -> str:
     gm_value = gross_margin.get("value", "N/A")
     gm_qoq = gross_margin.get("qoq_change", "N/A")
     
-    # Build table (simplified version - in real scenario, you'd have historical quarters)
-    table = f"""
-**Financial Status:**
+    # Simplified table: only the latest quarter is in the basic dataset
+    earlier = ("-",) * (FINANCIAL_TABLE_QUARTERS - 1)
+    rows = [
+        (f"{company_name} - Revenue (USD B)", *earlier, f"{revenue_usd:.2f}B", "-", revenue_yoy),
+        ("Gross Margin (%)", *earlier, f"{gm_value}%", gm_qoq, "-"),
+        ("DOI (days)", *earlier, "-", "X", "X"),
+    ]
+    return (
+        table(financial_table_headers(company_id), rows)
+        + "\n*Note: Historical quarterly data not available in current dataset. Only latest quarter shown.*\n"
+    )
 
-| Company Financial Indices | 2024Q3 | 2024Q4 | 2025Q1 | 2025Q2 | 2025Q3 | QoQ | YoY |
-|---------------------------|--------|--------|--------|--------|--------|-----|-----|
-| {company_name} - Revenue (USD B) | - | - | - | - | {revenue_usd:.2f}B | - | {revenue_yoy} |
-| Gross Margin (%) | - | - | - | - | {gm_value}% | {gm_qoq} | - |
-| DOI (days) | - | - | - | - | - | X | X |
-
-*Note: Historical quarterly data not available in current dataset. Only latest quarter shown.*
-"""
-    return table
 
-
-def generate_template_report(state: AgentState) -> str:
+def generate_template_report(state: AgentState, output_format: str = "markdown") -> str:
     """
     Generate report following the AI Supply Chain Analysis Report template.
     
@@ -75,126 +92,44 @@ def generate_template_report(state: AgentState) -> str:
          <1. Summary target company status>
          <2. Supply chain analysis - vertical>
          <3. Supply chain analysis - horizontal>
+    
+    The layout is the shared one in tools.report_render (as used by
+    agents.reporter), without the peer comparison and LLM key points.
+    
+    Args:
+        state: Current agent state
+        output_format: "markdown" or "json"
+    
+    Returns:
+        The rendered report.
     """
     # Extract all data
-    basic_info = state.get("basic_info", {})
+    basic_info = state.get("basic_info") or {}
     company_name = basic_info.get("name", "Unknown")
     company_id = state.get("company_id", "Unknown")
     
-    finance_results = state.get("finance_results", {})
-    finance_data = finance_results.get("raw_data", {})
+    finance_results = state.get("finance_results") or {}
+    finance_data = finance_results.get("raw_data") or {}
     
-    earnings_summary = state.get("earnings_call_summary", "")
-    news_summary = state.get("news_summary", "")
-    sc_analysis = state.get("supply_chain_analysis", {})
+    earnings_summary = state.get("earnings_call_summary") or ""
+    news_summary = state.get("news_summary") or ""
+    sc_analysis = state.get("supply_chain_analysis") or {}
     
     # Get latest earnings call info
     fiscal_info = finance_data.get("fiscal_year", "2025") + " Q" + finance_data.get("fiscal_quarter", "4").replace("Q", "")
     
-    # Generate report
-    report = f"""# AI Supply Chain Analysis Report
-
-**Create date:** {datetime.now().strftime("%Y/%m/%d")}
-
----
-
-**Company:** {company_name}
-
-**Latest Earnings Call (Calendar Year):** {fiscal_info}
-
----
-
-## Financial Status
-
-"""
-    
-    # Add financial status table
-    report += format_financial_status_table(finance_data)
-    
-    report += """
-
----
-
-## AI Analysis
-
-### ● Latest Earnings Call Transcript - QA Session Summary:
-
-"""
-    
-    # Extract 5 key points from earnings call
-    report += earnings_summary if earnings_summary else "<5 key points>\n\n*No earnings call data available.*"
-    
-    report += """
-
----
-
-### ● News Summary:
-
-<Latest key news within 30 days, around 20 news>
-
-"""
-    
-    report += news_summary if news_summary else "*No recent news available.*"
-    
-    report += """
-
----
-
-### ● Supply Chain Analysis:
-
-**<1. Summary target company status>**
-
-"""
-    
-    # Add supply chain summary
-    sc_summary = sc_analysis.get("summary", "No supply chain data available.")
-    report += sc_summary
-    
-    report += """
-
-**<2. Supply chain analysis - vertical>**
-
-*Analysis of upstream suppliers and downstream customers in the value chain.*
-
-"""
-    
-    # Vertical analysis would go here
-    customers = sc_analysis.get("customers", [])
-    suppliers = sc_analysis.get("suppliers", [])
-    
-    if customers:
-        report += "\n**Key Customers:**\n"
-        for customer in customers[:5]:  # Top 5
-            report += f"- {customer}\n"
-    
-    if suppliers:
-        report += "\n**Key Suppliers:**\n"
-        for supplier in suppliers[:5]:  # Top 5
-            report += f"- {supplier}\n"
-    
-    report += """
-
-**<3. Supply chain analysis - horizontal>**
-
-*Analysis of competitors and partners in the same industry segment.*
-
-"""
-    
-    # Horizontal analysis
-    competitors = sc_analysis.get("competitors", [])
-    if competitors:
-        report += "\n**Main Competitors:**\n"
-        for competitor in competitors[:5]:
-            report += f"- {competitor}\n"
-    
-    report += """
-
----
-
-*此報告由 Multi-Agent System 自動生成，結合結構化數據與 AI 分析，僅供參考。*
-"""
-    
-    return report
+    model = report_model(
+        company_name,
+        fiscal_info,
+        datetime.now().strftime("%Y/%m/%d"),
+        {
+            "financial_status": format_financial_status_table(finance_data, company_id),
+            "earnings_call": earnings_summary or "*No earnings call data available.*",
+            "news": news_summary or "*No recent news available.*",
+            "supply_chain": format_supply_chain_analysis(sc_analysis),
+        }
+    )
+    return render_json(model) if output_format == "json" else render_markdown(model)
 
 
 def reporter_node(state: AgentState) -> Dict:
@@ -5,75 +5,76 @@ This agent parses the user query and extracts the target company ID.
 It serves as the entry point for the multi-agent workflow.
 """
 
-import re
-from typing import Dict
+from typing import Dict, Optional
 import sys
 sys.path.append(str(__file__).rsplit("\\", 2)[0])
 
 from agent_state import AgentState
-from tools.graph_reader import get_node_by_id, get_node_by_name
+from llm_config import logger
+from tools.entity_resolver import get_entity_resolver
+from tools.graph_reader import get_node_by_id
 
 
-# Mapping of common company names to IDs
-COMPANY_ALIASES = {
-    "tsmc": "2330",
-    "台積電": "2330",
-    "apple": "AAPL",
-    "蘋果": "AAPL",
-    "nvidia": "NVDA",
-    "輝達": "NVDA",
-    "amd": "AMD",
-    "超微": "AMD",
-    "intel": "INTC",
-    "英特爾": "INTC",
-    "asml": "ASML",
-    "艾司摩爾": "ASML",
-    "samsung": "5930",
-    "三星": "5930",
-    "qualcomm": "QCOM",
-    "高通": "QCOM",
-    "mediatek": "2454",
-    "mtk": "2454",
-    "聯發科": "2454",
-    "tesla": "TSLA",
-    "特斯拉": "TSLA",
-    "microsoft": "MSFT",
-    "微軟": "MSFT",
-    "google": "GOOG",
-    "谷歌": "GOOG",
-    "amazon": "AMZN",
-    "aws": "AMZN",
-    "亞馬遜": "AMZN",
-}
+# Company used when the query names none
+DEFAULT_COMPANY_ID = "2330"
 
 
-def extract_company_id(query: str) -> str:
+def resolve_company(query: str) -> Dict:
     """
-    Extract company ID from the user query.
+    Resolve the query's target company, with a confidence level.
+    
+    Exact mentions (graph IDs and names, data/company_aliases.json) are
+    found by the entity resolver in one pass; otherwise a trigram index
+    looks for near matches ("Taiwan Semi", "Nvidai"). A query without
+    any candidate falls back to DEFAULT_COMPANY_ID; weak or ambiguous
+    candidates resolve with low confidence.
     
     Args:
         query: User's natural language query
     
     Returns:
-        Company ID string (defaults to "2330" for TSMC if not found)
+        Dict with 'company_id' (None if the match is too weak to use),
+        'confidence' ("exact", "fuzzy", "default" or "low") and
+        'candidates' (scored fuzzy candidates).
     """
-    query_lower = query.lower()
-    
-    # Check for direct ID mentions (e.g., "2330", "AAPL")
-    id_pattern = r'\b([0-9]{4}|[A-Z]{2,4})\b'
-    matches = re.findall(id_pattern, query.upper())
-    for match in matches:
-        node = get_node_by_id(match)
-        if node:
-            return match
+    resolution = get_entity_resolver().resolve_with_confidence(query)
+    if resolution["confidence"] == "none":
+        resolution = {**resolution, "company_id": DEFAULT_COMPANY_ID, "confidence": "default"}
+    return resolution
+
+
+def extract_company_id(query: str) -> Optional[str]:
+    """
+    Extract company ID from the user query.
     
-    # Check for company name mentions
-    for alias, company_id in COMPANY_ALIASES.items():
-        if alias in query_lower:
-            return company_id
+    Args:
+        query: User's natural language query
     
-    # Default to TSMC
-    return "2330"
+    Returns:
+        Company ID string (defaults to "2330" for TSMC if the query names
+        no company), or None if the company cannot be resolved with
+        confidence; supervisor_node does not analyse such queries.
+    """
+    return resolve_company(query)["company_id"]
+
+
+def format_unresolved(query: str, resolution: Dict) -> str:
+    """Message listing the candidates of a low-confidence resolution."""
+    lines = [
+        "# 無法確定查詢的公司",
+        "",
+        f"查詢「{query}」沒有明確對應到任何公司，為避免產生錯誤公司的報告，未執行分析。",
+        "請在查詢中寫明公司名稱或代號，例如：",
+        "",
+    ]
+    for candidate in resolution["candidates"]:
+        node = get_node_by_id(candidate["company_id"])
+        name = node.get("name", candidate["company_id"]) if node else candidate["company_id"]
+        lines.append(
+            f"- **{name}** ({candidate['company_id']}): 「{candidate['span']}」≈「{candidate['alias']}」, "
+            f"similarity {candidate['score']:.2f}"
+        )
+    return "\n".join(lines) + "\n"
 
 
 def supervisor_node(state: AgentState) -> Dict:
@@ -92,8 +93,20 @@ def supervisor_node(state: AgentState) -> Dict:
     """
     query = state.get("query", "")
     
-    # Extract company ID
-    company_id = extract_company_id(query)
+    # Resolve the company; stop before the agents if the match is too weak
+    resolution = resolve_company(query)
+    if resolution["company_id"] is None:
+        logger.warning(f"Low-confidence company resolution for query: {query}")
+        return {
+            "company_id": "",
+            "resolution": resolution,
+            "final_report": format_unresolved(query, resolution),
+            "validation_status": False
+        }
+    company_id = resolution["company_id"]
+    if resolution["confidence"] == "fuzzy":
+        top = resolution["candidates"][0]
+        logger.info(f"Fuzzy company match: '{top['span']}' -> {company_id} ({top['score']:.2f})")
     
     # Get basic info from graph
     node = get_node_by_id(company_id)
@@ -108,5 +121,6 @@ def supervisor_node(state: AgentState) -> Dict:
     
     return {
         "company_id": company_id,
-        "basic_info": basic_info
+        "basic_info": basic_info,
+        "resolution": resolution
     }
@@ -5,19 +5,41 @@ This agent analyzes supply chain relationships using both structured data
 and LLM-powered reasoning for risk assessment and insights.
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 import sys
 import json
 sys.path.append(str(__file__).rsplit("\\", 2)[0])
 
 from agent_state import AgentState
-from tools.graph_reader import get_node_by_id, get_related_companies
+from tools.graph_reader import get_node_by_id, get_related_companies, get_risk_transmission
+from tools.report_render import pick, table
 from llm_config import invoke_llm, get_system_prompt, format_llm_prompt, logger
 
 
+# Maximum number of multi-tier exposures passed to the LLM per direction
+MAX_RISK_PATHS = 15
+
+# Rule-based fallback tables: (heading, related companies role)
+FALLBACK_RELATION_TABLES = (
+    ("主要客戶 (Customers)", "customers"),
+    ("主要供應商 (Suppliers)", "suppliers"),
+    ("合作夥伴 (Partners)", "partners"),
+)
+RELATION_TABLE_HEADERS = ("公司", "國家", "類別", "關係描述")
+COMPETITOR_TABLE_HEADERS = ("公司", "國家", "標籤")
+_RELATION_FIELDS = ("name", "country", "category", "relationship_description")
+FALLBACK_FIELDS = {
+    "customers": _RELATION_FIELDS + ("tags",),
+    "suppliers": _RELATION_FIELDS,
+    "partners": _RELATION_FIELDS,
+    "competitors": ("name", "country", "tags"),
+}
+
+
 def format_supply_chain_data(
     company_info: Dict,
-    related: Dict[str, List[Dict]]
+    related: Dict[str, List[Dict]],
+    risk_transmission: Optional[Dict[str, List[Dict]]] = None
 ) -> str:
     """
     Format supply chain data for LLM analysis.
@@ -25,6 +47,7 @@ def format_supply_chain_data(
     Args:
         company_info: Target company node info
         related: Dict with customers, suppliers, partners, competitors
+        risk_transmission: Optional multi-tier exposure from get_risk_transmission
     
     Returns:
         Formatted data string for LLM
@@ -76,23 +99,46 @@ def format_supply_chain_data(
         ]
     }
     
+    if risk_transmission:
+        data["risk_transmission"] = {
+            direction: [
+                {
+                    "name": item.get("name"),
+                    "country": item.get("country"),
+                    "tier": item.get("tier"),
+                    "risk_score": item.get("risk_score"),
+                    "path": " -> ".join(item.get("path", []))
+                }
+                for item in risk_transmission.get(direction, [])[:MAX_RISK_PATHS]
+            ]
+            for direction in ("upstream", "downstream")
+        }
+    
     return json.dumps(data, indent=2, ensure_ascii=False)
 
 
-def generate_llm_analysis(company_info: Dict, related: Dict[str, List[Dict]]) -> str:
+def generate_llm_analysis(
+    company_info: Dict,
+    related: Dict[str, List[Dict]],
+    risk_transmission: Optional[Dict[str, List[Dict]]] = None,
+    raise_errors: bool = False
+) -> str:
     """
     Use LLM to generate supply chain risk analysis.
     
     Args:
         company_info: Target company info
         related: Related companies data
+        risk_transmission: Optional multi-tier exposure data
+        raise_errors: Re-raise LLM errors instead of returning the
+            rule-based fallback
     
     Returns:
         LLM-generated analysis in Markdown format
     """
     try:
         # Format data for LLM
-        data_str = format_supply_chain_data(company_info, related)
+        data_str = format_supply_chain_data(company_info, related, risk_transmission)
         
         # Create prompt
         user_prompt = format_llm_prompt(
@@ -108,7 +154,7 @@ def generate_llm_analysis(company_info: Dict, related: Dict[str, List[Dict]]) ->
    - 供應商依賴風險
    - 技術依賴風險
 3. **競爭態勢分析**：與主要競爭者的比較
-4. **風險傳導路徑**：潛在的風險如何影響目標公司
+4. **風險傳導路徑**：潛在的風險如何影響目標公司（參考 risk_transmission 中的二、三階供應鏈路徑與 risk_score）
 
 請以 Markdown 格式輸出，包含清晰的章節標題。
 資料來源：supply_chain_graph.json""",
@@ -122,14 +168,17 @@ def generate_llm_analysis(company_info: Dict, related: Dict[str, List[Dict]]) ->
         return analysis
     
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"LLM analysis failed: {str(e)}")
         # Fallback to rule-based analysis
-        return generate_fallback_analysis(company_info, related)
+        return generate_fallback_analysis(company_info, related, risk_transmission)
 
 
 def generate_fallback_analysis(
     company_info: Dict,
-    related: Dict[str, List[Dict]]
+    related: Dict[str, List[Dict]],
+    risk_transmission: Optional[Dict[str, List[Dict]]] = None
 ) -> str:
     """
     Fallback rule-based analysis when LLM is unavailable.
@@ -137,6 +186,7 @@ def generate_fallback_analysis(
     Args:
         company_info: Target company info
         related: Related companies data
+        risk_transmission: Optional multi-tier exposure data
     
     Returns:
         Rule-based analysis in Markdown format
@@ -144,74 +194,74 @@ def generate_fallback_analysis(
     company_name = company_info.get("name", "Unknown")
     country = company_info.get("country", "Unknown")
     
-    summary = f"## 供應鏈分析：{company_name}\n\n"
-    summary += f"**公司國別：** {country}\n"
-    summary += f"**產業類別：** {company_info.get('category', 'N/A')}\n"
-    summary += f"**標籤：** {', '.join(company_info.get('tags', []))}\n\n"
-    
-    # Customers
-    customers = related.get("customers", [])
-    if customers:
-        summary += "### 主要客戶 (Customers)\n\n"
-        summary += "| 公司 | 國家 | 類別 | 關係描述 |\n"
-        summary += "|------|------|------|----------|\n"
-        for c in customers:
-            summary += f"| {c.get('name', 'N/A')} | {c.get('country', 'N/A')} | {c.get('category', 'N/A')} | {c.get('relationship_description', 'N/A')} |\n"
-        summary += "\n"
+    # Read each graph node field once instead of once per use
+    companies_by_role = {
+        role: [pick(c, keys) for c in related.get(role, [])]
+        for role, keys in FALLBACK_FIELDS.items()
+    }
+    customers = companies_by_role["customers"]
+    suppliers = companies_by_role["suppliers"]
+    competitors = companies_by_role["competitors"]
     
-    # Suppliers
-    suppliers = related.get("suppliers", [])
-    if suppliers:
-        summary += "### 主要供應商 (Suppliers)\n\n"
-        summary += "| 公司 | 國家 | 類別 | 關係描述 |\n"
-        summary += "|------|------|------|----------|\n"
-        for s in suppliers:
-            summary += f"| {s.get('name', 'N/A')} | {s.get('country', 'N/A')} | {s.get('category', 'N/A')} | {s.get('relationship_description', 'N/A')} |\n"
-        summary += "\n"
+    parts = [
+        f"## 供應鏈分析：{company_name}\n\n"
+        f"**公司國別：** {country}\n"
+        f"**產業類別：** {company_info.get('category', 'N/A')}\n"
+        f"**標籤：** {', '.join(company_info.get('tags', []))}\n\n"
+    ]
     
-    # Partners
-    partners = related.get("partners", [])
-    if partners:
-        summary += "### 合作夥伴 (Partners)\n\n"
-        summary += "| 公司 | 國家 | 類別 | 關係描述 |\n"
-        summary += "|------|------|------|----------|\n"
-        for p in partners:
-            summary += f"| {p.get('name', 'N/A')} | {p.get('country', 'N/A')} | {p.get('category', 'N/A')} | {p.get('relationship_description', 'N/A')} |\n"
-        summary += "\n"
+    # Customers, suppliers and partners
+    for heading, role in FALLBACK_RELATION_TABLES:
+        companies = companies_by_role[role]
+        if companies:
+            rows = [
+                (c.get("name", "N/A"), c.get("country", "N/A"), c.get("category", "N/A"), c.get("relationship_description", "N/A"))
+                for c in companies
+            ]
+            parts.append(f"### {heading}\n\n" + table(RELATION_TABLE_HEADERS, rows) + "\n")
     
     # Competitors
-    competitors = related.get("competitors", [])
     if competitors:
-        summary += "### 主要競爭者 (Competitors)\n\n"
-        summary += "| 公司 | 國家 | 標籤 |\n"
-        summary += "|------|------|------|\n"
-        for comp in competitors:
-            tags = ", ".join(comp.get("tags", []))
-            summary += f"| {comp.get('name', 'N/A')} | {comp.get('country', 'N/A')} | {tags} |\n"
-        summary += "\n"
+        rows = [(c.get("name", "N/A"), c.get("country", "N/A"), ", ".join(c.get("tags", []))) for c in competitors]
+        parts.append("### 主要競爭者 (Competitors)\n\n" + table(COMPETITOR_TABLE_HEADERS, rows) + "\n")
     
     # Risk Analysis
-    summary += "### 風險分析\n\n"
+    parts.append("### 風險分析\n\n")
     
     # Geographic concentration risk
-    customer_countries = set(c.get("country") for c in customers if c.get("country"))
+    # First-seen order (a set's order varies with the hash seed)
+    customer_countries = list(dict.fromkeys(c.get("country") for c in customers if c.get("country")))
     supplier_countries = set(s.get("country") for s in suppliers if s.get("country"))
     
     if len(customer_countries) <= 2 and customers:
-        summary += f"- **客戶集中度風險：** 主要客戶集中於 {', '.join(customer_countries)}，地緣政治風險需關注。\n"
+        parts.append(f"- **客戶集中度風險：** 主要客戶集中於 {', '.join(customer_countries)}，地緣政治風險需關注。\n")
     
     if "USA" in supplier_countries and "Netherlands" in supplier_countries:
-        summary += "- **設備供應風險：** 關鍵設備供應商位於美國與荷蘭，受出口管制政策影響。\n"
+        parts.append("- **設備供應風險：** 關鍵設備供應商位於美國與荷蘭，受出口管制政策影響。\n")
     
     # Customer dependency
     hpc_customers = [c for c in customers if "HPC" in str(c.get("tags", [])) or "AI" in str(c.get("tags", []))]
     if hpc_customers:
         customer_names = [c.get("name") for c in hpc_customers[:3]]
-        summary += f"- **AI/HPC 依賴：** {', '.join(customer_names)} 為主要 AI 晶片客戶，需求週期性波動風險。\n"
+        parts.append(f"- **AI/HPC 依賴：** {', '.join(customer_names)} 為主要 AI 晶片客戶，需求週期性波動風險。\n")
+    
+    # Multi-tier risk transmission paths (tier 2+ only; tier 1 is listed above)
+    if risk_transmission:
+        indirect = [
+            item for direction in ("upstream", "downstream")
+            for item in risk_transmission.get(direction, [])
+            if item.get("tier", 0) >= 2
+        ]
+        if indirect:
+            parts.append("\n### 風險傳導路徑\n\n")
+            parts.extend(
+                f"- {' → '.join(item.get('path', []))} (tier {item.get('tier')}, risk score {item.get('risk_score')})\n"
+                for item in sorted(indirect, key=lambda i: -i.get("risk_score", 0))[:5]
+            )
     
-    summary += "\n*資料來源：supply_chain_graph.json*\n"
+    parts.append("\n*資料來源：supply_chain_graph.json*\n")
     
-    return summary
+    return "".join(parts)
 
 
 def supply_chain_expert_node(state: AgentState) -> Dict:
@@ -241,20 +291,24 @@ def supply_chain_expert_node(state: AgentState) -> Dict:
                 "customers": [],
                 "suppliers": [],
                 "partners": [],
-                "competitors": []
+                "competitors": [],
+                "risk_transmission": {"upstream": [], "downstream": []}
             }
         }
     
-    # Get related companies
+    # Get related companies and multi-tier exposure
     related = get_related_companies(company_id)
+    risk_transmission = get_risk_transmission(company_id, max_depth=3)
     
     # Generate analysis (LLM-powered with fallback)
     try:
-        summary = generate_llm_analysis(company_info, related)
+        summary = generate_llm_analysis(company_info, related, risk_transmission, raise_errors=True)
+        source = "llm"
         logger.info("LLM-powered supply chain analysis completed")
     except Exception as e:
         logger.error(f"Falling back to rule-based analysis: {str(e)}")
-        summary = generate_fallback_analysis(company_info, related)
+        summary = generate_fallback_analysis(company_info, related, risk_transmission)
+        source = "rule_based"
     
     return {
         "supply_chain_analysis": {
@@ -262,6 +316,8 @@ def supply_chain_expert_node(state: AgentState) -> Dict:
             "customers": related.get("customers", []),
             "suppliers": related.get("suppliers", []),
             "partners": related.get("partners", []),
-            "competitors": related.get("competitors", [])
+            "competitors": related.get("competitors", []),
+            "risk_transmission": risk_transmission,
+            "source": source
         }
     }
@@ -0,0 +1,210 @@
+"""
+Batch Report Runner
+
+Generates one report per query for a list of queries. Before the first
+report runs, the data of every target company is fetched in one pass
+through the bulk query APIs (query_financial_data_many,
+query_earnings_calls_many, query_recent_news_many), so each report reads
+its financials, earnings calls and news from the prefetched results
+instead of making its own lookups.
+
+With several workers, the reports run in a pool of forked processes, so
+the CPU-side work (parsing, retrieval scoring, rendering, evaluation) is
+not serialized by the GIL. The parent loads every dataset and the
+prefetched results before forking; the workers share those pages copy-on-
+write instead of loading their own copies. Jobs are grouped by company,
+companies are handed to the workers as they become free, and each
+company's reports are reported as soon as they are written. Where fork
+is not available (Windows), the reports run in-process.
+
+Queries whose company cannot be resolved with confidence (see
+agents.supervisor.resolve_company) are reported and skipped; they keep
+their number, so report file names still match query positions.
+
+Usage:
+    python batch.py "分析台積電" "分析 Nvidia 的供應鏈"
+    python batch.py --file queries.txt --out reports/ --workers 8
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from agents.earnings_call import EARNINGS_CALL_LIMIT
+from agents.news import NEWS_LIMIT, NEWS_WINDOW_DAYS
+from agents.supervisor import extract_company_id
+from main import run_analysis
+from tools import data_registry, prefetch
+from tools.hot_reload import start_watcher
+from tools.mock_bigquery import query_financial_data_many
+from tools.mock_rag import query_earnings_calls_many, query_recent_news_many
+
+
+def resolve_jobs(queries: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """Pair each query with its target company ID (None if unresolved)."""
+    return [(query, extract_company_id(query)) for query in queries]
+
+
+def prefetch_jobs(jobs: List[Tuple[str, str]]) -> None:
+    """
+    Fetch the data of every job's company through the bulk query APIs.
+    
+    Earnings calls and news are ranked by the query text, so they are
+    fetched once per distinct query for all of its companies.
+    
+    Args:
+        jobs: (query, company ID) pairs
+    """
+    query_financial_data_many(company_id for _, company_id in jobs)
+    
+    companies_by_query: Dict[str, List[str]] = {}
+    for query, company_id in jobs:
+        companies_by_query.setdefault(query, []).append(company_id)
+    for query, company_ids in companies_by_query.items():
+        query_earnings_calls_many(company_ids, limit=EARNINGS_CALL_LIMIT, query=query)
+        query_recent_news_many(company_ids, days=NEWS_WINDOW_DAYS, limit=NEWS_LIMIT, query=query)
+
+
+# Process pools fork the parent, so workers inherit its loaded data
+FORK_AVAILABLE = "fork" in multiprocessing.get_all_start_methods()
+
+# A numbered job: (report number, query, company ID)
+Job = Tuple[int, str, str]
+
+
+def number_jobs(jobs: List[Tuple[str, Optional[str]]]) -> List[Job]:
+    """Number the jobs by query position, dropping unresolved ones."""
+    return [
+        (number, query, company_id)
+        for number, (query, company_id) in enumerate(jobs, start=1)
+        if company_id is not None
+    ]
+
+
+def group_by_company(jobs: List[Job]) -> List[List[Job]]:
+    """
+    Group numbered jobs by company.
+    
+    Args:
+        jobs: Numbered jobs
+    
+    Returns:
+        One list of jobs per company, largest first, so the longest
+        tasks start early.
+    """
+    groups: Dict[str, List[Job]] = {}
+    for job in jobs:
+        groups.setdefault(job[2], []).append(job)
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def write_report(out_dir: Path, job: Job) -> Path:
+    """Generate one report and write it to out_dir."""
+    number, query, company_id = job
+    report = run_analysis(query)
+    path = out_dir / f"{number:03d}_{company_id}.md"
+    path.write_text(report, encoding="utf-8")
+    return path
+
+
+def _init_worker() -> None:
+    """Silence per-report progress output; the parent reports completed files."""
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")
+
+
+def _run_company(task: Tuple[Path, List[Job]]) -> List[Tuple[int, Path]]:
+    """Worker: write the reports of one company."""
+    out_dir, jobs = task
+    return [(job[0], write_report(out_dir, job)) for job in jobs]
+
+
+def _run_in_processes(jobs: List[Job], out_dir: Path, workers: int) -> List[Path]:
+    """Run the jobs in a pool of forked workers (call inside prefetching())."""
+    # Load every dataset here; forked workers share these pages instead of
+    # each loading its own copy
+    data_registry.preload()
+    # Move everything loaded so far out of the garbage collector's reach,
+    # so collections in the workers do not write to (and copy) shared pages
+    gc.freeze()
+    paths: Dict[int, Path] = {}
+    try:
+        with multiprocessing.get_context("fork").Pool(workers, initializer=_init_worker) as pool:
+            tasks = [(out_dir, group) for group in group_by_company(jobs)]
+            for results in pool.imap_unordered(_run_company, tasks):
+                for number, path in results:
+                    paths[number] = path
+                    print(f"💾 [{len(paths)}/{len(jobs)}] {path}")
+    finally:
+        gc.unfreeze()
+    return [paths[number] for number in sorted(paths)]
+
+
+def run_batch(queries: List[str], out_dir: Path, workers: int = 1) -> List[Path]:
+    """
+    Generate a report for every query.
+    
+    Args:
+        queries: User queries
+        out_dir: Directory the reports are written to
+        workers: Worker processes (at most one per company); 1 runs the
+            reports in this process
+    
+    Returns:
+        Paths of the written reports, in query order (queries whose
+        company cannot be resolved are skipped).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    resolved = resolve_jobs(queries)
+    for number, (query, company_id) in enumerate(resolved, start=1):
+        if company_id is None:
+            print(f"⚠️  [{number}] Skipped, company not resolved: {query}")
+    jobs = number_jobs(resolved)
+    if not jobs:
+        return []
+    workers = min(workers, len({company_id for _, _, company_id in jobs}))
+    
+    with prefetch.prefetching():
+        prefetch_jobs([(query, company_id) for _, query, company_id in jobs])
+        if workers > 1 and FORK_AVAILABLE:
+            return _run_in_processes(jobs, out_dir, workers)
+        paths = []
+        for done, job in enumerate(jobs, start=1):
+            paths.append(write_report(out_dir, job))
+            print(f"💾 [{done}/{len(jobs)}] {paths[-1]}")
+        return paths
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Generate reports for many queries with prefetched data.")
+    parser.add_argument("queries", nargs="*", help="Queries (one report each)")
+    parser.add_argument("--file", type=Path, help="File with one query per line")
+    parser.add_argument("--out", type=Path, default=Path("reports"), help="Output directory")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Worker processes (default: one per CPU core; 1 runs in-process)"
+    )
+    args = parser.parse_args(argv)
+    
+    queries = list(args.queries)
+    if args.file:
+        queries.extend(line.strip() for line in args.file.read_text(encoding="utf-8").splitlines() if line.strip())
+    if not queries:
+        parser.print_usage()
+        sys.exit(1)
+    
+    # Pick up data files that change while the batch runs. Worker
+    # processes use the data loaded when they were forked, and the
+    # watcher thread is not started before forking.
+    if args.workers <= 1 or not FORK_AVAILABLE:
+        start_watcher()
+    run_batch(queries, args.out, args.workers)
+
+
+if __name__ == "__main__":
+    main()
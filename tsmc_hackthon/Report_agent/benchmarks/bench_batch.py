@@ -0,0 +1,74 @@
+"""
+Batch Scaling Benchmark
+
+Runs the batch runner (batch.run_batch) over the same queries with an
+increasing number of worker processes and reports the throughput of
+each. The LLM is switched off (no API key, so every section takes its
+rule-based fallback) and the section cache and report archive are
+disabled, so each report does its full CPU-side work: retrieval,
+rendering and evaluation.
+
+Usage:
+    python benchmarks/bench_batch.py
+    python benchmarks/bench_batch.py --reports 400 --workers 1 2 4 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Before the agents are imported: no LLM calls, nothing cached or archived
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["EVALUATOR_LLM"] = "0"
+os.environ["REPORT_SECTION_CACHE"] = "0"
+os.environ["REPORT_ARCHIVE"] = "0"
+os.environ["NODE_CACHE"] = "off"
+
+import logging  # noqa: E402
+
+from batch import run_batch  # noqa: E402
+from tools.graph_reader import get_graph  # noqa: E402
+
+
+def make_queries(count: int) -> list:
+    """Queries naming the graph's companies in turn."""
+    graph = get_graph()
+    names = [name or company_id for company_id, name in zip(graph.ids, graph.names)]
+    topics = ["供應鏈", "財務狀況", "AI 需求", "法說會重點"]
+    return [f"分析 {names[i % len(names)]} {topics[i // len(names) % len(topics)]}" for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Worker counts to compare (default: 1, 2, 4, ... up to the CPU count)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    counts = args.workers or sorted({1, cpus} | {2 ** k for k in range(1, 8) if 2 ** k < cpus})
+    queries = make_queries(args.reports)
+    logging.disable(logging.CRITICAL)
+
+    print(f"{args.reports} reports, {cpus} CPU cores")
+    print(f"{'workers':>7} {'seconds':>9} {'reports/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in counts:
+        with tempfile.TemporaryDirectory() as out_dir, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run_batch(queries, Path(out_dir), workers)
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>7} {elapsed:>9.2f} {args.reports / elapsed:>10.1f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Cold-Start Benchmark: JSON vs Binary Snapshot
+
+Generates a synthetic data set (graph, financials, earnings calls, news)
+at a configurable scale, compiles it with tools.snapshot, and measures
+how long a fresh interpreter takes to load every dataset from JSON versus
+from the snapshot.
+
+Usage:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --nodes 50000 --edges 500000 --news 200000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tools.snapshot import build_snapshot  # noqa: E402
+
+
+# Child process body: load every dataset once and print the elapsed time
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+from tools.snapshot import load_dataset
+from tools.compact_graph import CompactGraph
+from tools.news_index import NewsIndex
+from tools.financial_store import FinancialStore
+sources = json.loads({sources!r})
+for name, path in sources.items():
+    data = load_dataset(name, path, snapshot_dir={snapshot_dir!r}) if {use_snapshot} else None
+    if data is None:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if name == "supply_chain_graph":
+            data = CompactGraph(data)
+        elif name == "news":
+            data = NewsIndex(data)
+        elif name == "financials_extended":
+            data = FinancialStore(data)
+print(time.perf_counter() - start)
+"""
+
+
+def generate_data(out_dir: Path, nodes: int, edges: int, news: int, companies: int) -> dict:
+    """Write synthetic data files and return dataset name -> path."""
+    rng = random.Random(42)
+    countries = ["Taiwan", "USA", "Japan", "South Korea", "Netherlands", "China"]
+    categories = ["Foundry", "Fabless", "Equipment", "Packaging", "Hyperscaler"]
+    roles = ["Customer", "Supplier", "Partner", "Competitor"]
+    relations = ["Client", "Supplier", "Partner"]
+
+    graph = {
+        "nodes": [
+            {
+                "id": f"C{i}",
+                "name": f"Company {i}",
+                "country": rng.choice(countries),
+                "category": rng.choice(categories),
+                "role": rng.choice(roles),
+                "tags": rng.sample(["HPC", "AI", "Mobile", "EUV", "OSAT", "Auto"], 2),
+            }
+            for i in range(nodes)
+        ],
+        "edges": [
+            {
+                "source": f"C{rng.randrange(nodes)}",
+                "target": f"C{rng.randrange(nodes)}",
+                "relation": rng.choice(relations),
+                "description": f"Relationship type {rng.randrange(50)}",
+            }
+            for _ in range(edges)
+        ],
+    }
+    quarters = ["2024Q3", "2024Q4", "2025Q1", "2025Q2", "2025Q3"]
+    financials_extended = {
+        f"C{i}": {
+            "company_name": f"Company {i}",
+            "currency": "USD",
+            "quarterly_data": {
+                q: {
+                    "revenue": {"value": rng.randrange(10**9, 10**11), "unit": "USD"},
+                    "gross_margin": {"value": round(rng.uniform(20, 70), 1), "unit": "%"},
+                    "doi_days": {"value": rng.randrange(30, 150), "unit": "days"},
+                }
+                for q in quarters
+            },
+        }
+        for i in range(companies)
+    }
+    financials = {
+        cid: {"company_name": d["company_name"], "revenue": d["quarterly_data"]["2025Q3"]["revenue"]}
+        for cid, d in financials_extended.items()
+    }
+    earnings = {
+        f"C{i}": [
+            {
+                "date": "2026-01-16",
+                "quarter": "Q4 2025",
+                "title": f"Company {i} Q4 2025 Earnings Call",
+                "key_points": [f"Key point {k} " * 8 for k in range(5)],
+                "outlook": "Outlook text " * 20,
+                "management_quotes": ["Quote " * 15],
+            }
+        ]
+        for i in range(companies)
+    }
+    articles = [
+        {
+            "id": f"news_{i}",
+            "date": f"2026-01-{rng.randrange(1, 29):02d}",
+            "title": f"Headline {i}",
+            "source": "Wire",
+            "summary": "Summary text " * 30,
+            "sentiment": rng.choice(["positive", "neutral", "negative"]),
+            "related_companies": [f"C{rng.randrange(nodes)}" for _ in range(3)],
+        }
+        for i in range(news)
+    ]
+
+    files = {
+        "supply_chain_graph": (out_dir / "supply_chain_graph.json", graph),
+        "financials": (out_dir / "financials.json", financials),
+        "financials_extended": (out_dir / "financials_extended.json", financials_extended),
+        "earnings_calls": (out_dir / "earnings_calls.json", earnings),
+        "news": (out_dir / "news.json", articles),
+    }
+    for path, data in files.values():
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    return {name: str(path) for name, (path, _) in files.items()}
+
+
+def time_cold_start(sources: dict, snapshot_dir: Path, use_snapshot: bool, runs: int) -> list:
+    """Run the loader in fresh interpreters and return per-run seconds."""
+    code = _CHILD.format(
+        root=str(ROOT),
+        sources=json.dumps(sources),
+        snapshot_dir=str(snapshot_dir),
+        use_snapshot=use_snapshot,
+    )
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--edges", type=int, default=200000)
+    parser.add_argument("--news", type=int, default=100000)
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        sources = generate_data(tmp_dir, args.nodes, args.edges, args.news, args.companies)
+        total_mb = sum(Path(p).stat().st_size for p in sources.values()) / 1e6
+        snapshot_dir = tmp_dir / "snapshot"
+        build_snapshot(sources={k: Path(v) for k, v in sources.items()}, snapshot_dir=snapshot_dir)
+
+        json_times = time_cold_start(sources, snapshot_dir, use_snapshot=False, runs=args.runs)
+        snap_times = time_cold_start(sources, snapshot_dir, use_snapshot=True, runs=args.runs)
+
+    json_median = statistics.median(json_times)
+    snap_median = statistics.median(snap_times)
+    print(f"Data size: {total_mb:.1f} MB JSON "
+          f"({args.nodes} nodes, {args.edges} edges, {args.news} news, {args.companies} companies)")
+    print(f"JSON cold start:     {json_median * 1000:8.1f} ms (median of {args.runs})")
+    print(f"Snapshot cold start: {snap_median * 1000:8.1f} ms (median of {args.runs})")
+    print(f"Speedup:             {json_median / snap_median:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Report Rendering Benchmark
+
+Generates synthetic report inputs (company, related companies, multi-tier
+risk paths, earnings calls, news) and renders thousands of reports with
+the shared rendering layer (tools.report_render), timing each section
+and the Markdown and JSON output of the whole report.
+
+The LLM and the data stores are not involved: this measures string
+building only, i.e. what every report pays on top of its data lookups.
+
+Usage:
+    python benchmarks/bench_render.py
+    python benchmarks/bench_render.py --reports 20000 --related 30 --news 40
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from agents.supply_chain import generate_fallback_analysis  # noqa: E402
+from tools.report_render import (  # noqa: E402
+    format_earnings_call_summary,
+    format_news_summary,
+    format_supply_chain_analysis,
+    render_json,
+    render_markdown,
+    report_model,
+)
+
+
+COUNTRIES = ["Taiwan", "USA", "Japan", "South Korea", "Netherlands", "China"]
+CATEGORIES = ["Foundry", "Fabless", "Equipment", "Packaging", "Hyperscaler"]
+TAGS = ["HPC", "AI GPU", "CoWoS", "Mobile SoC", "EUV", "HBM", "Automotive", "5G Modem"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+
+
+def make_company(rng: random.Random, i: int) -> dict:
+    """One synthetic related company."""
+    return {
+        "id": f"C{i:05d}",
+        "name": f"Company {i}",
+        "country": rng.choice(COUNTRIES),
+        "category": rng.choice(CATEGORIES),
+        "role": "Customer",
+        "tags": rng.sample(TAGS, rng.randint(1, 3)),
+        "relationship_description": f"Supplies wafers and packaging services to program {i}",
+    }
+
+
+def make_inputs(rng: random.Random, related: int, news: int) -> dict:
+    """Synthetic inputs of one report."""
+    groups = {
+        role: [make_company(rng, rng.randrange(100000)) for _ in range(rng.randint(0, related))]
+        for role in ("customers", "suppliers", "partners", "competitors")
+    }
+    risk = {
+        direction: [
+            {"path": [f"Company {rng.randrange(1000)}" for _ in range(tier + 1)], "tier": tier,
+             "risk_score": round(rng.random(), 3)}
+            for tier in (rng.randint(1, 3) for _ in range(rng.randint(0, 10)))
+        ]
+        for direction in ("upstream", "downstream")
+    }
+    calls = [
+        {
+            "title": f"Q{q} Earnings Call",
+            "date": f"2025-{3 * q:02d}-15",
+            "key_points": [f"Key point {k} about demand and capacity" for k in range(5)],
+            "outlook": "Revenue expected to grow in the coming quarter.",
+            "management_quotes": [f"Quote {k} from management." for k in range(rng.randint(0, 3))],
+        }
+        for q in range(1, 3)
+    ]
+    articles = [
+        {
+            "title": f"Headline {n} on supply chain developments",
+            "source": "Newswire",
+            "date": f"2025-10-{1 + n % 28:02d}",
+            "sentiment": rng.choice(SENTIMENTS),
+            "summary": "Short summary of the article. " * 3,
+        }
+        for n in range(rng.randint(news // 2, news))
+    ]
+    info = make_company(rng, 0)
+    return {"info": info, "related": groups, "risk": risk, "calls": calls, "articles": articles}
+
+
+def render_report(inputs: dict, timings: dict, output_format: str) -> str:
+    """Render one report, adding each section's time to `timings`."""
+    def timed(name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    summary = timed("fallback analysis", generate_fallback_analysis, inputs["info"], inputs["related"], inputs["risk"])
+    supply_chain = timed("supply chain section", format_supply_chain_analysis, {"summary": summary, **inputs["related"]})
+    earnings = timed("earnings summary", format_earnings_call_summary, inputs["calls"])
+    news = timed("news summary", format_news_summary, inputs["articles"])
+    bodies = {
+        "financial_status": "| table |\n",
+        "peer_comparison": "| peers |\n",
+        "earnings_call": earnings,
+        "news": news,
+        "supply_chain": supply_chain,
+    }
+    model = timed("section model", report_model, inputs["info"]["name"], "2025 Q3", "2026/01/20", bodies)
+    render = render_json if output_format == "json" else render_markdown
+    return timed(f"render {output_format}", render, model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=5000)
+    parser.add_argument("--related", type=int, default=12, help="Max companies per relation")
+    parser.add_argument("--news", type=int, default=20, help="Max news articles per report")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    inputs = [make_inputs(rng, args.related, args.news) for _ in range(min(args.reports, 500))]
+
+    print(f"Rendering {args.reports} reports (up to {args.related} companies per relation, "
+          f"{args.news} news)")
+    for output_format in ("markdown", "json"):
+        timings = {}
+        size = 0
+        start = time.perf_counter()
+        for i in range(args.reports):
+            size += len(render_report(inputs[i % len(inputs)], timings, output_format))
+        elapsed = time.perf_counter() - start
+
+        print(f"\n{output_format}: {args.reports / elapsed:,.0f} reports/s, "
+              f"avg {size / args.reports / 1024:.1f} KB")
+        print(f"{'section':<22} {'p50 us':>8} {'p95 us':>8}")
+        for name, values in timings.items():
+            values.sort()
+            p95 = values[int(0.95 * (len(values) - 1))]
+            print(f"{name:<22} {statistics.median(values) * 1e6:8.1f} {p95 * 1e6:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Retrieval Benchmark: BM25 vs Vector vs Hybrid (RRF)
+
+Builds a synthetic, labeled news corpus and measures query latency and
+recall@k for the three search modes of tools.vector_store.VectorIndex.
+
+The labeled sample has two kinds of queries:
+
+- exact: a rare identifier (process node, package code, ticker) plus
+  generic words; relevant = every article that mentions the identifier.
+- topic: a Chinese/English description of a topic using inflected word
+  forms ("packaging capacities" for "package capacity"); relevant =
+  articles about that topic and company.
+
+Usage:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --docs 50000 --queries 300 --k 10
+    python benchmarks/bench_retrieval.py --bm25-weight 1.0 --vector-weight 1.0
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tools.vector_store import VectorIndex  # noqa: E402
+
+
+# Topic -> (document phrases, query phrases); query phrases are inflected
+# or reordered so they do not match the documents token for token
+TOPICS = {
+    "packaging": (["advanced package capacity", "CoWoS 封裝 產能 擴充", "interposer supply"],
+                  ["packaging capacities", "先進封裝產能"]),
+    "euv": (["EUV tool delivery", "曝光機 交貨 延遲", "lithography scanner backlog"],
+            ["delayed lithography deliveries", "EUV 設備交期"]),
+    "export": (["export control rules", "出口 管制 收緊", "restricted shipment list"],
+               ["tightening export controls", "出口管制影響"]),
+    "margin": (["gross margin guidance", "毛利率 展望", "pricing and cost structure"],
+               ["margins guided", "毛利率預估"]),
+    "demand": (["AI accelerator demand", "HPC 需求 強勁", "datacenter orders"],
+               ["accelerators demanded by AI", "AI 需求成長"]),
+}
+FILLER = ("market analysts said the quarter was in line with expectations while investors "
+          "watched supply chain updates 市場 分析師 表示 供應鏈 持續 觀察").split()
+IDENT_PREFIXES = ["N", "A", "CoWoS-", "SoIC-", "HBM", "T"]
+
+
+def generate_corpus(num_docs: int, num_companies: int, seed: int):
+    """Return (articles, identifiers -> doc ids, (topic, company) -> doc ids)."""
+    rng = random.Random(seed)
+    articles = []
+    by_ident = {}
+    by_topic = {}
+    for i in range(num_docs):
+        topic = rng.choice(list(TOPICS))
+        company = f"C{rng.randrange(num_companies)}"
+        words = rng.sample(FILLER, 12) + [rng.choice(TOPICS[topic][0])]
+        # Roughly one article in ten carries a rare identifier
+        if rng.random() < 0.1:
+            ident = f"{rng.choice(IDENT_PREFIXES)}{rng.randrange(1000)}"
+            words.insert(rng.randrange(len(words)), ident)
+            by_ident.setdefault(ident.lower(), []).append(f"news:news_{i}")
+        rng.shuffle(words)
+        articles.append({
+            "id": f"news_{i}",
+            "date": f"2026-01-{rng.randrange(1, 29):02d}",
+            "title": f"{company} {rng.choice(TOPICS[topic][0])}",
+            "summary": " ".join(words),
+            "related_companies": [company],
+        })
+        by_topic.setdefault((topic, company), []).append(f"news:news_{i}")
+    return articles, by_ident, by_topic
+
+
+def labeled_queries(by_ident, by_topic, num_queries: int, seed: int):
+    """Return a list of (kind, query, relevant doc ids)."""
+    rng = random.Random(seed + 1)
+    idents = sorted(by_ident)
+    topics = sorted(by_topic)
+    queries = []
+    for n in range(num_queries):
+        if n % 2 == 0 and idents:
+            ident = rng.choice(idents)
+            queries.append(("exact", f"{ident} supply update 進度", set(by_ident[ident])))
+        else:
+            topic, company = rng.choice(topics)
+            phrase = rng.choice(TOPICS[topic][1])
+            queries.append(("topic", f"{company} {phrase}", set(by_topic[(topic, company)])))
+    return queries
+
+
+def run_mode(index: VectorIndex, mode: str, queries, k: int, weights):
+    """Return (latencies in ms, recall@k per query kind)."""
+    latencies = []
+    recalls = {}
+    for kind, query, relevant in queries:
+        start = time.perf_counter()
+        if mode == "bm25":
+            hits = index.keyword_search(query, k=k)
+        elif mode == "vector":
+            hits = index.search(query, k=k)
+        else:
+            hits = index.hybrid_search(query, k=k, weights=weights)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {hit["doc_id"] for hit in hits}
+        recall = len(found & relevant) / min(len(relevant), k)
+        recalls.setdefault(kind, []).append(recall)
+        recalls.setdefault("all", []).append(recall)
+    return latencies, {kind: statistics.mean(values) for kind, values in recalls.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--bm25-weight", type=float, default=1.0)
+    parser.add_argument("--vector-weight", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    articles, by_ident, by_topic = generate_corpus(args.docs, args.companies, args.seed)
+    queries = labeled_queries(by_ident, by_topic, args.queries, args.seed)
+
+    start = time.perf_counter()
+    index = VectorIndex()
+    index.add_documents({
+        "doc_id": f"news:{a['id']}",
+        "text": f"{a['title']}\n{a['summary']}",
+        "kind": "news",
+        "company_ids": a["related_companies"],
+    } for a in articles)
+    build_seconds = time.perf_counter() - start
+
+    weights = {"bm25": args.bm25_weight, "vector": args.vector_weight}
+    print(f"Corpus: {args.docs} articles, {len(index)} chunks (indexed in {build_seconds:.1f} s)")
+    print(f"Labeled queries: {len(queries)}, k={args.k}, fusion weights {weights}")
+    print(f"{'mode':<8} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9} {'exact':>7} {'topic':>7}")
+    for mode in ("bm25", "vector", "hybrid"):
+        latencies, recalls = run_mode(index, mode, queries, args.k, weights)
+        latencies.sort()
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(f"{mode:<8} {statistics.median(latencies):8.2f} {p95:8.2f} {recalls['all']:9.3f} "
+              f"{recalls.get('exact', 0.0):7.3f} {recalls.get('topic', 0.0):7.3f}")
+
+
+if __name__ == "__main__":
+    main()
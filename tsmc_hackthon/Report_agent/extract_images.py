@@ -1,6 +1,7 @@
 
 from pypdf import PdfReader
 import os
+import sys
 
 def extract_images_from_pdf(pdf_path, output_dir):
     if not os.path.exists(output_dir):
@@ -28,6 +29,13 @@ def extract_images_from_pdf(pdf_path, output_dir):
     print(f"Total extracted images: {count}")
 
 if __name__ == "__main__":
-    pdf_path = r"c:\Users\20151\OneDrive\桌面\tsmc\tsmc_hackthon\Report_agent\2026 TSMC CareerHack_ 智慧產業分析 Multi-Agent System 架構.pdf"
-    output_dir = r"c:\Users\20151\OneDrive\桌面\tsmc\tsmc_hackthon\Report_agent\extracted_images"
-    extract_images_from_pdf(pdf_path, output_dir)
+    # Deduplicating, parallel version for directories of PDFs:
+    # python -m tools.image_extractor <pdfs or folders> [--store DIR]
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    if len(sys.argv) > 1:
+        from tools.image_extractor import main as pipeline_main
+        pipeline_main(sys.argv[1:])
+    else:
+        pdf_path = os.path.join(base_dir, "2026 TSMC CareerHack_ 智慧產業分析 Multi-Agent System 架構.pdf")
+        output_dir = os.path.join(base_dir, "extracted_images")
+        extract_images_from_pdf(pdf_path, output_dir)
@@ -1,6 +1,7 @@
 
 import sys
 import importlib.util
+from pathlib import Path
 
 def try_extract(path):
     # Try pypdf (newer)
@@ -8,9 +9,7 @@ def try_extract(path):
         try:
             from pypdf import PdfReader
             reader = PdfReader(path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            text = "\n".join((page.extract_text() or "") for page in reader.pages)
             return "SUCCESS: pypdf", text
         except Exception as e:
             return f"FAIL: pypdf error {e}", ""
@@ -21,9 +20,7 @@ def try_extract(path):
             import PyPDF2
             with open(path, 'rb') as f:
                 reader = PyPDF2.PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
+                text = "\n".join((page.extract_text() or "") for page in reader.pages)
             return "SUCCESS: PyPDF2", text
         except Exception as e:
             return f"FAIL: PyPDF2 error {e}", ""
@@ -31,8 +28,16 @@ def try_extract(path):
     return "FAIL: No suitable library found (pypdf, PyPDF2)", ""
 
 if __name__ == "__main__":
-    file_path = r"c:\Users\20151\OneDrive\桌面\tsmc\tsmc_hackthon\Report_agent\2026 TSMC CareerHack_ 智慧產業分析 Multi-Agent System 架構.pdf"
-    status, text = try_extract(file_path)
+    # A directory (or several PDFs) goes through the parallel, cached pipeline
+    # that ingests page text into the RAG store: python -m tools.pdf_extractor
+    default_pdf = Path(__file__).parent / "2026 TSMC CareerHack_ 智慧產業分析 Multi-Agent System 架構.pdf"
+    targets = [Path(p) for p in sys.argv[1:]] or [default_pdf]
+    if len(targets) > 1 or targets[0].is_dir():
+        from tools.pdf_extractor import main as pipeline_main
+        pipeline_main([str(p) for p in targets])
+        sys.exit(0)
+
+    status, text = try_extract(str(targets[0]))
     with open("extracted_content.txt", "w", encoding="utf-8") as f:
         f.write(status + "\n")
         f.write("-" * 20 + "\n")
@@ -13,6 +13,18 @@ from agents.earnings_call import earnings_call_analyst_node
 from agents.news import news_agent_node
 from agents.supply_chain import supply_chain_expert_node
 from agents.reporter import reporter_node
+from agents.evaluator import evaluator_node
+from tools.node_cache import memoize_node
+
+
+def _llm_succeeded(output: dict) -> bool:
+    """Only cache supply chain analyses that came from the LLM."""
+    return output.get("supply_chain_analysis", {}).get("source") != "rule_based"
+
+
+def _route_after_supervisor(state: AgentState) -> str:
+    """Skip the agents when the supervisor could not resolve the company."""
+    return "resolved" if state.get("company_id") else "unresolved"
 
 
 def create_workflow():
@@ -20,12 +32,14 @@ def create_workflow():
     Create and compile the multi-agent workflow.
     
     The workflow follows this sequence:
-    1. supervisor -> Parse query, extract company_id
+    1. supervisor -> Parse query, extract company_id (ends the run when
+       the company cannot be resolved with confidence)
     2. financial_agent -> Get financial data
     3. earnings_call_agent -> Get earnings call summaries
     4. news_agent -> Get recent news
     5. supply_chain_agent -> Analyze supply chain
     6. reporter -> Generate final report
+    7. evaluator -> Check the report against the source data
     
     Returns:
         Compiled LangGraph workflow
@@ -33,22 +47,36 @@ def create_workflow():
     # Create the state graph
     workflow = StateGraph(AgentState)
     
-    # Add nodes (each agent)
+    # Add nodes (each agent). Data agents are memoized on company,
+    # query and data version when NODE_CACHE is set (tools.node_cache).
     workflow.add_node("supervisor", supervisor_node)
-    workflow.add_node("financial_agent", financial_analyst_node)
-    workflow.add_node("earnings_call_agent", earnings_call_analyst_node)
-    workflow.add_node("news_agent", news_agent_node)
-    workflow.add_node("supply_chain_agent", supply_chain_expert_node)
+    workflow.add_node("financial_agent", memoize_node(
+        "financial_agent", financial_analyst_node, ["company_id"], ["financials"]
+    ))
+    workflow.add_node("earnings_call_agent", memoize_node(
+        "earnings_call_agent", earnings_call_analyst_node, ["company_id", "query"], ["earnings_calls", "vector_index"]
+    ))
+    workflow.add_node("news_agent", memoize_node(
+        "news_agent", news_agent_node, ["company_id", "query"], ["news", "vector_index"]
+    ))
+    workflow.add_node("supply_chain_agent", memoize_node(
+        "supply_chain_agent", supply_chain_expert_node, ["company_id"], ["supply_chain_graph"],
+        cacheable=_llm_succeeded
+    ))
     workflow.add_node("reporter", reporter_node)
+    workflow.add_node("evaluator", evaluator_node)
     
     # Define edges (sequential execution)
     workflow.set_entry_point("supervisor")
-    workflow.add_edge("supervisor", "financial_agent")
+    workflow.add_conditional_edges(
+        "supervisor", _route_after_supervisor, {"resolved": "financial_agent", "unresolved": END}
+    )
     workflow.add_edge("financial_agent", "earnings_call_agent")
     workflow.add_edge("earnings_call_agent", "news_agent")
     workflow.add_edge("news_agent", "supply_chain_agent")
     workflow.add_edge("supply_chain_agent", "reporter")
-    workflow.add_edge("reporter", END)
+    workflow.add_edge("reporter", "evaluator")
+    workflow.add_edge("evaluator", END)
     
     # Compile the graph
     return workflow.compile()
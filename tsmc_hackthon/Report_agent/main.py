@@ -12,14 +12,17 @@ Usage:
 
 import sys
 from graph import app
+from llm_config import logger
+from tools.report_archive import ENABLED as ARCHIVE_ENABLED, get_archive
 
 
-def run_analysis(query: str) -> str:
+def run_analysis(query: str, archive: bool = ARCHIVE_ENABLED) -> str:
     """
     Run the multi-agent analysis pipeline.
     
     Args:
         query: User's natural language query
+        archive: Store the report in the report archive (tools.report_archive)
     
     Returns:
         Final Markdown report
@@ -28,13 +31,16 @@ def run_analysis(query: str) -> str:
     initial_state = {
         "query": query,
         "company_id": "",
+        "resolution": None,
         "basic_info": None,
         "finance_results": None,
         "earnings_call_summary": None,
         "news_summary": None,
         "supply_chain_analysis": None,
         "validation_status": None,
-        "final_report": None
+        "validation": None,
+        "final_report": None,
+        "cache_hits": []
     }
     
     # Run the workflow
@@ -45,15 +51,25 @@ def run_analysis(query: str) -> str:
     
     # Execute each step and track progress
     final_state = None
+    company_id = ""
     for step in app.stream(initial_state):
         # Save the latest state
         final_state = step
         
         # Print progress
         for node_name, node_output in step.items():
-            print(f"✅ {node_name} 完成")
+            cached = " (cache hit)" if node_name in (node_output or {}).get("cache_hits", []) else ""
+            print(f"✅ {node_name} 完成{cached}")
             if node_name == "supervisor":
-                print(f"   └─ 目標公司: {node_output.get('basic_info', {}).get('name', 'N/A')}")
+                company_id = node_output.get("company_id", "")
+                if company_id:
+                    print(f"   └─ 目標公司: {node_output.get('basic_info', {}).get('name', 'N/A')}")
+                else:
+                    print("   └─ 無法確定目標公司，未執行分析")
+            if node_name == "evaluator" and node_output.get("validation"):
+                validation = node_output["validation"]
+                supported = validation["checked"] - validation["flagged"]
+                print(f"   └─ 查核: {supported}/{validation['checked']} 項陳述有資料依據")
     
     print(f"\n{'='*60}")
     print(f"📊 報告生成完成")
@@ -64,11 +80,37 @@ def run_analysis(query: str) -> str:
         # The last step should be the reporter node
         for node_name, node_output in final_state.items():
             if "final_report" in node_output:
-                return node_output.get("final_report", "Error: No report generated.")
+                report = node_output.get("final_report", "Error: No report generated.")
+                if archive and company_id and not report.startswith("Error"):
+                    archive_report(report, company_id, query)
+                return report
     
     return "Error: No report generated."
 
 
+def archive_report(report: str, company_id: str, query: str) -> None:
+    """
+    Store a report in the report archive and print how it differs from
+    the company's previous report. Archive errors are logged, not raised.
+    """
+    try:
+        archive = get_archive()
+        entry = archive.put(report, company_id, query)
+        diff = archive.diff(entry["run_id"])
+    except Exception as e:
+        logger.error(f"Failed to archive report: {e}")
+        return
+    if diff is None:
+        change = "first report for this company"
+    else:
+        # Skip the ---/+++ file header lines
+        lines = diff.splitlines()[2:]
+        added = sum(1 for line in lines if line.startswith("+"))
+        removed = sum(1 for line in lines if line.startswith("-"))
+        change = f"+{added}/-{removed} lines vs previous" if diff else "identical to previous"
+    print(f"🗄️ 報告已封存: run #{entry['run_id']} ({change})")
+
+
 def main():
     """Main entry point."""
     # Get query from command line or use default
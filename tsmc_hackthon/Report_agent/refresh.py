@@ -0,0 +1,326 @@
+"""
+Scheduled Report Refresh
+
+Keeps one report per covered company up to date, regenerating only the
+reports whose data changed. For every company the scheduler records what
+its last report was built from, in data/refresh_manifest.json:
+
+- files: the version (content hash) of each dataset the report reads;
+- records: a digest of every record the agents read, fetched with the
+  same calls and arguments the agents use: the financial table's quarters
+  and changes, the latest-quarter summary and the peer statistics; the
+  news articles in the report's window, by ID; the selected earnings
+  calls, by date; and the graph neighborhood (the company's node, its
+  related companies and its risk transmission paths), by company.
+
+On each tick, datasets whose files changed are reloaded, and a company's
+records are re-read only for the kinds of data whose files changed.
+Reports whose records differ (or that were never built, or whose file is
+missing) are regenerated; the others are left alone, so a news article
+about two companies rebuilds those two reports, not all of them. Within
+a rebuilt report, the section cache still skips the LLM for unchanged
+sections.
+
+Code and prompt changes are not tracked; use --force after those.
+
+Usage:
+    python refresh.py --dry-run              # list what would rebuild, and why
+    python refresh.py                        # one tick
+    python refresh.py --interval 3600        # tick every hour until stopped
+    python refresh.py 2330 NVDA --force      # rebuild some companies regardless
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from agents.earnings_call import EARNINGS_CALL_LIMIT
+from agents.news import NEWS_LIMIT, NEWS_WINDOW_DAYS
+from agents.reporter import FINANCIAL_TABLE_QUARTERS
+from main import run_analysis
+from tools.graph_reader import get_node_by_id, get_related_companies, get_risk_transmission
+from tools.hot_reload import check_for_changes, get_data_versions
+from tools.job_queue import COVERAGE_QUERY, coverage_jobs
+from tools.mock_bigquery import get_financial_store, query_financial_data
+from tools.mock_rag import query_earnings_calls, query_recent_news
+from tools.peer_stats import get_peer_stats
+from tools.section_cache import section_key
+from worker import FAILED_REPORT_PREFIXES
+
+
+MANIFEST_PATH = Path(__file__).parent / "data" / "refresh_manifest.json"
+
+# Kind of dependency -> datasets whose files it is read from
+DEPENDENCY_DATASETS: Dict[str, List[str]] = {
+    "financials": ["financials", "financials_extended", "peer_stats"],
+    "news": ["news", "vector_index"],
+    "earnings_calls": ["earnings_calls", "vector_index"],
+    "graph": ["supply_chain_graph"],
+}
+
+
+def _digest(kind: str, key: str, value) -> str:
+    return section_key(f"{kind}/{key}", value)[:16]
+
+
+def read_records(kind: str, company_id: str, query: str) -> Dict[str, str]:
+    """
+    Digests of the records of one kind a company's report reads.
+    
+    Args:
+        kind: A key of DEPENDENCY_DATASETS
+        company_id: Company ID
+        query: The report's query (news and earnings calls are ranked by it)
+    
+    Returns:
+        Dict of record key (quarter, news ID, call date, company ID) ->
+        digest of the record's content.
+    """
+    records: Dict[str, object] = {}
+    if kind == "financials":
+        store = get_financial_store()
+        table = store.company_table(company_id, FINANCIAL_TABLE_QUARTERS)
+        if table is not None:
+            for q, quarter in enumerate(table["quarters"]):
+                records[quarter] = {metric: values[q] for metric, values in table["values"].items()}
+            latest_changes = store.get(company_id).get("latest_changes", {})
+            records["changes"] = {"qoq": table["qoq"], "yoy": table["yoy"], "latest": latest_changes}
+        records["summary"] = query_financial_data(company_id)
+        records["peers"] = get_peer_stats().company(company_id)
+    elif kind == "news":
+        for article in query_recent_news(company_id, days=NEWS_WINDOW_DAYS, limit=NEWS_LIMIT, query=query):
+            records[article.get("id") or article.get("title", "")] = article
+    elif kind == "earnings_calls":
+        for call in query_earnings_calls(company_id, limit=EARNINGS_CALL_LIMIT, query=query):
+            records[call.get("date") or call.get("title", "")] = call
+    elif kind == "graph":
+        records[company_id] = get_node_by_id(company_id)
+        for relation, companies in get_related_companies(company_id).items():
+            for company in companies:
+                records.setdefault(company["id"], {})[relation] = company
+        for direction, companies in get_risk_transmission(company_id, max_depth=3).items():
+            for company in companies:
+                records.setdefault(company["id"], {})[direction] = company
+    else:
+        raise ValueError(f"Unknown dependency kind '{kind}'")
+    return {key: _digest(kind, key, value) for key, value in records.items()}
+
+
+def dataset_versions() -> Dict[str, str]:
+    """Current version of every dataset reports depend on (loads them if needed)."""
+    return get_data_versions(sorted({name for names in DEPENDENCY_DATASETS.values() for name in names}))
+
+
+def diff_records(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    """Record keys added, removed and changed between two digest dicts."""
+    return {
+        "added": [key for key in new if key not in old],
+        "removed": [key for key in old if key not in new],
+        "changed": [key for key in new if key in old and old[key] != new[key]],
+    }
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict:
+    """The refresh manifest ({'companies': {company_id: entry}}), empty if missing."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"companies": {}}
+
+
+def save_manifest(manifest: Dict, path: Path = MANIFEST_PATH) -> None:
+    """Write the manifest atomically (temporary file, then rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".refresh_manifest.", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def plan_refresh(jobs: List[Dict], manifest: Dict, force: bool = False) -> List[Dict]:
+    """
+    Decide which reports need regenerating.
+    
+    Args:
+        jobs: Coverage jobs ({'company_id', 'query'})
+        manifest: load_manifest() output
+        force: Rebuild every report
+    
+    Returns:
+        One plan per job: 'company_id', 'query', 'rebuild', 'reason'
+        ("new", "query", "missing", "data", "forced" or "" when fresh),
+        'changes' (kind -> diff_records() output, for changed kinds),
+        'files' and 'records' (the dependencies the report will be built
+        from).
+    """
+    versions = dataset_versions()
+    plans = []
+    for job in jobs:
+        company_id, query = job["company_id"], job["query"]
+        entry = manifest["companies"].get(company_id)
+        same_query = entry is not None and entry.get("query") == query
+        
+        records: Dict[str, Dict[str, str]] = {}
+        changes: Dict[str, Dict[str, List[str]]] = {}
+        for kind, names in DEPENDENCY_DATASETS.items():
+            old = entry["records"].get(kind) if same_query else None
+            # Files unchanged since the last build: the records are too
+            if old is not None and all(entry["files"].get(name) == versions[name] for name in names):
+                records[kind] = old
+                continue
+            records[kind] = read_records(kind, company_id, query)
+            if old is not None:
+                diff = diff_records(old, records[kind])
+                if any(diff.values()):
+                    changes[kind] = diff
+        
+        if entry is None:
+            reason = "new"
+        elif not same_query:
+            reason = "query"
+        elif not Path(entry.get("report", "")).is_file():
+            reason = "missing"
+        elif changes:
+            reason = "data"
+        else:
+            reason = "forced" if force else ""
+        plans.append({
+            "company_id": company_id,
+            "query": query,
+            "rebuild": bool(reason),
+            "reason": reason,
+            "changes": changes,
+            "files": {name: versions[name] for names in DEPENDENCY_DATASETS.values() for name in names},
+            "records": records,
+        })
+    return plans
+
+
+def write_report(out_dir: Path, company_id: str, report: str) -> Path:
+    """Write a company's report atomically to out_dir/<company_id>.md."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{company_id}.md"
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(report, encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def run_plans(plans: List[Dict], manifest: Dict, out_dir: Path, manifest_path: Path = MANIFEST_PATH) -> Dict[str, int]:
+    """
+    Regenerate the reports that need it and record their dependencies.
+    
+    The manifest is saved after every report, so an interrupted tick
+    keeps the reports it finished. A failed report keeps its old entry
+    and is retried on the next tick.
+    
+    Returns:
+        Dict with 'rebuilt', 'failed' and 'fresh' counts.
+    """
+    counts = {"rebuilt": 0, "failed": 0, "fresh": 0}
+    stale = [plan for plan in plans if plan["rebuild"]]
+    counts["fresh"] = len(plans) - len(stale)
+    for number, plan in enumerate(stale, start=1):
+        company_id = plan["company_id"]
+        report = run_analysis(plan["query"])
+        if report.startswith(FAILED_REPORT_PREFIXES):
+            counts["failed"] += 1
+            print(f"❌ [{number}/{len(stale)}] {company_id}: {report.splitlines()[0]}")
+            continue
+        path = write_report(out_dir, company_id, report)
+        manifest["companies"][company_id] = {
+            "query": plan["query"],
+            "report": str(path),
+            "refreshed_at": datetime.now().isoformat(timespec="seconds"),
+            "files": plan["files"],
+            "records": plan["records"],
+        }
+        save_manifest(manifest, manifest_path)
+        counts["rebuilt"] += 1
+        print(f"💾 [{number}/{len(stale)}] {path}")
+    return counts
+
+
+def format_plan(plans: List[Dict]) -> str:
+    """Which reports would rebuild, and the records that changed."""
+    stale = [plan for plan in plans if plan["rebuild"]]
+    lines = [f"🔄 {len(stale)} of {len(plans)} reports would rebuild"]
+    for plan in stale:
+        detail = []
+        for kind, diff in plan["changes"].items():
+            parts = [f"{sign}{key}" for sign, keys in (("+", diff["added"]), ("-", diff["removed"]), ("~", diff["changed"]))
+                     for key in keys]
+            detail.append(f"{kind} {' '.join(parts)}")
+        lines.append(f"  {plan['company_id']:<8} {plan['reason']:<8} {'; '.join(detail)}")
+    return "\n".join(lines)
+
+
+def tick(
+    company_ids: Optional[List[str]] = None,
+    query: str = COVERAGE_QUERY,
+    out_dir: Path = Path("reports") / "latest",
+    dry_run: bool = False,
+    force: bool = False,
+    manifest_path: Path = MANIFEST_PATH,
+) -> List[Dict]:
+    """
+    One refresh pass: reload changed data files, plan, and (unless
+    dry_run) regenerate the stale reports.
+    
+    Args:
+        company_ids: Companies to cover (default: every graph company)
+        query: Query template; {name} and {company_id} are filled in
+        out_dir: Directory the reports are written to
+        dry_run: Only print what would rebuild
+        force: Rebuild every covered report
+        manifest_path: Where dependencies are recorded
+    
+    Returns:
+        The plans (see plan_refresh()).
+    """
+    reloaded = check_for_changes()
+    if reloaded:
+        print(f"📂 Reloaded: {', '.join(reloaded)}")
+    manifest = load_manifest(manifest_path)
+    plans = plan_refresh(coverage_jobs(company_ids, query), manifest, force)
+    print(format_plan(plans))
+    if not dry_run:
+        counts = run_plans(plans, manifest, out_dir, manifest_path)
+        print(f"✅ {counts['rebuilt']} rebuilt, {counts['fresh']} up to date, {counts['failed']} failed")
+    return plans
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Regenerate the reports whose data changed.")
+    parser.add_argument("company_ids", nargs="*", help="Companies to cover (default: every graph company)")
+    parser.add_argument("--query", default=COVERAGE_QUERY, help="Query template ({name}, {company_id})")
+    parser.add_argument("--out", type=Path, default=Path("reports") / "latest", help="Output directory")
+    parser.add_argument("--dry-run", action="store_true", help="List what would rebuild without running it")
+    parser.add_argument("--force", action="store_true", help="Rebuild every covered report")
+    parser.add_argument("--interval", type=float, default=None, help="Tick every N seconds until stopped")
+    args = parser.parse_args(argv)
+    
+    company_ids = args.company_ids or None
+    try:
+        while True:
+            tick(company_ids, args.query, args.out, args.dry_run, args.force)
+            if args.interval is None:
+                break
+            # Forced rebuilds happen on the first tick only
+            args.force = False
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopped", file=sys.stderr)
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+BM25 Keyword Index
+
+This module provides lexical retrieval to complement the vector index.
+Financial questions often hinge on exact tokens ("CoWoS", "N2", "2nm",
+ticker IDs) that hashed embeddings blur together; BM25 scores those
+exact matches directly.
+
+Text is tokenized with tools.tokenizer (whole Latin tokens, CJK unigrams
+and bigrams). Postings are kept per term as compact typed arrays that can
+be appended to, so documents can be added without rebuilding the index,
+and are scored with NumPy at query time. The postings and document
+lengths can be exported as flat arrays and merged back in, so an owner
+can persist them instead of re-tokenizing its texts on every load.
+"""
+
+import math
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.tokenizer import tokenize
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over an append-only list of texts.
+    
+    Documents are identified by their position (0, 1, 2, ...), which lines
+    up with the chunk positions of the VectorIndex that owns this index.
+    
+    Args:
+        k1: Term-frequency saturation
+        b: Document-length normalization
+    """
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._lengths = array("f")
+        self._total_length = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._lengths)
+    
+    def add(self, texts: Iterable[str]) -> None:
+        """
+        Append documents to the index.
+        
+        Args:
+            texts: Document texts, in position order
+        """
+        for text in texts:
+            position = len(self._lengths)
+            terms = Counter(tokenize(text))
+            length = float(sum(terms.values()))
+            self._lengths.append(length)
+            self._total_length += length
+            for term, count in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("i"), array("f"))
+                postings[0].append(position)
+                postings[1].append(count)
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Export the index as flat arrays (see add_arrays).
+        
+        Returns:
+            Dict with 'lengths' (per document), 'terms', 'offsets' (the
+            postings of terms[i] are offsets[i]:offsets[i + 1]),
+            'positions' and 'counts'.
+        """
+        terms = list(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(self._postings[t][0]) for t in terms], out=offsets[1:])
+        return {
+            "lengths": np.frombuffer(self._lengths, dtype=np.float32).copy(),
+            "terms": np.array(terms, dtype=str),
+            "offsets": offsets,
+            "positions": np.frombuffer(b"".join(self._postings[t][0].tobytes() for t in terms), dtype=np.int32),
+            "counts": np.frombuffer(b"".join(self._postings[t][1].tobytes() for t in terms), dtype=np.float32),
+        }
+    
+    def add_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Append the documents of an exported index (see to_arrays).
+        
+        Their positions are shifted to follow the documents already here,
+        as if their texts had been passed to add().
+        
+        Args:
+            arrays: Arrays returned by to_arrays (or loaded from its save)
+        """
+        base = len(self._lengths)
+        lengths = np.asarray(arrays["lengths"], dtype=np.float32)
+        self._lengths.frombytes(lengths.tobytes())
+        self._total_length += float(lengths.sum())
+        positions = np.asarray(arrays["positions"], dtype=np.int32) + np.int32(base)
+        counts = np.asarray(arrays["counts"], dtype=np.float32)
+        offsets = np.asarray(arrays["offsets"]).tolist()
+        for i, term in enumerate(np.asarray(arrays["terms"]).tolist()):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("i"), array("f"))
+            postings[0].frombytes(positions[offsets[i]:offsets[i + 1]].tobytes())
+            postings[1].frombytes(counts[offsets[i]:offsets[i + 1]].tobytes())
+    
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency of a term (0 if unseen)."""
+        postings = self._postings.get(term)
+        if postings is None:
+            return 0.0
+        df = len(postings[0])
+        return math.log(1.0 + (len(self._lengths) - df + 0.5) / (df + 0.5))
+    
+    def scores(self, query: str, candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score the documents that contain at least one query term.
+        
+        Args:
+            query: Query text
+            candidates: Sorted positions to restrict scoring to (None = all)
+        
+        Returns:
+            (positions, scores) arrays for matching documents, unsorted.
+        """
+        num_docs = len(self._lengths)
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self._postings]
+        if not num_docs or not terms:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        lengths = np.frombuffer(self._lengths, dtype=np.float32, count=num_docs)
+        average_length = self._total_length / num_docs or 1.0
+        accumulator = np.zeros(num_docs, dtype=np.float32)
+        matched = np.zeros(num_docs, dtype=bool)
+        for term in terms:
+            positions_buf, counts_buf = self._postings[term]
+            positions = np.frombuffer(positions_buf, dtype=np.int32, count=len(positions_buf))
+            counts = np.frombuffer(counts_buf, dtype=np.float32, count=len(counts_buf))
+            norm = self.k1 * (1.0 - self.b + self.b * lengths[positions] / average_length)
+            accumulator[positions] += self.idf(term) * counts * (self.k1 + 1.0) / (counts + norm)
+            matched[positions] = True
+        
+        if candidates is not None:
+            keep = np.zeros(num_docs, dtype=bool)
+            keep[candidates] = True
+            matched &= keep
+        positions = np.flatnonzero(matched)
+        return positions, accumulator[positions]
+    
+    def search(self, query: str, k: int = 10, candidates: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Top-k documents by BM25 score.
+        
+        Args:
+            query: Query text
+            k: Number of results
+            candidates: Sorted positions to restrict the search to (None = all)
+        
+        Returns:
+            List of (position, score), best first.
+        """
+        positions, scores = self.scores(query, candidates)
+        if k <= 0 or positions.size == 0:
+            return []
+        if scores.size > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(positions[i]), float(scores[i])) for i in top.tolist()]
+
+
+def reciprocal_rank_fusion(
+    rankings: Dict[str, Sequence[int]],
+    weights: Optional[Dict[str, float]] = None,
+    rrf_k: int = 60
+) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked lists with weighted reciprocal-rank fusion.
+    
+    Each item scores sum(weight / (rrf_k + rank)) over the lists it appears
+    in (rank starts at 1). RRF only uses ranks, so BM25 and cosine scores
+    do not need to be calibrated against each other.
+    
+    Args:
+        rankings: Retriever name -> item ids, best first
+        weights: Retriever name -> weight (default 1.0 each)
+        rrf_k: Rank offset; larger values flatten the head of each list
+    
+    Returns:
+        List of (item, fused score), best first. Ties keep first-seen order.
+    """
+    weights = weights or {}
+    fused: Dict[int, float] = {}
+    for name, ranking in rankings.items():
+        weight = weights.get(name, 1.0)
+        if weight <= 0:
+            continue
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda pair: -pair[1])
@@ -0,0 +1,388 @@
+"""
+Compact Supply Chain Graph Storage
+
+This module provides an array-backed representation of supply_chain_graph.json.
+Repeated strings (country, category, role, tags, relations, descriptions) are
+interned into tables and stored as small integer codes, and edges are kept in
+CSR (compressed sparse row) NumPy arrays. Callers get lightweight read-only
+node views instead of per-call dict copies.
+"""
+
+import pickle
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+# Node attributes stored in columnar form; anything else goes to `extras`
+_NODE_FIELDS = ("id", "name", "country", "category", "role", "tags")
+
+# Array attributes persisted as individual .npy files (memory-mappable)
+_ARRAY_FIELDS = (
+    "country_codes", "category_codes", "role_codes", "tag_indptr", "tag_codes",
+    "edge_src", "edge_dst", "edge_relation", "edge_description",
+    "out_indptr", "out_edges", "in_indptr", "in_edges",
+    "down_indptr", "down_edges", "down_nodes",
+    "up_indptr", "up_edges", "up_nodes",
+)
+# Python-object attributes persisted together in one pickle
+_OBJECT_FIELDS = (
+    "countries", "categories", "roles", "tags", "relations", "descriptions",
+    "ids", "names", "id_index", "name_index", "extras",
+)
+
+# Relation codes (small ints); unknown relations are interned after these
+RELATION_CLIENT = 0
+RELATION_SUPPLIER = 1
+RELATION_PARTNER = 2
+_BASE_RELATIONS = ("Client", "Supplier", "Partner")
+
+
+class StringTable:
+    """Interned string table mapping strings to dense integer codes."""
+    
+    __slots__ = ("_strings", "_codes")
+    
+    def __init__(self, initial: Tuple[str, ...] = ()):
+        self._strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in initial:
+            self.intern(value)
+    
+    def intern(self, value: str) -> int:
+        """Return the code for a string, adding it to the table if needed."""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(value)
+            self._codes[value] = code
+        return code
+    
+    def code(self, value: str) -> Optional[int]:
+        """Return the code for a string, or None if it was never interned."""
+        return self._codes.get(value)
+    
+    def __getitem__(self, code: int) -> str:
+        return self._strings[code]
+    
+    def __len__(self) -> int:
+        return len(self._strings)
+    
+    def nbytes(self) -> int:
+        """Approximate memory held by the table (strings + index)."""
+        return (
+            sys.getsizeof(self._strings)
+            + sys.getsizeof(self._codes)
+            + sum(sys.getsizeof(s) for s in self._strings)
+        )
+
+
+class NodeView(Mapping):
+    """
+    Read-only, dict-like view of one node in a CompactGraph.
+    
+    Supports the same access patterns as the original node dicts
+    (`node["name"]`, `node.get("tags", [])`, `dict(node)`, `{**node}`)
+    without materializing a dict per access.
+    """
+    
+    __slots__ = ("_graph", "_index")
+    
+    def __init__(self, graph: "CompactGraph", index: int):
+        self._graph = graph
+        self._index = index
+    
+    def _keys(self) -> Tuple[str, ...]:
+        extra = self._graph.extras.get(self._index)
+        return _NODE_FIELDS + tuple(extra) if extra else _NODE_FIELDS
+    
+    def __getitem__(self, key: str):
+        graph = self._graph
+        i = self._index
+        if key == "id":
+            return graph.ids[i]
+        if key == "name":
+            return graph.names[i]
+        if key == "country":
+            return graph.countries[int(graph.country_codes[i])]
+        if key == "category":
+            return graph.categories[int(graph.category_codes[i])]
+        if key == "role":
+            return graph.roles[int(graph.role_codes[i])]
+        if key == "tags":
+            start, end = graph.tag_indptr[i], graph.tag_indptr[i + 1]
+            return [graph.tags[code] for code in graph.tag_codes[start:end].tolist()]
+        extra = graph.extras.get(i)
+        if extra and key in extra:
+            return extra[key]
+        raise KeyError(key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+    
+    def __len__(self) -> int:
+        return len(self._keys())
+    
+    def __repr__(self) -> str:
+        return f"NodeView({dict(self)!r})"
+    
+    def __reduce__(self):
+        # Pickle as a plain dict so caches never serialize the whole graph
+        return (dict, (dict(self),))
+
+
+class RelatedNodeView(NodeView):
+    """NodeView that also carries the description of the connecting edge."""
+    
+    __slots__ = ("_description",)
+    
+    def __init__(self, graph: "CompactGraph", index: int, description: str):
+        super().__init__(graph, index)
+        self._description = description
+    
+    def _keys(self) -> Tuple[str, ...]:
+        return super()._keys() + ("relationship_description",)
+    
+    def __getitem__(self, key: str):
+        if key == "relationship_description":
+            return self._description
+        return super().__getitem__(key)
+
+
+class CompactGraph:
+    """
+    Array-backed supply chain graph.
+    
+    Nodes are addressed by dense integer index. Edges are stored once
+    (src, dst, relation code, description code) and indexed twice in CSR
+    form: `out_*` groups edges by source, `in_*` groups them by target.
+    Within each node the original file order of edges is preserved.
+    """
+    
+    def __init__(self, graph_data: Dict):
+        nodes = graph_data.get("nodes", [])
+        edges = graph_data.get("edges", [])
+        num_nodes = len(nodes)
+        
+        # Interned string tables
+        self.countries = StringTable()
+        self.categories = StringTable()
+        self.roles = StringTable()
+        self.tags = StringTable()
+        self.relations = StringTable(_BASE_RELATIONS)
+        self.descriptions = StringTable()
+        
+        # Node columns
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.id_index: Dict[str, int] = {}
+        self.name_index: Dict[str, int] = {}
+        self.extras: Dict[int, Dict] = {}
+        self.country_codes = np.empty(num_nodes, dtype=np.int32)
+        self.category_codes = np.empty(num_nodes, dtype=np.int32)
+        self.role_codes = np.empty(num_nodes, dtype=np.int32)
+        tag_counts = np.zeros(num_nodes, dtype=np.int64)
+        tag_codes: List[int] = []
+        
+        for i, node in enumerate(nodes):
+            node_id = node.get("id")
+            name = node.get("name", "")
+            self.ids.append(node_id)
+            self.names.append(name)
+            # Keep the first occurrence, matching the old linear scans
+            self.id_index.setdefault(node_id, i)
+            self.name_index.setdefault(name.lower(), i)
+            self.country_codes[i] = self.countries.intern(node.get("country", ""))
+            self.category_codes[i] = self.categories.intern(node.get("category", ""))
+            self.role_codes[i] = self.roles.intern(node.get("role", ""))
+            node_tags = node.get("tags", [])
+            tag_counts[i] = len(node_tags)
+            tag_codes.extend(self.tags.intern(tag) for tag in node_tags)
+            extra = {k: v for k, v in node.items() if k not in _NODE_FIELDS}
+            if extra:
+                self.extras[i] = extra
+        
+        self.tag_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(tag_counts, out=self.tag_indptr[1:])
+        self.tag_codes = np.asarray(tag_codes, dtype=np.int32)
+        
+        # Edge columns; edges pointing at unknown node IDs are dropped
+        src: List[int] = []
+        dst: List[int] = []
+        rel: List[int] = []
+        desc: List[int] = []
+        for edge in edges:
+            source_index = self.id_index.get(edge.get("source"))
+            target_index = self.id_index.get(edge.get("target"))
+            if source_index is None or target_index is None:
+                continue
+            src.append(source_index)
+            dst.append(target_index)
+            rel.append(self.relations.intern(edge.get("relation", "")))
+            desc.append(self.descriptions.intern(edge.get("description", "")))
+        
+        self.edge_src = np.asarray(src, dtype=np.int32)
+        self.edge_dst = np.asarray(dst, dtype=np.int32)
+        self.edge_relation = np.asarray(rel, dtype=np.int8 if len(self.relations) < 128 else np.int32)
+        self.edge_description = np.asarray(desc, dtype=np.int32)
+        
+        self.out_indptr, self.out_edges = self._build_csr(self.edge_src, num_nodes)
+        self.in_indptr, self.in_edges = self._build_csr(self.edge_dst, num_nodes)
+        
+        # Supply-flow CSR (goods move flow_from -> flow_to). A Client edge
+        # "A is a client of B" flows B -> A; every other relation flows
+        # source -> target.
+        is_client = self.edge_relation == RELATION_CLIENT
+        flow_from = np.where(is_client, self.edge_dst, self.edge_src).astype(np.int32)
+        flow_to = np.where(is_client, self.edge_src, self.edge_dst).astype(np.int32)
+        self.down_indptr, self.down_edges = self._build_csr(flow_from, num_nodes)
+        self.down_nodes = flow_to[self.down_edges]
+        self.up_indptr, self.up_edges = self._build_csr(flow_to, num_nodes)
+        self.up_nodes = flow_from[self.up_edges]
+    
+    def save(self, directory: Path) -> None:
+        """
+        Persist the graph as .npy arrays plus one pickle of the string tables.
+        
+        Args:
+            directory: Target directory (created if missing)
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for field in _ARRAY_FIELDS:
+            np.save(directory / f"{field}.npy", getattr(self, field), allow_pickle=False)
+        with open(directory / "tables.pickle", "wb") as f:
+            pickle.dump({field: getattr(self, field) for field in _OBJECT_FIELDS}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "CompactGraph":
+        """
+        Load a graph written by save().
+        
+        Args:
+            directory: Directory written by save()
+            mmap: Memory-map the arrays instead of reading them into RAM
+        
+        Returns:
+            CompactGraph backed by the stored arrays.
+        """
+        directory = Path(directory)
+        graph = cls.__new__(cls)
+        mmap_mode = "r" if mmap else None
+        for field in _ARRAY_FIELDS:
+            array = np.load(directory / f"{field}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            # Plain ndarray view of the mapping: np.memmap's Python-level
+            # __getitem__ makes scalar lookups in NodeView several times slower
+            setattr(graph, field, array.view(np.ndarray))
+        with open(directory / "tables.pickle", "rb") as f:
+            for field, value in pickle.load(f).items():
+                setattr(graph, field, value)
+        return graph
+    
+    @staticmethod
+    def _build_csr(keys: np.ndarray, num_nodes: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Group edge IDs by key node (stable, so file order is kept)."""
+        order = np.argsort(keys, kind="stable").astype(np.int32)
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=num_nodes), out=indptr[1:])
+        return indptr, order
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    @property
+    def num_edges(self) -> int:
+        return int(self.edge_src.shape[0])
+    
+    def index_of(self, node_id: str) -> Optional[int]:
+        """Return the dense index of a node ID, or None."""
+        return self.id_index.get(node_id)
+    
+    def view(self, index: int) -> NodeView:
+        """Return a NodeView for a node index."""
+        return NodeView(self, index)
+    
+    def related_view(self, index: int, edge_id: int) -> RelatedNodeView:
+        """Return a NodeView carrying the description of an edge."""
+        return RelatedNodeView(self, index, self.descriptions[int(self.edge_description[edge_id])])
+    
+    def out_edge_ids(self, index: int) -> np.ndarray:
+        """Edge IDs whose source is the node."""
+        return self.out_edges[self.out_indptr[index]:self.out_indptr[index + 1]]
+    
+    def in_edge_ids(self, index: int) -> np.ndarray:
+        """Edge IDs whose target is the node."""
+        return self.in_edges[self.in_indptr[index]:self.in_indptr[index + 1]]
+    
+    def flow_neighbors(self, index: int, direction: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Supply-flow neighbors of a node.
+        
+        Args:
+            index: Node index
+            direction: "downstream" (customers) or "upstream" (suppliers)
+        
+        Returns:
+            Tuple of (neighbor node indices, connecting edge IDs).
+        """
+        if direction == "downstream":
+            start, end = self.down_indptr[index], self.down_indptr[index + 1]
+            return self.down_nodes[start:end], self.down_edges[start:end]
+        start, end = self.up_indptr[index], self.up_indptr[index + 1]
+        return self.up_nodes[start:end], self.up_edges[start:end]
+    
+    def nodes_with(self, role: Optional[str] = None, category: Optional[str] = None) -> np.ndarray:
+        """Vectorized filter of node indices by role and/or category."""
+        mask = np.ones(len(self), dtype=bool)
+        if role is not None:
+            code = self.roles.code(role)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= self.role_codes == code
+        if category is not None:
+            code = self.categories.code(category)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= self.category_codes == code
+        return np.flatnonzero(mask)
+    
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Report approximate memory held by the graph, in bytes.
+        
+        Returns:
+            Dict with per-component sizes ('node_arrays', 'edge_arrays',
+            'string_tables', 'node_strings', 'indexes') and 'total'.
+        """
+        node_arrays = sum(a.nbytes for a in (
+            self.country_codes, self.category_codes, self.role_codes,
+            self.tag_indptr, self.tag_codes
+        ))
+        edge_arrays = sum(a.nbytes for a in (
+            self.edge_src, self.edge_dst, self.edge_relation, self.edge_description,
+            self.out_indptr, self.out_edges, self.in_indptr, self.in_edges,
+            self.down_indptr, self.down_edges, self.down_nodes,
+            self.up_indptr, self.up_edges, self.up_nodes
+        ))
+        string_tables = sum(t.nbytes() for t in (
+            self.countries, self.categories, self.roles,
+            self.tags, self.relations, self.descriptions
+        ))
+        node_strings = (
+            sys.getsizeof(self.ids) + sys.getsizeof(self.names)
+            + sum(sys.getsizeof(s) for s in self.ids)
+            + sum(sys.getsizeof(s) for s in self.names)
+        )
+        indexes = sys.getsizeof(self.id_index) + sys.getsizeof(self.name_index) + sys.getsizeof(self.extras)
+        usage = {
+            "node_arrays": node_arrays,
+            "edge_arrays": edge_arrays,
+            "string_tables": string_tables,
+            "node_strings": node_strings,
+            "indexes": indexes,
+        }
+        usage["total"] = sum(usage.values())
+        return usage
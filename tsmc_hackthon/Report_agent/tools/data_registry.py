@@ -0,0 +1,177 @@
+"""
+Data Registry
+
+Single entry point to every dataset the tools load. Each dataset is a
+hot-reloadable snapshot (tools.hot_reload.ReloadableDataset) owned by the
+tool module that parses it; importing this module registers all of them,
+so the registry can:
+
+- hand out any dataset by name (loaded lazily, once, under the
+  dataset's lock, and shared by every thread),
+- preload datasets at startup instead of on the first request,
+- report how much memory each loaded dataset holds and how long it took
+  to load.
+
+Usage:
+    python -m tools.data_registry            # load everything, print memory
+    python -m tools.data_registry news financials
+"""
+
+import importlib
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from tools.hot_reload import ReloadableDataset, get_datasets
+
+
+# Modules that own datasets; imported so every dataset is registered
+DATASET_MODULES = (
+    "tools.graph_reader",
+    "tools.mock_bigquery",
+    "tools.mock_rag",
+    "tools.warehouse",
+    "tools.peer_stats",
+    "tools.entity_resolver",
+)
+
+for _module in DATASET_MODULES:
+    importlib.import_module(_module)
+
+# Types whose contents are not counted (shared code and runtime objects)
+_SKIP_TYPES = (type, type(sys), type(len), type(lambda: None))
+
+
+def dataset_names() -> List[str]:
+    """Names of all registered datasets."""
+    return list(get_datasets())
+
+
+def _dataset(name: str) -> ReloadableDataset:
+    datasets = get_datasets()
+    if name not in datasets:
+        raise KeyError(f"Unknown dataset '{name}' (available: {', '.join(datasets)})")
+    return datasets[name]
+
+
+def get(name: str) -> Any:
+    """
+    Return the current snapshot of a dataset, loading it on first use.
+    
+    Args:
+        name: Dataset name (e.g. "financials_extended", "news")
+    
+    Returns:
+        The dataset snapshot.
+    """
+    return _dataset(name).get()
+
+
+def preload(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """
+    Load datasets now rather than on first use.
+    
+    Args:
+        names: Datasets to load (default: all)
+    
+    Returns:
+        Dict of dataset name -> load time in seconds.
+    """
+    names = list(names) if names is not None else dataset_names()
+    for name in names:
+        get(name)
+    return {name: _dataset(name).load_seconds for name in names}
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Approximate heap size of an object graph in bytes.
+    
+    Containers, instance attributes and slots are followed; each object
+    is counted once. NumPy arrays count their own buffer (views count the
+    array they view), so memory-mapped snapshot arrays are not counted
+    as heap.
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SKIP_TYPES):
+            continue
+        seen.add(id(item))
+        # Includes the buffer of arrays that own their data
+        total += sys.getsizeof(item)
+        if isinstance(item, np.ndarray):
+            if item.base is not None:
+                stack.append(item.base)
+            continue
+        if isinstance(item, (str, bytes, bytearray, int, float, bool)) or item is None:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+            for cls in type(item).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    if hasattr(item, slot):
+                        stack.append(getattr(item, slot))
+    return total
+
+
+def memory_usage(loaded_only: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Report memory held by each dataset.
+    
+    Datasets are sized independently, so objects shared between two
+    snapshots are counted in both.
+    
+    Args:
+        loaded_only: Skip datasets that have not been loaded (otherwise
+            they are loaded first)
+    
+    Returns:
+        Dict of dataset name -> {'bytes', 'load_seconds', 'version'}.
+    """
+    report = {}
+    for name, dataset in get_datasets().items():
+        if loaded_only and not dataset.is_loaded:
+            continue
+        report[name] = {
+            "bytes": deep_sizeof(dataset.get()),
+            "load_seconds": dataset.load_seconds,
+            "version": dataset.version,
+        }
+    return report
+
+
+def format_memory_report(report: Dict[str, Dict[str, Any]]) -> str:
+    """Render memory_usage() output as a text table."""
+    lines = [f"{'dataset':<22} {'memory':>10} {'load':>9}  version"]
+    for name, entry in sorted(report.items(), key=lambda kv: -kv[1]["bytes"]):
+        load = f"{entry['load_seconds'] * 1000:.1f} ms" if entry["load_seconds"] is not None else "-"
+        lines.append(f"{name:<22} {entry['bytes'] / 1024:>7.1f} KB {load:>9}  {entry['version']}")
+    total = sum(entry["bytes"] for entry in report.values())
+    lines.append(f"{'total':<22} {total / 1024:>7.1f} KB")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point: load datasets and print their memory use."""
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        preload(argv or None)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        sys.exit(1)
+    report = memory_usage()
+    print(format_memory_report({name: report[name] for name in (argv or report)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Disk-Backed LRU
+
+Two-tier key-value cache shared by the section cache
+(tools.section_cache) and the node cache (tools.node_cache): an
+in-memory LRU of serialized values, optionally backed by a directory
+with one file per entry under <directory>/<key[:2]>/<key><suffix>.
+
+Writes go to a temporary file that is renamed into place, so readers in
+other processes never see a partial entry. The disk tier is an LRU on
+file modification time: a hit refreshes it, entries unused for max_age
+seconds are dropped, and the least recently used entries are removed
+once the directory exceeds max_disk_bytes. Writers prune the directory
+on their first write and then every PRUNE_EVERY writes.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Disk writes between two prunes of the cache directory
+PRUNE_EVERY = 64
+
+
+class DiskLRU:
+    """
+    LRU of serialized values, optionally backed by a directory.
+    
+    Args:
+        directory: Disk tier directory (None for memory only)
+        suffix: File name suffix of the entries, e.g. ".md"
+        dumps: Value -> bytes
+        loads: Bytes -> value (called on every hit, so mutable values
+            come back as fresh copies)
+        max_entries: Entries kept in memory
+        max_disk_bytes: Size the disk tier is pruned down to
+        max_age: Seconds an unused disk entry is kept
+        label: Name used in log messages
+    """
+    
+    def __init__(
+        self,
+        directory: Optional[Path],
+        suffix: str,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes], Any],
+        max_entries: int,
+        max_disk_bytes: int,
+        max_age: float,
+        label: str = "cache"
+    ):
+        self.directory = Path(directory) if directory is not None else None
+        self.suffix = suffix
+        self.dumps = dumps
+        self.loads = loads
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self.label = label
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Prune on the first write of the process, then every PRUNE_EVERY
+        self._writes_until_prune = 1
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+    
+    def get(self, key: str) -> Optional[Any]:
+        """The cached value, or None."""
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+        if blob is None:
+            blob = self._read(key)
+            if blob is None:
+                return None
+            self._remember(key, blob)
+        try:
+            return self.loads(blob)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable {self.label} entry {key[:12]}: {e}")
+            return None
+    
+    def put(self, key: str, value: Any) -> None:
+        """Store a value."""
+        blob = self.dumps(value)
+        self._remember(key, blob)
+        if self.directory is None:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_name, path)
+        except OSError as e:
+            logger.warning(f"Could not write {self.label} entry {key[:12]}: {e}")
+            return
+        with self._lock:
+            self._writes_until_prune -= 1
+            due = self._writes_until_prune <= 0
+            if due:
+                self._writes_until_prune = PRUNE_EVERY
+        if due:
+            self.prune()
+    
+    def prune(self) -> int:
+        """
+        Drop expired disk entries, then the least recently used ones until
+        the disk tier fits in max_disk_bytes.
+        
+        Returns:
+            Number of entries removed.
+        """
+        if self.directory is None:
+            return 0
+        now = time.time()
+        entries = []
+        for path in self.directory.glob(f"*/*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Removed by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_disk_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not prune {self.label} entry {path.name}: {e}")
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} {self.label} entries")
+        return removed
+    
+    def clear(self) -> None:
+        """Drop the memory tier (prune() trims the disk tier)."""
+        with self._lock:
+            self._memory.clear()
+    
+    def _read(self, key: str) -> Optional[bytes]:
+        """An entry's bytes from the disk tier (None if missing or expired)."""
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                return None
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            # Mark the entry as recently used for pruning
+            os.utime(path)
+        except OSError:
+            pass  # Read-only cache: keep serving without LRU updates
+        return blob
+    
+    def _remember(self, key: str, blob: bytes) -> None:
+        with self._lock:
+            self._memory[key] = blob
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
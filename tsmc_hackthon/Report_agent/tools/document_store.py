@@ -0,0 +1,170 @@
+"""
+Ingested Document Store
+
+This module keeps news articles and earnings calls added after the base
+data files (data/news.json, data/earnings_calls.json) were written, and
+pages extracted from PDFs. New documents are appended to JSONL logs under
+data/ingest/ instead of rewriting the base files:
+
+    data/ingest/news.jsonl             one article per line
+    data/ingest/news.hashes            content hash of every stored line
+    data/ingest/earnings_calls.jsonl   one call per line (with company_id)
+    data/ingest/earnings_calls.hashes
+    data/ingest/pdf_pages.jsonl        one extracted PDF page per line
+    data/ingest/pdf_pages.hashes
+
+The loaders in tools.mock_rag read the base file plus its log, so the
+hot-reload watcher picks up new documents like any other data change.
+Writers take an exclusive lock on the store, so concurrent ingestions
+cannot store the same document twice.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single writer assumed
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = Path(__file__).parent.parent / "data" / "ingest"
+KINDS = ("news", "earnings_calls", "pdf_pages")
+
+# Bookkeeping fields that are not part of a document's content
+_NON_CONTENT_FIELDS = {"content_hash", "source_file", "ingested_at"}
+
+
+def content_hash(record: Dict) -> str:
+    """
+    Hash a document's content, independent of key order and bookkeeping fields.
+    
+    Args:
+        record: Document dict
+    
+    Returns:
+        Hex SHA-256 digest.
+    """
+    content = {k: v for k, v in record.items() if k not in _NON_CONTENT_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def store_path(kind: str, store_dir: Path = STORE_DIR) -> Path:
+    """Path of the JSONL log for a document kind (one of KINDS)."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown document kind: {kind}")
+    return Path(store_dir) / f"{kind}.jsonl"
+
+
+def read_documents(kind: str, store_dir: Path = STORE_DIR) -> List[Dict]:
+    """
+    Read all ingested documents of a kind, in ingestion order.
+    
+    A truncated last line (e.g. from an interrupted write) is skipped.
+    
+    Args:
+        kind: Document kind (one of KINDS)
+        store_dir: Store directory
+    
+    Returns:
+        List of document dicts (empty if nothing was ingested).
+    """
+    path = store_path(kind, store_dir)
+    documents = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    documents.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable line {number} in {path}")
+    except FileNotFoundError:
+        pass
+    return documents
+
+
+def read_hashes(kind: str, store_dir: Path = STORE_DIR) -> Set[str]:
+    """Return the content hashes of all stored documents of a kind."""
+    try:
+        with open(Path(store_dir) / f"{kind}.hashes", "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+@contextlib.contextmanager
+def locked(store_dir: Path = STORE_DIR) -> Iterator[None]:
+    """Hold the store's exclusive writer lock."""
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    with open(store_dir / ".lock", "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def append_documents(kind: str, records: List[Dict], store_dir: Path = STORE_DIR) -> None:
+    """
+    Append documents to the store. Caller must hold locked(store_dir).
+    
+    Each record must already carry its 'content_hash'. The document log is
+    flushed to disk before the hash list, so a crash in between leaves a
+    document that is stored but not yet marked as seen, never the reverse.
+    
+    Args:
+        kind: Document kind (one of KINDS)
+        records: Documents to append
+        store_dir: Store directory
+    """
+    if not records:
+        return
+    path = store_path(kind, store_dir)
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    with open(Path(store_dir) / f"{kind}.hashes", "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(record["content_hash"] + "\n")
+
+
+def merge_earnings_calls(base: Dict[str, List[Dict]], calls: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Merge ingested earnings calls into the per-company call lists.
+    
+    The base data is not modified. Each company's list stays latest first;
+    an ingested call with the same company and date replaces the base one.
+    
+    Args:
+        base: Dict of company_id -> list of calls (latest first)
+        calls: Ingested calls, each with a 'company_id'
+    
+    Returns:
+        New dict of company_id -> list of calls.
+    """
+    merged = dict(base)
+    by_company: Dict[str, List[Dict]] = {}
+    for call in calls:
+        by_company.setdefault(call["company_id"], []).append(
+            {k: v for k, v in call.items() if k != "company_id"}
+        )
+    for company_id, new_calls in by_company.items():
+        new_dates = {c.get("date") for c in new_calls}
+        existing = [c for c in merged.get(company_id, []) if c.get("date") not in new_dates]
+        merged[company_id] = sorted(existing + new_calls, key=lambda c: c.get("date") or "", reverse=True)
+    return merged
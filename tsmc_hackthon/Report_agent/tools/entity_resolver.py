@@ -0,0 +1,347 @@
+"""
+Entity Resolver
+
+Finds company mentions in a query with an Aho-Corasick automaton built,
+at load time, from every graph node's ID and name plus the alias table in
+data/company_aliases.json (Chinese and English names, tickers, ...).
+
+One pass over the query reports every match with its position, so the
+cost depends on the query length, not on the number of aliases. Latin
+aliases only match whole words ("amd" does not match inside "diamond");
+CJK aliases match anywhere. Matching is case-insensitive.
+
+When nothing matches exactly (typos and variants such as "Taiwan Semi"
+or "台積"), a character-trigram index over the same aliases scores spans
+of the query. `resolve_with_confidence()` accepts a fuzzy match only if
+it is strong and clearly ahead of the next company; otherwise it reports
+low confidence together with the candidates, instead of guessing. Query
+spans that begin or end with a common English word ("Tell me", "about")
+are not scored, so ordinary words do not produce candidates ("tell" is
+not a near match for Tokyo Electron's "TEL"); a query without candidates
+names no company.
+
+The automaton is a hot-reloadable dataset over the alias file that
+depends on the graph dataset, so companies added to
+supply_chain_graph.json are recognized after the next reload without
+code changes.
+"""
+
+import json
+import re
+from collections import Counter, deque
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from tools.graph_reader import GRAPH_DATASET, get_graph
+from tools.hot_reload import ReloadableDataset
+
+
+_ALIASES_PATH = Path(__file__).parent.parent / "data" / "company_aliases.json"
+
+# Fuzzy matching: candidates scoring below FUZZY_MIN_SCORE are dropped; the
+# best one is accepted if it scores FUZZY_ACCEPT_SCORE and leads the next
+# company by FUZZY_MARGIN (Dice coefficient of character trigrams)
+FUZZY_MIN_SCORE = 0.45
+FUZZY_ACCEPT_SCORE = 0.55
+FUZZY_MARGIN = 0.1
+FUZZY_CANDIDATES = 5
+
+# Longest CJK span of the query compared with the aliases
+_MAX_CJK_SPAN = 6
+# Latin words per query span
+_MAX_LATIN_WORDS = 3
+
+_QUERY_TOKEN = re.compile(r"[a-z0-9][a-z0-9&.+\-]*|[\u3400-\u9fff\uf900-\ufaff]+")
+
+# English stopwords and request verbs; a Latin span starting or ending with
+# one is not compared with the aliases
+STOPWORDS = frozenset("""
+    a about above after again against all am an and any are as at be because been before being
+    below between both but by can could did do does doing down during each few for from further
+    had has have having he her here hers herself him himself his how i if in into is it its itself
+    just me more most my myself no nor not now of off on once only or other our ours ourselves out
+    over own same she should so some such than that the their theirs them themselves then there
+    these they this those through to too under until up very was we were what when where which
+    while who whom why will with would you your yours yourself yourselves
+    analyse analyze compare describe explain generate give help list please provide report say
+    show summarise summarize tell understand
+""".split())
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a string padded with two leading blanks and one trailing blank."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from character trigrams to strings.
+    
+    Args:
+        strings: Indexed strings; a string's index in this sequence
+            identifies it in the results
+    """
+    
+    def __init__(self, strings: Sequence[str]):
+        self.sizes: List[int] = []
+        self.postings: Dict[str, List[int]] = {}
+        for index, string in enumerate(strings):
+            grams = trigrams(string)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(index)
+    
+    def search(self, text: str, min_score: float) -> List[Tuple[int, float]]:
+        """
+        Indexed strings similar to text.
+        
+        Returns:
+            (string index, Dice coefficient of the trigram sets) for every
+            string scoring at least min_score.
+        """
+        grams = trigrams(text)
+        postings = self.postings
+        # Counter counts an iterable in C
+        shared = Counter(chain.from_iterable(postings[gram] for gram in grams if gram in postings))
+        # Dice >= min_score needs at least this many shared trigrams
+        min_shared = min_score * (len(grams) + 1) / 2
+        sizes = self.sizes
+        results = []
+        for index, count in shared.items():
+            if count >= min_shared:
+                score = 2.0 * count / (len(grams) + sizes[index])
+                if score >= min_score:
+                    results.append((index, score))
+        return results
+
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher.
+    
+    Args:
+        patterns: Patterns to find; a pattern's index in this sequence
+            identifies it in the matches
+    """
+    
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(patterns)
+        # Trie: goto[state][char] -> state, out[state] -> pattern indexes
+        self.goto: List[Dict[str, int]] = [{}]
+        self.out: List[List[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.out.append([])
+                state = next_state
+            if pattern:
+                self.out[state].append(index)
+        
+        # Failure links, breadth first; outputs of the fallback state are
+        # merged in so matching never walks the failure chain for output
+        self.fail: List[int] = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.out[next_state] = self.out[next_state] + self.out[self.fail[next_state]]
+    
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Scan text once.
+        
+        Yields:
+            (start, end, pattern index) for every occurrence of every
+            pattern, ordered by end position.
+        """
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                yield position + 1 - len(patterns[index]), position + 1, index
+
+
+class EntityResolver:
+    """
+    Resolves company mentions in free text.
+    
+    Args:
+        aliases: Alias -> company ID; earlier entries win when an alias
+            is listed for two companies
+    """
+    
+    def __init__(self, aliases: Dict[str, str]):
+        table: Dict[str, str] = {}
+        for alias, company_id in aliases.items():
+            key = alias.strip().lower()
+            if key:
+                table.setdefault(key, company_id)
+        self.aliases = list(table)
+        self.company_ids = [table[alias] for alias in self.aliases]
+        # Whole-word matching for aliases that start/end with a Latin letter or digit
+        self.word_bounded = [(_is_word_char(a[0]), _is_word_char(a[-1])) for a in self.aliases]
+        self.matcher = AhoCorasick(self.aliases)
+        self.fuzzy_index = TrigramIndex(self.aliases)
+        # CJK spans are only compared when they start like some alias
+        self.cjk_initials = {a[0] for a in self.aliases if not a[0].isascii()}
+    
+    def __len__(self) -> int:
+        return len(self.aliases)
+    
+    def find_all(self, query: str) -> List[Dict]:
+        """
+        Every company mention in the query.
+        
+        Args:
+            query: Free text
+        
+        Returns:
+            List of {'company_id', 'alias', 'start', 'end'} sorted by
+            position (positions index the lower-cased query), longest
+            first at the same start.
+        """
+        text = query.lower()
+        matches = []
+        for start, end, index in self.matcher.iter_matches(text):
+            bounded_start, bounded_end = self.word_bounded[index]
+            if bounded_start and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if bounded_end and end < len(text) and _is_word_char(text[end]):
+                continue
+            matches.append({
+                "company_id": self.company_ids[index],
+                "alias": self.aliases[index],
+                "start": start,
+                "end": end,
+            })
+        matches.sort(key=lambda m: (m["start"], -m["end"]))
+        return matches
+    
+    def resolve(self, query: str) -> Optional[str]:
+        """The company mentioned first in the query (longest match at that position), or None."""
+        matches = self.find_all(query)
+        return matches[0]["company_id"] if matches else None
+    
+    def _query_spans(self, text: str) -> Iterator[str]:
+        """Spans of the lower-cased query that may name a company."""
+        tokens = [m.group() for m in _QUERY_TOKEN.finditer(text)]
+        for i, token in enumerate(tokens):
+            if token[0].isascii():
+                words = []
+                for word in tokens[i:i + _MAX_LATIN_WORDS]:
+                    if not word[0].isascii():
+                        break
+                    words.append(word)
+                    if words[0] in STOPWORDS:
+                        break
+                    span = " ".join(words)
+                    if len(span) >= 3 and word not in STOPWORDS:
+                        yield span
+            else:
+                for start, ch in enumerate(token):
+                    if ch in self.cjk_initials:
+                        for end in range(start + 2, min(start + _MAX_CJK_SPAN, len(token)) + 1):
+                            yield token[start:end]
+    
+    def fuzzy_candidates(self, query: str, limit: int = FUZZY_CANDIDATES) -> List[Dict]:
+        """
+        Companies whose aliases resemble spans of the query.
+        
+        Args:
+            query: Free text
+            limit: Maximum number of candidates
+        
+        Returns:
+            List of {'company_id', 'alias', 'span', 'score'}, best first,
+            one per company.
+        """
+        best: Dict[str, Dict] = {}
+        for span in set(self._query_spans(query.lower())):
+            for index, score in self.fuzzy_index.search(span, FUZZY_MIN_SCORE):
+                company_id = self.company_ids[index]
+                if company_id not in best or score > best[company_id]["score"]:
+                    best[company_id] = {
+                        "company_id": company_id,
+                        "alias": self.aliases[index],
+                        "span": span,
+                        "score": round(score, 3),
+                    }
+        return sorted(best.values(), key=lambda c: (-c["score"], c["company_id"]))[:limit]
+    
+    def resolve_with_confidence(self, query: str) -> Dict:
+        """
+        Resolve the query's company and say how sure the match is.
+        
+        Args:
+            query: Free text
+        
+        Returns:
+            Dict with 'company_id' (None unless resolved), 'confidence' and
+            'candidates' (fuzzy_candidates() output). Confidence is "exact"
+            (an alias appears in the query), "fuzzy" (a clear fuzzy match),
+            "low" (only weak or ambiguous candidates; no company is chosen)
+            or "none" (no candidates: the query names no company).
+        """
+        company_id = self.resolve(query)
+        if company_id is not None:
+            return {"company_id": company_id, "confidence": "exact", "candidates": []}
+        candidates = self.fuzzy_candidates(query)
+        if not candidates:
+            return {"company_id": None, "confidence": "none", "candidates": []}
+        top = candidates[0]
+        runner_up = candidates[1]["score"] if len(candidates) > 1 else 0.0
+        if top["score"] >= FUZZY_ACCEPT_SCORE and top["score"] - runner_up >= FUZZY_MARGIN:
+            return {"company_id": top["company_id"], "confidence": "fuzzy", "candidates": candidates}
+        return {"company_id": None, "confidence": "low", "candidates": candidates}
+
+
+def load_alias_table(path: Path = _ALIASES_PATH) -> Dict[str, str]:
+    """Alias -> company ID from the alias file ({} if it does not exist)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _build_resolver() -> EntityResolver:
+    """Resolver over the alias table, then graph node IDs and names."""
+    graph = get_graph()
+    aliases = dict(load_alias_table())
+    for company_id in graph.ids:
+        aliases.setdefault(company_id, company_id)
+    for company_id, name in zip(graph.ids, graph.names):
+        if name:
+            aliases.setdefault(name, company_id)
+    return EntityResolver(aliases)
+
+
+# Rebuilt when the alias file changes or the graph snapshot is replaced
+_resolver_dataset = ReloadableDataset(
+    "entity_resolver", [_ALIASES_PATH], _build_resolver, depends_on=(GRAPH_DATASET,)
+)
+
+
+def get_entity_resolver() -> EntityResolver:
+    """Return the current entity resolver."""
+    return _resolver_dataset.get()
@@ -0,0 +1,324 @@
+"""
+Fact Check
+
+Rule-based support checks for report statements. A statement's facts are
+the numbers, dates and quarter labels it contains and the companies it
+mentions (found with the entity resolver); a statement is supported when
+every fact is found in the evidence it is checked against.
+
+- Numbers carry the unit written after them (%, ppts, days, nm, years,
+  or an amount such as "28.02B" or "380 億美元", normalized to its full
+  value) and the metric they are about (revenue, gross margin, DOI, ...):
+  the nearest metric term in the same clause, or for a table row the
+  label cell, whose "(USD B)", "(%)" or "(days)" also gives the unit of
+  the row's bare numbers. A number only matches evidence with the same
+  unit, and with the same metric when both sides name one, so "87%"
+  is not supported by a DOI of 87 days.
+- Numbers match within the precision they are written with: "29.0%"
+  matches 28.95 and "53" matches 53.2. Signs are ignored, since a change
+  may read "-5 days" in one place and "減少 5 天" in another.
+- In a statement that names companies, numbers and dates must be found
+  in evidence about one of those companies.
+- Evidence is indexed once per report (numbers in one sorted list per
+  unit searched with bisect, dates and companies in dicts), so checking
+  a statement costs a few lookups per fact.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+
+# Units of numbers (None: a bare number such as a count)
+PERCENT, DAYS, NM, AMOUNT, YEAR = "%", "days", "nm", "amount", "year"
+
+# Metric -> terms naming it in reports and source data
+METRIC_TERMS = {
+    "revenue": ("revenue", "sales", "營收", "營業收入", "銷售額"),
+    "gross_margin": ("gross margin", "毛利率"),
+    "operating_margin": ("operating margin", "營業利益率", "營益率"),
+    "net_income": ("net income", "淨利", "稅後純益"),
+    "eps": ("eps", "每股盈餘"),
+    "doi": ("doi", "inventory", "存貨"),
+    "capex": ("capex", "capital expenditure", "資本支出"),
+}
+
+# Amount scale words
+_SCALES = {
+    "B": 1e9, "bn": 1e9, "billion": 1e9, "Billion": 1e9, "十億": 1e9,
+    "M": 1e6, "mn": 1e6, "million": 1e6, "Million": 1e6, "百萬": 1e6,
+    "兆": 1e12, "億": 1e8, "萬": 1e4,
+}
+
+# Integers read as years when written without a unit
+_YEARS = range(1900, 2101)
+
+_FACT = re.compile(
+    r"(?<![A-Za-z0-9.])(?:"
+    r"(?P<date>\d{4}[-/]\d{1,2}[-/]\d{1,2})"
+    r"|(?P<year>\d{4}) ?Q(?P<quarter>[1-4])(?!\d)"
+    r"|(?P<number>\d+(?:,\d{3})*(?:\.\d+)?)"
+    r")"
+)
+_LATIN_END = r"(?![A-Za-z])"
+_UNIT = re.compile(
+    r" ?(?:"
+    r"(?P<percent>%|％|ppts?" + _LATIN_END + r"|pp" + _LATIN_END + r"|個百分點|百分點)"
+    r"|(?P<days>days?" + _LATIN_END + r"|天)"
+    r"|(?P<nm>nm" + _LATIN_END + r"|奈米)"
+    r"|(?P<scale>" + "|".join(
+        sorted((re.escape(w) + (_LATIN_END if w.isascii() else "") for w in _SCALES), key=len, reverse=True)
+    ) + r")"
+    r"|(?P<currency>USD" + _LATIN_END + r"|TWD" + _LATIN_END + r"|美元|元)"
+    r"|(?P<year>年)"
+    r")"
+)
+_RANGE = re.compile(r" ?[-–~～至到] ?")
+_METRIC = re.compile(
+    "|".join(
+        rf"(?<![A-Za-z]){re.escape(term)}{_LATIN_END}" if term.isascii() else re.escape(term)
+        for term in sorted((t for terms in METRIC_TERMS.values() for t in terms), key=len, reverse=True)
+    ),
+    re.IGNORECASE
+)
+_METRIC_OF_TERM = {term: metric for metric, terms in METRIC_TERMS.items() for term in terms}
+_CLAUSE_END = re.compile(r"[，,；;。！!？?\n]")
+
+
+class Number(NamedTuple):
+    """A number stated in text, with the unit and metric it is about."""
+    value: float
+    tolerance: float
+    text: str
+    unit: Optional[str] = None
+    metric: Optional[str] = None
+
+
+def find_metric(text: str) -> Optional[str]:
+    """The first metric (key of METRIC_TERMS) named in text, or None."""
+    match = _METRIC.search(text)
+    return _METRIC_OF_TERM[match.group().lower()] if match else None
+
+
+def _label_unit(label: str) -> Tuple[Optional[str], float]:
+    """Unit and scale given by a table label such as "Revenue (USD B)"."""
+    for spec in re.findall(r"\(([^)]*)\)", label):
+        if "%" in spec:
+            return PERCENT, 1.0
+        if re.search(r"\bdays?\b", spec):
+            return DAYS, 1.0
+        scale = re.search(r"\b(?:" + "|".join(w for w in _SCALES if w.isascii()) + r")\b", spec)
+        if scale:
+            return AMOUNT, _SCALES[scale.group()]
+        if re.search(r"\b(?:USD|TWD)\b", spec):
+            return AMOUNT, 1.0
+    return None, 1.0
+
+
+def _metric_at(text: str, start: int, end: int, terms: List[re.Match]) -> Optional[str]:
+    """Metric of the number at text[start:end]: nearest term in its clause, before it first."""
+    clause_start = max((m.end() for m in _CLAUSE_END.finditer(text, 0, start)), default=0)
+    clause_end = _CLAUSE_END.search(text, end)
+    clause_end = clause_end.start() if clause_end else len(text)
+    before = [m for m in terms if clause_start <= m.start() and m.end() <= start]
+    if before:
+        return _METRIC_OF_TERM[before[-1].group().lower()]
+    after = [m for m in terms if end <= m.start() and m.end() <= clause_end]
+    return _METRIC_OF_TERM[after[0].group().lower()] if after else None
+
+
+def extract_facts(text: str, resolver=None) -> Dict:
+    """
+    Facts stated in a piece of text.
+    
+    Args:
+        text: Free text (Markdown)
+        resolver: EntityResolver for company mentions (None: companies
+            are not extracted)
+    
+    Returns:
+        Dict with 'numbers' (list of Number, amounts at their full value),
+        'tokens' (dates and quarter labels, normalized like "2025-01-16"
+        and "2025Q3") and 'companies' (company IDs).
+    """
+    tokens: List[str] = []
+    # [start, end, value, decimals, unit, scale, text, continues a range]
+    raw: List[list] = []
+    for match in _FACT.finditer(text):
+        if match.group("date"):
+            year, month, day = re.split(r"[-/]", match.group("date"))
+            tokens.append(f"{year}-{int(month):02d}-{int(day):02d}")
+            continue
+        if match.group("year"):
+            tokens.append(f"{match.group('year')}Q{match.group('quarter')}")
+            continue
+        number = match.group("number").replace(",", "")
+        decimals = len(number) - number.index(".") - 1 if "." in number else 0
+        unit, scale, end = None, 1.0, match.end()
+        suffix = _UNIT.match(text, end)
+        if suffix:
+            end = suffix.end()
+            if suffix.group("percent"):
+                unit = PERCENT
+            elif suffix.group("days"):
+                unit = DAYS
+            elif suffix.group("nm"):
+                unit = NM
+            elif suffix.group("scale"):
+                unit, scale = AMOUNT, _SCALES[suffix.group("scale")]
+            elif suffix.group("currency"):
+                unit = AMOUNT
+            else:
+                unit = YEAR
+        elif text[:match.start()].endswith("$"):
+            unit = AMOUNT
+        ranged = bool(_RANGE.match(text, match.end())) and not suffix
+        raw.append([match.start(), end, float(number), decimals, unit, scale, text[match.start():end].strip(), ranged])
+    
+    # The first number of a range ("380-420 億", "10-12%") takes the unit
+    # of the second
+    for current, following in zip(reversed(raw[:-1]), reversed(raw[1:])):
+        if current[7] and current[4] is None and _RANGE.fullmatch(text, current[1], following[0]):
+            current[4], current[5] = following[4], following[5]
+    
+    terms = list(_METRIC.finditer(text))
+    is_row = text.lstrip().startswith("|")
+    row_metric, row_unit, row_scale = None, None, 1.0
+    if is_row:
+        cells = [cell.strip() for cell in text.strip().strip("|").split("|")]
+        label = cells[0] if cells else ""
+        row_metric = find_metric(label)
+        row_unit, row_scale = _label_unit(label)
+    
+    numbers: List[Number] = []
+    for start, end, value, decimals, unit, scale, written, _ in raw:
+        if unit is None and row_unit is not None:
+            unit, scale = row_unit, row_scale
+        if unit is None and decimals == 0 and "," not in written and int(value) in _YEARS:
+            unit = YEAR
+        if unit == YEAR:
+            metric = None
+        elif is_row:
+            metric = row_metric
+        else:
+            metric = _metric_at(text, start, end, terms)
+        value *= scale
+        tolerance = 0.5 * 10 ** -decimals * scale + 1e-9 * value
+        numbers.append(Number(value, tolerance, written, unit, metric))
+    
+    companies: List[str] = []
+    if resolver is not None:
+        companies = list(dict.fromkeys(m["company_id"] for m in resolver.find_all(text)))
+    return {"numbers": numbers, "tokens": tokens, "companies": companies}
+
+
+def has_facts(facts: Dict) -> bool:
+    """Whether extract_facts() found anything to check."""
+    return bool(facts["numbers"] or facts["tokens"] or facts["companies"])
+
+
+class EvidenceIndex:
+    """
+    Index of the facts in a list of evidence items.
+    
+    Args:
+        items: Dicts with 'source' (citation) and 'text', and optionally
+            'facts' (typed values not written in the text: dicts with
+            'value', 'unit' and 'metric', amounts at their full value),
+            'numbers' (bare values such as counts) and 'companies'
+            (company IDs the item is about)
+        resolver: EntityResolver for company mentions in the texts
+    """
+    
+    def __init__(self, items: Sequence[Dict], resolver=None):
+        self.sources: List[str] = []
+        numbers: Dict[Optional[str], List[Tuple[float, int, Optional[str]]]] = {}
+        self.tokens: Dict[str, Set[int]] = {}
+        self.companies: Dict[str, Set[int]] = {}
+        for i, item in enumerate(items):
+            self.sources.append(item["source"])
+            facts = extract_facts(item.get("text", ""), resolver)
+            typed = [(n.value, n.unit, n.metric) for n in facts["numbers"]]
+            typed += [(fact["value"], fact.get("unit"), fact.get("metric")) for fact in item.get("facts", ())]
+            typed += [(value, None, None) for value in item.get("numbers", ())]
+            for token in facts["tokens"]:
+                self.tokens.setdefault(token, set()).add(i)
+                typed.append((float(token[:4]), YEAR, None))
+            for value, unit, metric in typed:
+                value = abs(float(value))
+                if value != value:  # NaN
+                    continue
+                numbers.setdefault(unit, []).append((value, i, metric))
+            for company_id in list(facts["companies"]) + list(item.get("companies", ())):
+                self.companies.setdefault(company_id, set()).add(i)
+        self.values: Dict[Optional[str], List[float]] = {}
+        self.value_items: Dict[Optional[str], List[Tuple[int, Optional[str]]]] = {}
+        for unit, entries in numbers.items():
+            entries.sort(key=lambda entry: entry[0])
+            self.values[unit] = [value for value, _, _ in entries]
+            self.value_items[unit] = [(i, metric) for _, i, metric in entries]
+    
+    def __len__(self) -> int:
+        return len(self.sources)
+    
+    def number_items(self, number: Number) -> Set[int]:
+        """
+        Items holding the number: same unit, value within tolerance (sign
+        ignored), and the same metric unless either side names none.
+        """
+        values = self.values.get(number.unit, [])
+        value = abs(number.value)
+        lo = bisect_left(values, value - number.tolerance)
+        hi = bisect_right(values, value + number.tolerance)
+        return {
+            i for i, metric in self.value_items.get(number.unit, [])[lo:hi]
+            if number.metric is None or metric is None or metric == number.metric
+        }
+    
+    def check(self, facts: Dict) -> Dict:
+        """
+        Check facts against the evidence.
+        
+        Args:
+            facts: extract_facts() output
+        
+        Returns:
+            Dict with 'supported' (every fact was found), 'missing' (facts
+            not found, as written) and 'citations' (sources of the fewest
+            items covering the facts that were found, best first).
+        """
+        # Numbers and dates of a statement naming companies must come from
+        # items about those companies ("Apple ... 2nm" is not supported by
+        # a 2 found elsewhere)
+        scope: Set[int] = set()
+        for company_id in facts["companies"]:
+            scope |= self.companies.get(company_id, set())
+        
+        def scoped(items: Set[int]) -> Set[int]:
+            return items & scope if scope else items
+        
+        found: List[Set[int]] = []
+        missing: List[str] = []
+        lookups = [(scoped(self.number_items(number)), number.text) for number in facts["numbers"]]
+        lookups += [(scoped(self.tokens.get(token, set())), token) for token in facts["tokens"]]
+        lookups += [(self.companies.get(company_id, set()), company_id) for company_id in facts["companies"]]
+        for items, text in lookups:
+            if items:
+                found.append(items)
+            else:
+                missing.append(text)
+        return {"supported": not missing, "missing": missing, "citations": self._cover(found)}
+    
+    def _cover(self, found: List[Set[int]]) -> List[str]:
+        """Greedy set cover: items covering the most remaining facts first."""
+        remaining = list(found)
+        citations = []
+        while remaining:
+            counts: Dict[int, int] = {}
+            for items in remaining:
+                for i in items:
+                    counts[i] = counts.get(i, 0) + 1
+            best = min(counts, key=lambda i: (-counts[i], i))
+            citations.append(self.sources[best])
+            remaining = [items for items in remaining if best not in items]
+        return citations
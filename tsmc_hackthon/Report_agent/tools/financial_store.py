@@ -0,0 +1,335 @@
+"""
+Columnar Financial Store
+
+This module loads the quarterly metrics in financials_extended.json into a
+dense NumPy array of shape (company, quarter, metric), so that QoQ, YoY
+and rolling statistics are computed for every company at once instead of
+walking per-quarter dicts.
+
+- The quarter axis is derived from the data: a contiguous range from the
+  earliest to the latest quarter seen ("2024Q3", "2024Q4", ...), with NaN
+  where a company has no value.
+- Monetary metrics are normalized to USD through a rate table (currency
+  units per USD, optionally per quarter) rather than a hard-coded rate.
+- Changes follow the metric's unit: percent change for money, percentage
+  points for "%" metrics, and absolute difference otherwise (e.g. days).
+"""
+
+import logging
+from typing import Dict, List, Optional, Set, Union
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Currency units per USD. Overrides may give a single rate or per-quarter
+# rates: {"TWD": {"2025Q3": 30.4, "default": 31.0}}
+DEFAULT_FX_RATES: Dict[str, float] = {
+    "USD": 1.0,
+    "TWD": 31.0,
+    "JPY": 150.0,
+    "KRW": 1350.0,
+    "CNY": 7.2,
+    "EUR": 0.92,
+}
+
+RateTable = Dict[str, Union[float, Dict[str, float]]]
+
+# Metric kinds, by unit
+MONEY, RATIO, LEVEL = "money", "ratio", "level"
+
+
+def parse_quarter(label: str) -> int:
+    """'2025Q3' -> quarter ordinal (year * 4 + quarter - 1)."""
+    year, quarter = label.upper().split("Q")
+    return int(year) * 4 + int(quarter[0]) - 1
+
+
+def format_quarter(ordinal: int) -> str:
+    """Quarter ordinal -> '2025Q3'."""
+    return f"{ordinal // 4}Q{ordinal % 4 + 1}"
+
+
+def _metric_kind(unit: str, rates: RateTable) -> str:
+    if unit == "%":
+        return RATIO
+    if unit in rates or (len(unit) == 3 and unit.isupper()):
+        return MONEY
+    return LEVEL
+
+
+class FinancialStore:
+    """
+    Dense (company x quarter x metric) store of quarterly financials.
+    
+    Args:
+        data: financials_extended.json content (company_id -> record)
+        rates: Currency rate table (default: DEFAULT_FX_RATES)
+    """
+    
+    def __init__(self, data: Dict[str, Dict], rates: Optional[RateTable] = None):
+        self.records = data
+        self.rates: RateTable = {**DEFAULT_FX_RATES, **(rates or {})}
+        # Currencies whose missing rate was already logged
+        self._fx_warned: Set[str] = set()
+        self.companies: List[str] = list(data)
+        self.company_index = {cid: i for i, cid in enumerate(self.companies)}
+        
+        # Metric and quarter axes, in first-seen / calendar order
+        units: Dict[str, str] = {}
+        ordinals = set()
+        for record in data.values():
+            for label, metrics in record.get("quarterly_data", {}).items():
+                try:
+                    ordinals.add(parse_quarter(label))
+                except (ValueError, IndexError):
+                    logger.warning(f"Ignoring unparseable quarter label: {label}")
+                    continue
+                for name, metric in metrics.items():
+                    units.setdefault(name, metric.get("unit", ""))
+        self.metrics: List[str] = list(units)
+        self.metric_index = {name: i for i, name in enumerate(self.metrics)}
+        self.units = units
+        self.kinds = {name: _metric_kind(unit, self.rates) for name, unit in units.items()}
+        self.first_ordinal = min(ordinals) if ordinals else 0
+        num_quarters = (max(ordinals) - self.first_ordinal + 1) if ordinals else 0
+        self.quarters: List[str] = [format_quarter(self.first_ordinal + i) for i in range(num_quarters)]
+        
+        self.currencies: List[str] = [record.get("currency", "USD") for record in data.values()]
+        self.values = np.full((len(self.companies), num_quarters, len(self.metrics)), np.nan)
+        self.value_units = np.empty((len(self.companies), len(self.metrics)), dtype=object)
+        for c, record in enumerate(data.values()):
+            for label, metrics in record.get("quarterly_data", {}).items():
+                try:
+                    q = parse_quarter(label) - self.first_ordinal
+                except (ValueError, IndexError):
+                    continue
+                for name, metric in metrics.items():
+                    value = metric.get("value")
+                    if isinstance(value, (int, float)):
+                        m = self.metric_index[name]
+                        self.values[c, q, m] = value
+                        self.value_units[c, m] = metric.get("unit", self.currencies[c])
+        
+        # Last quarter with any value, per company (-1 if none)
+        has_data = ~np.isnan(self.values).all(axis=2)
+        self.latest_index = np.where(
+            has_data.any(axis=1), num_quarters - 1 - np.argmax(has_data[:, ::-1], axis=1), -1
+        )
+        self._usd: Optional[np.ndarray] = None
+        self._tables: Dict[int, Dict[str, np.ndarray]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.companies)
+    
+    def get(self, company_id: str) -> Dict:
+        """The raw record of a company (as in financials_extended.json)."""
+        return self.records.get(company_id, {})
+    
+    def _rate_matrix(self) -> np.ndarray:
+        """(company, quarter) currency units per USD, one rate row per currency."""
+        money = [self.metric_index[n] for n, kind in self.kinds.items() if kind == MONEY]
+        currencies = [
+            next((self.value_units[c, m] for m in money if self.value_units[c, m]), self.currencies[c])
+            for c in range(len(self.companies))
+        ]
+        distinct = sorted(set(currencies))
+        rows = np.array([[self.fx_rate(currency, q) for q in self.quarters] for currency in distinct])
+        codes = np.array([distinct.index(c) for c in currencies], dtype=np.int64)
+        return rows[codes] if len(codes) else np.ones((0, len(self.quarters)))
+    
+    def fx_rate(self, currency: str, quarter: Optional[str] = None) -> float:
+        """
+        Currency units per USD for a quarter.
+        
+        A per-quarter table without an entry for the quarter (and without a
+        "default") falls back to the currency's scalar rate in
+        DEFAULT_FX_RATES; a currency with no rate at all is left
+        unconverted (rate 1.0). Both fallbacks are logged once per currency.
+        
+        Args:
+            currency: Currency code, e.g. "TWD"
+            quarter: Quarter label, e.g. "2025Q3" (None for the default rate)
+        
+        Returns:
+            The rate.
+        """
+        rate = self.rates.get(currency)
+        if isinstance(rate, dict):
+            rate = rate.get(quarter, rate.get("default"))
+            if rate is None:
+                rate = DEFAULT_FX_RATES.get(currency)
+                if rate is not None and currency not in self._fx_warned:
+                    self._fx_warned.add(currency)
+                    logger.warning(f"No {currency} rate for {quarter} and no default; using {rate}")
+        if rate is None:
+            if currency not in self._fx_warned:
+                self._fx_warned.add(currency)
+                logger.warning(f"No FX rate for {currency}; values left unconverted")
+            rate = 1.0
+        return rate
+    
+    def to_usd(self, value: float, currency: str, quarter: Optional[str] = None) -> float:
+        """Convert a single amount to USD with the rate table (see fx_rate)."""
+        return value / self.fx_rate(currency, quarter)
+    
+    def usd_values(self) -> np.ndarray:
+        """All values with monetary metrics converted to USD (same shape as values)."""
+        if self._usd is None:
+            usd = self.values.copy()
+            money = [self.metric_index[n] for n, kind in self.kinds.items() if kind == MONEY]
+            if money:
+                usd[:, :, money] /= self._rate_matrix()[:, :, None]
+            self._usd = usd
+        return self._usd
+    
+    def metric(self, name: str, usd: bool = True) -> np.ndarray:
+        """(company, quarter) values of one metric."""
+        source = self.usd_values() if usd else self.values
+        return source[:, :, self.metric_index[name]]
+    
+    def change(self, name: str, lag: int) -> np.ndarray:
+        """
+        Change of a metric over `lag` quarters, for every company and quarter.
+        
+        Money metrics give percent change (in local currency, so FX moves do
+        not show up as growth); "%" metrics give percentage points; others
+        give the absolute difference. The first `lag` quarters are NaN.
+        
+        Args:
+            name: Metric name
+            lag: 1 for QoQ, 4 for YoY
+        
+        Returns:
+            (company, quarter) float array.
+        """
+        values = self.metric(name, usd=False)
+        result = np.full_like(values, np.nan)
+        if lag >= values.shape[1]:
+            return result
+        current, previous = values[:, lag:], values[:, :-lag]
+        if self.kinds[name] == MONEY:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result[:, lag:] = np.where(previous != 0, (current / previous - 1.0) * 100.0, np.nan)
+        else:
+            result[:, lag:] = current - previous
+        return result
+    
+    def qoq(self, name: str) -> np.ndarray:
+        """Quarter-over-quarter change (see change())."""
+        return self.change(name, 1)
+    
+    def yoy(self, name: str) -> np.ndarray:
+        """Year-over-year change (see change())."""
+        return self.change(name, 4)
+    
+    def rolling(self, name: str, window: int = 4, how: str = "mean", usd: bool = True) -> np.ndarray:
+        """
+        Trailing rolling sum or mean over `window` quarters.
+        
+        Windows with any missing quarter are NaN.
+        
+        Args:
+            name: Metric name
+            window: Number of quarters
+            how: "mean" or "sum" (e.g. trailing-twelve-month revenue)
+            usd: Use USD-normalized values
+        
+        Returns:
+            (company, quarter) float array.
+        """
+        values = self.metric(name, usd=usd)
+        filled = np.nan_to_num(values)
+        counts = np.cumsum(~np.isnan(values), axis=1)
+        sums = np.cumsum(filled, axis=1)
+        result = np.full_like(values, np.nan)
+        if window > values.shape[1]:
+            return result
+        window_sums = sums[:, window - 1:] - np.pad(sums, ((0, 0), (1, 0)))[:, :values.shape[1] - window + 1]
+        window_counts = counts[:, window - 1:] - np.pad(counts, ((0, 0), (1, 0)))[:, :values.shape[1] - window + 1]
+        window_values = window_sums / window if how == "mean" else window_sums
+        result[:, window - 1:] = np.where(window_counts == window, window_values, np.nan)
+        return result
+    
+    def quarter_window(self, company_id: Optional[str] = None, n: int = 5) -> List[str]:
+        """
+        The last n quarter labels, ending at the company's latest reported
+        quarter (or the latest quarter in the store). Quarters before the
+        first one in the store are included if n asks for them.
+        """
+        end = len(self.quarters) - 1
+        if company_id in self.company_index and self.latest_index[self.company_index[company_id]] >= 0:
+            end = int(self.latest_index[self.company_index[company_id]])
+        return [format_quarter(self.first_ordinal + q) for q in range(end - n + 1, end + 1)]
+    
+    def window_table(self, n: int = 5) -> Dict[str, np.ndarray]:
+        """
+        Report table data for every company in one array operation.
+        
+        Each company's window ends at its own latest reported quarter.
+        
+        Args:
+            n: Number of quarters
+        
+        Returns:
+            Dict with:
+            - 'quarters': (company, n) quarter ordinals
+            - 'values': (company, n, metric) values, money in USD
+            - 'qoq' / 'yoy': (company, metric) changes at the latest quarter
+            The result is cached on the store.
+        """
+        if n in self._tables:
+            return self._tables[n]
+        end = np.where(self.latest_index >= 0, self.latest_index, len(self.quarters) - 1)
+        offsets = end[:, None] - np.arange(n - 1, -1, -1)[None, :]
+        valid = (offsets >= 0) & (offsets < len(self.quarters))
+        clipped = np.clip(offsets, 0, max(len(self.quarters) - 1, 0))
+        
+        values = np.full((len(self.companies), n, len(self.metrics)), np.nan)
+        qoq = np.full((len(self.companies), len(self.metrics)), np.nan)
+        yoy = np.full_like(qoq, np.nan)
+        if len(self.quarters):
+            gathered = np.take_along_axis(self.usd_values(), clipped[:, :, None], axis=1)
+            values = np.where(valid[:, :, None], gathered, np.nan)
+            rows = np.arange(len(self.companies))
+            latest = np.clip(self.latest_index, 0, None)
+            has_latest = self.latest_index >= 0
+            for m, name in enumerate(self.metrics):
+                qoq[:, m] = np.where(has_latest, self.qoq(name)[rows, latest], np.nan)
+                yoy[:, m] = np.where(has_latest, self.yoy(name)[rows, latest], np.nan)
+        table = {"quarters": offsets + self.first_ordinal, "values": values, "qoq": qoq, "yoy": yoy}
+        self._tables[n] = table
+        return table
+    
+    def company_table(self, company_id: str, n: int = 5) -> Optional[Dict]:
+        """
+        One company's rows of window_table().
+        
+        Returns:
+            Dict with 'quarters' (labels), 'values' (metric -> list of n
+            values, NaN if missing), 'qoq' and 'yoy' (metric -> change), or
+            None if the company is not in the store.
+        """
+        c = self.company_index.get(company_id)
+        if c is None:
+            return None
+        table = self.window_table(n)
+        return {
+            "quarters": [format_quarter(int(q)) for q in table["quarters"][c]],
+            "values": {name: table["values"][c, :, m].tolist() for m, name in enumerate(self.metrics)},
+            "qoq": {name: float(table["qoq"][c, m]) for m, name in enumerate(self.metrics)},
+            "yoy": {name: float(table["yoy"][c, m]) for m, name in enumerate(self.metrics)},
+        }
+    
+    def format_change(self, name: str, value: float) -> Optional[str]:
+        """Format a change like the report does ('29.0%', '+5.8 ppts', '-5 days'); None if NaN."""
+        if value is None or np.isnan(value):
+            return None
+        kind = self.kinds.get(name, LEVEL)
+        if kind == MONEY:
+            return f"{value:.1f}%"
+        if kind == RATIO:
+            return f"{value:+.1f} ppts"
+        unit = self.units.get(name, "")
+        return f"{value:+.1f} {unit}".rstrip() if value != round(value) else f"{value:+.0f} {unit}".rstrip()
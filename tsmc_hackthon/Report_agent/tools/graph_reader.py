@@ -2,26 +2,72 @@
 Supply Chain Graph Reader Tool
 
 This module provides functions to read and query the supply chain graph
-from supply_chain_graph.json.
+from supply_chain_graph.json. The graph is held in the compact array-backed
+form from tools.compact_graph and is hot-reloaded via tools.hot_reload;
+query functions return lightweight node views.
 """
 
 import json
-from typing import Dict, List, Optional
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+from tools.compact_graph import CompactGraph, RELATION_CLIENT, RELATION_SUPPLIER, RELATION_PARTNER
+from tools.hot_reload import ReloadableDataset
+from tools.snapshot import load_or_parse
+
 
-# Load the supply chain graph at module level
 _GRAPH_PATH = Path(__file__).parent.parent / "supply_chain_graph.json"
-_graph_data: Optional[Dict] = None
 
 
-def _load_graph() -> Dict:
-    """Load the supply chain graph from JSON file."""
-    global _graph_data
-    if _graph_data is None:
-        with open(_GRAPH_PATH, "r", encoding="utf-8") as f:
-            _graph_data = json.load(f)
-    return _graph_data
+def _parse_graph(path: Path) -> CompactGraph:
+    """Parse the supply chain graph JSON file into compact form."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return CompactGraph(raw)
+
+
+def _build_graph() -> CompactGraph:
+    """Open the graph from the binary snapshot, or parse JSON if it is stale."""
+    return load_or_parse("supply_chain_graph", _GRAPH_PATH, _parse_graph)
+
+
+# Lazily loaded, hot-reloadable graph snapshot
+GRAPH_DATASET = "supply_chain_graph"
+_graph_dataset = ReloadableDataset(GRAPH_DATASET, [_GRAPH_PATH], _build_graph)
+# Memoized traversals belong to the previous snapshot once it is replaced
+_graph_dataset.add_listener(lambda _: _propagate_risk_cached.cache_clear())
+
+
+def _load_graph() -> CompactGraph:
+    """Return the current supply chain graph snapshot."""
+    return _graph_dataset.get()
+
+
+def get_graph() -> CompactGraph:
+    """
+    Return the current supply chain graph snapshot.
+    
+    Datasets built from it name GRAPH_DATASET in their depends_on, so
+    they are rebuilt when the graph is reloaded.
+    """
+    return _graph_dataset.get()
+
+
+def get_graph_version() -> str:
+    """Return the content version of the loaded supply chain graph."""
+    return _graph_dataset.version
+
+
+def get_graph_memory_usage() -> Dict[str, int]:
+    """
+    Report memory used by the loaded supply chain graph.
+    
+    Returns:
+        Dict of component -> bytes, including 'total'.
+    """
+    return _load_graph().memory_usage()
 
 
 def get_node_by_id(node_id: str) -> Optional[Dict]:
@@ -32,13 +78,11 @@ def get_node_by_id(node_id: str) -> Optional[Dict]:
         node_id: The company ID (e.g., "2330", "AAPL")
     
     Returns:
-        Node dict with id, name, country, category, role, tags, or None if not found.
+        Node view with id, name, country, category, role, tags, or None if not found.
     """
     graph = _load_graph()
-    for node in graph.get("nodes", []):
-        if node.get("id") == node_id:
-            return node
-    return None
+    index = graph.index_of(node_id)
+    return graph.view(index) if index is not None else None
 
 
 def get_node_by_name(name: str) -> Optional[Dict]:
@@ -49,14 +93,11 @@ def get_node_by_name(name: str) -> Optional[Dict]:
         name: The company name (e.g., "TSMC", "Apple")
     
     Returns:
-        Node dict or None if not found.
+        Node view or None if not found.
     """
     graph = _load_graph()
-    name_lower = name.lower()
-    for node in graph.get("nodes", []):
-        if node.get("name", "").lower() == name_lower:
-            return node
-    return None
+    index = graph.name_index.get(name.lower())
+    return graph.view(index) if index is not None else None
 
 
 def get_related_companies(company_id: str) -> Dict[str, List[Dict]]:
@@ -71,8 +112,6 @@ def get_related_companies(company_id: str) -> Dict[str, List[Dict]]:
         company info and relationship details.
     """
     graph = _load_graph()
-    edges = graph.get("edges", [])
-    nodes = {node["id"]: node for node in graph.get("nodes", [])}
     
     result = {
         "customers": [],
@@ -81,49 +120,39 @@ def get_related_companies(company_id: str) -> Dict[str, List[Dict]]:
         "competitors": []
     }
     
-    for edge in edges:
-        source_id = edge.get("source")
-        target_id = edge.get("target")
-        relation = edge.get("relation", "")
-        description = edge.get("description", "")
-        
-        # Check if target company is involved in this edge
-        if target_id == company_id:
-            # Source is connected TO target
-            source_node = nodes.get(source_id, {})
-            if relation == "Client":
-                result["customers"].append({
-                    **source_node,
-                    "relationship_description": description
-                })
-            elif relation == "Supplier":
-                result["suppliers"].append({
-                    **source_node,
-                    "relationship_description": description
-                })
-            elif relation == "Partner":
-                result["partners"].append({
-                    **source_node,
-                    "relationship_description": description
-                })
-        
-        elif source_id == company_id:
-            # Target is connected FROM source
-            target_node = nodes.get(target_id, {})
-            if relation == "Partner":
-                result["partners"].append({
-                    **target_node,
-                    "relationship_description": description
-                })
+    index = graph.index_of(company_id)
+    if index is None:
+        return result
     
-    # Get competitors from nodes with role="Competitor" in same category
-    target_node = nodes.get(company_id, {})
-    target_category = target_node.get("category", "")
+    # Edges pointing at the company: source is connected TO target
+    partner_edges = []
+    for edge_id in graph.in_edge_ids(index).tolist():
+        relation = graph.edge_relation[edge_id]
+        source_index = int(graph.edge_src[edge_id])
+        if relation == RELATION_CLIENT:
+            result["customers"].append(graph.related_view(source_index, edge_id))
+        elif relation == RELATION_SUPPLIER:
+            result["suppliers"].append(graph.related_view(source_index, edge_id))
+        elif relation == RELATION_PARTNER:
+            partner_edges.append((edge_id, source_index))
+    
+    # Edges leaving the company: only partnerships count
+    for edge_id in graph.out_edge_ids(index).tolist():
+        target_index = int(graph.edge_dst[edge_id])
+        if graph.edge_relation[edge_id] == RELATION_PARTNER and target_index != index:
+            partner_edges.append((edge_id, target_index))
     
-    for node in graph.get("nodes", []):
-        if node.get("id") != company_id and node.get("role") == "Competitor":
-            if node.get("category") == target_category:
-                result["competitors"].append(node)
+    # Keep partners in file order, as in the original edge scan
+    partner_edges.sort()
+    result["partners"] = [graph.related_view(node_index, edge_id) for edge_id, node_index in partner_edges]
+    
+    # Get competitors from nodes with role="Competitor" in same category
+    target_category = graph.categories[int(graph.category_codes[index])]
+    result["competitors"] = [
+        graph.view(i)
+        for i in graph.nodes_with(role="Competitor", category=target_category).tolist()
+        if graph.ids[i] != company_id
+    ]
     
     return result
 
@@ -136,10 +165,10 @@ def get_nodes_by_role(role: str) -> List[Dict]:
         role: One of "Customer", "Supplier", "Partner", "Competitor", "Self"
     
     Returns:
-        List of node dicts matching the role.
+        List of node views matching the role.
     """
     graph = _load_graph()
-    return [node for node in graph.get("nodes", []) if node.get("role") == role]
+    return [graph.view(i) for i in graph.nodes_with(role=role).tolist()]
 
 
 def get_all_customers() -> List[Dict]:
@@ -150,3 +179,283 @@ def get_all_customers() -> List[Dict]:
 def get_all_suppliers() -> List[Dict]:
     """Get all supplier nodes."""
     return get_nodes_by_role("Supplier")
+
+
+# ---------------------------------------------------------------------------
+# Multi-hop traversal
+# ---------------------------------------------------------------------------
+#
+# Edges in supply_chain_graph.json use three relations. They are normalized
+# into "supply flow" direction (goods/services move from -> to):
+#   Supplier: source supplies target      -> source -> target
+#   Client:   source is a client of target -> target -> source
+#   Partner:  source hands off to target   -> source -> target
+# "upstream" of a company follows the flow backwards (its suppliers, their
+# suppliers, ...), "downstream" follows it forwards (its customers, ...).
+# Traversals run on dense node indices over the CSR arrays of CompactGraph.
+
+_VALID_DIRECTIONS = ("upstream", "downstream", "both")
+
+
+def _neighbors(graph: CompactGraph, index: int, direction: str) -> List[int]:
+    """Return supply-flow neighbor indices of a node in the given direction."""
+    if direction not in _VALID_DIRECTIONS:
+        raise ValueError(f"direction must be one of {_VALID_DIRECTIONS}, got {direction!r}")
+    if direction == "both":
+        return graph.flow_neighbors(index, "upstream")[0].tolist() + graph.flow_neighbors(index, "downstream")[0].tolist()
+    return graph.flow_neighbors(index, direction)[0].tolist()
+
+
+def _bfs_tiers(graph: CompactGraph, start: int, max_depth: int, direction: str) -> Dict[int, Tuple[int, int]]:
+    """
+    Breadth-first search from a node index.
+    
+    Returns:
+        Dict of node index -> (hop distance, predecessor index) for every node
+        reachable within max_depth hops, including the start node at hop 0
+        (predecessor -1).
+    """
+    seen: Dict[int, Tuple[int, int]] = {start: (0, -1)}
+    frontier = deque([start])
+    while frontier:
+        index = frontier.popleft()
+        depth = seen[index][0]
+        if depth >= max_depth:
+            continue
+        for neighbor in _neighbors(graph, index, direction):
+            if neighbor not in seen:
+                seen[neighbor] = (depth + 1, index)
+                frontier.append(neighbor)
+    return seen
+
+
+def _path_from_predecessors(tiers: Dict[int, Tuple[int, int]], index: int) -> List[int]:
+    """Rebuild the BFS path (start -> index) from predecessor links."""
+    path = []
+    current = index
+    while current != -1:
+        path.append(current)
+        current = tiers[current][1]
+    path.reverse()
+    return path
+
+
+def get_k_hop_neighbors(company_id: str, k: int = 2, direction: str = "upstream") -> List[Dict]:
+    """
+    Get the k-hop upstream/downstream neighborhood of a company.
+    
+    Args:
+        company_id: The target company ID
+        k: Maximum number of hops (1 = direct suppliers/customers)
+        direction: "upstream" (suppliers), "downstream" (customers) or "both"
+    
+    Returns:
+        List of node dicts (nearest tier first), each extended with 'tier'
+        (hop distance) and 'path' (node IDs from the company to the node).
+    """
+    graph = _load_graph()
+    start = graph.index_of(company_id)
+    if start is None:
+        return []
+    tiers = _bfs_tiers(graph, start, k, direction)
+    result = []
+    for index, (depth, _) in sorted(tiers.items(), key=lambda item: (item[1][0], graph.ids[item[0]])):
+        if index == start:
+            continue
+        result.append({
+            **graph.view(index),
+            "tier": depth,
+            "path": [graph.ids[i] for i in _path_from_predecessors(tiers, index)]
+        })
+    return result
+
+
+def find_paths(
+    source_id: str,
+    target_id: str,
+    max_depth: int = 3,
+    max_paths: int = 50
+) -> List[Dict]:
+    """
+    Find all simple paths between two companies, ignoring edge direction.
+    
+    The search is pruned with the BFS distance to the target, so only
+    branches that can still reach it within the depth limit are expanded.
+    
+    Args:
+        source_id: Start company ID
+        target_id: End company ID
+        max_depth: Maximum number of edges per path
+        max_paths: Stop after this many paths have been found
+    
+    Returns:
+        List of dicts with 'nodes' (IDs from source to target) and
+        'relations' (relation of each traversed edge), shortest first.
+    """
+    graph = _load_graph()
+    source = graph.index_of(source_id)
+    target = graph.index_of(target_id)
+    if source is None or target is None or source == target:
+        return []
+    
+    # Distance of every node to the target (undirected), bounded by max_depth
+    distance = {index: depth for index, (depth, _) in _bfs_tiers(graph, target, max_depth, "both").items()}
+    if source not in distance:
+        return []
+    
+    paths: List[Dict] = []
+    nodes = [source]
+    relations: List[str] = []
+    on_path = {source}
+    
+    def _walk(index: int) -> None:
+        remaining = max_depth - len(relations)
+        for direction in ("upstream", "downstream"):
+            neighbors, edge_ids = graph.flow_neighbors(index, direction)
+            for neighbor, edge_id in zip(neighbors.tolist(), edge_ids.tolist()):
+                if neighbor in on_path or distance.get(neighbor, max_depth + 1) > remaining - 1:
+                    continue
+                nodes.append(neighbor)
+                relations.append(graph.relations[int(graph.edge_relation[edge_id])])
+                if neighbor == target:
+                    paths.append({"nodes": [graph.ids[i] for i in nodes], "relations": list(relations)})
+                else:
+                    on_path.add(neighbor)
+                    _walk(neighbor)
+                    on_path.discard(neighbor)
+                nodes.pop()
+                relations.pop()
+                if len(paths) >= max_paths:
+                    return
+    
+    _walk(source)
+    paths.sort(key=lambda p: len(p["relations"]))
+    return paths
+
+
+@lru_cache(maxsize=1024)
+def _propagate_risk_cached(
+    graph: CompactGraph,
+    company_id: str,
+    direction: str,
+    max_depth: int,
+    decay: float
+) -> Tuple[Tuple[str, float], ...]:
+    """Memoized level-by-level risk propagation (see propagate_risk), keyed per graph snapshot."""
+    start = graph.index_of(company_id)
+    if start is None:
+        return ()
+    scores: Dict[int, float] = {}
+    # Node -> strength arriving over each incoming edge, by predecessor
+    frontier: Dict[int, Dict[int, float]] = {start: {-1: 1.0}}
+    for _ in range(max_depth):
+        next_frontier: Dict[int, Dict[int, float]] = {}
+        for index, incoming in frontier.items():
+            # Noisy-OR of the incoming strengths as a product of (1 - s);
+            # strengths of 1 are counted apart so they can be divided out
+            product, certain = 1.0, 0
+            for strength in incoming.values():
+                if strength >= 1.0:
+                    certain += 1
+                else:
+                    product *= 1.0 - strength
+            # A node linked by several edges (e.g. both Supplier and Client) is one neighbor
+            for neighbor in dict.fromkeys(_neighbors(graph, index, direction)):
+                if neighbor == start:
+                    continue
+                # Non-backtracking: what came from a neighbor is not sent
+                # back to it, so the two-cycle "both" creates on every edge
+                # does not inflate scores
+                back = incoming.get(neighbor)
+                rest_product, rest_certain = product, certain
+                if back is not None:
+                    if back >= 1.0:
+                        rest_certain -= 1
+                    else:
+                        rest_product /= 1.0 - back
+                strength = 1.0 if rest_certain else 1.0 - rest_product
+                if strength > 0.0:
+                    next_frontier.setdefault(neighbor, {})[index] = strength * decay
+        for index, incoming in next_frontier.items():
+            # Noisy-OR: independent paths each transmit with their own strength
+            missed = 1.0 - scores.get(index, 0.0)
+            for strength in incoming.values():
+                missed *= 1.0 - strength
+            scores[index] = 1.0 - missed
+        frontier = next_frontier
+        if not frontier:
+            break
+    return tuple((graph.ids[index], score) for index, score in scores.items())
+
+
+def propagate_risk(
+    company_id: str,
+    max_depth: int = 3,
+    decay: float = 0.5,
+    direction: str = "both"
+) -> Dict[str, float]:
+    """
+    Compute how strongly each node in the neighborhood is coupled to a company.
+    
+    A shock starting at the company is propagated hop by hop; each hop
+    transmits with probability `decay`, and parallel paths are combined
+    with a noisy-OR. The frontier keeps the strength arriving over each
+    edge, and a node does not pass a shock back to the node it came from,
+    so the two-cycle that "both" creates for every edge does not inflate
+    scores (up to 3 hops, every counted walk is a simple path). The cost
+    is O(max_depth * edges) and results are memoized per (company,
+    direction, depth, decay).
+    
+    Args:
+        company_id: The target company ID
+        max_depth: Maximum number of hops to propagate
+        decay: Transmission strength per hop (0-1)
+        direction: "upstream", "downstream" or "both"
+    
+    Returns:
+        Dict of node_id -> risk score in (0, 1], excluding the company itself.
+    """
+    return dict(_propagate_risk_cached(_load_graph(), company_id, direction, max_depth, float(decay)))
+
+
+def get_risk_transmission(company_id: str, max_depth: int = 3, decay: float = 0.5) -> Dict[str, List[Dict]]:
+    """
+    Summarize multi-tier risk exposure for a company.
+    
+    Args:
+        company_id: The target company ID
+        max_depth: Maximum tier to include (e.g. 3 = up to tier-3 suppliers)
+        decay: Transmission strength per hop
+    
+    Returns:
+        Dict with 'upstream' and 'downstream' lists of exposed companies,
+        each with id, name, country, category, tier, risk_score and path
+        (company names from the target to the exposed company), sorted by
+        risk score.
+    """
+    graph = _load_graph()
+    start = graph.index_of(company_id)
+    result = {"upstream": [], "downstream": []}
+    if start is None:
+        return result
+    for direction in ("upstream", "downstream"):
+        tiers = _bfs_tiers(graph, start, max_depth, direction)
+        # Use the same snapshot as the BFS, even if a reload lands meanwhile
+        scores = dict(_propagate_risk_cached(graph, company_id, direction, max_depth, float(decay)))
+        exposed = []
+        for index, (depth, _) in tiers.items():
+            if index == start:
+                continue
+            node_id = graph.ids[index]
+            exposed.append({
+                "id": node_id,
+                "name": graph.names[index],
+                "country": graph.countries[int(graph.country_codes[index])],
+                "category": graph.categories[int(graph.category_codes[index])],
+                "tier": depth,
+                "risk_score": round(scores.get(node_id, 0.0), 4),
+                "path": [graph.names[i] for i in _path_from_predecessors(tiers, index)]
+            })
+        exposed.sort(key=lambda item: (-item["risk_score"], item["tier"], item["id"]))
+        result[direction] = exposed
+    return result
@@ -0,0 +1,298 @@
+"""
+Hot Reload for Data Files
+
+This module lets the tools in this package pick up changes to
+supply_chain_graph.json and data/*.json without restarting the process.
+
+Each data file is wrapped in a ReloadableDataset. Callers get the current
+snapshot with `get()`; a background watcher detects changes (mtime/size
+first, then content hash), rebuilds the data and its indexes off the
+request path, and swaps the new snapshot in atomically. Code that already
+holds a snapshot keeps using it until it asks again.
+
+A dataset derived from other datasets (peer statistics from the graph
+and the financial store, say) names them in `depends_on`. Its version
+includes the versions of the upstream snapshots it was built from, and
+it is rebuilt whenever one of them is replaced, so it never pairs a new
+file with an old upstream snapshot, whatever order the datasets are
+created, loaded or checked in.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# All datasets created in this process, watched by the background thread
+_datasets: Dict[str, "ReloadableDataset"] = {}
+_registry_lock = threading.Lock()
+
+_watcher: Optional[threading.Thread] = None
+
+
+def _file_stat(path: Path) -> Tuple[int, int]:
+    """Return (mtime_ns, size) for a file, or (0, -1) if it is missing."""
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return 0, -1
+
+
+def fingerprint_files(paths: Sequence[Path]) -> str:
+    """
+    Compute a content hash over one or more files.
+    
+    Args:
+        paths: Files to hash (missing files hash as empty)
+    
+    Returns:
+        Hex SHA-256 digest of the concatenated file contents.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(Path(path).name).encode("utf-8"))
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+class ReloadableDataset(Generic[T]):
+    """
+    A lazily loaded, hot-reloadable snapshot built from one or more files.
+    
+    Args:
+        name: Dataset name (used in logs and get_data_versions)
+        paths: Source files the snapshot is built from
+        loader: Function that reads the files and returns the snapshot,
+            including any indexes derived from it
+        depends_on: Names of the datasets the loader reads through their
+            get() (they must exist by the time this dataset is loaded)
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        paths: Sequence[Path],
+        loader: Callable[[], T],
+        depends_on: Sequence[str] = ()
+    ):
+        self.name = name
+        self.paths: List[Path] = [Path(p) for p in paths]
+        self.depends_on: Tuple[str, ...] = tuple(depends_on)
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._snapshot: Optional[T] = None
+        self._loaded = False
+        self._version: Optional[str] = None
+        self._stats: Optional[List[Tuple[int, int]]] = None
+        self._upstream_versions: Optional[Dict[str, str]] = None
+        self.load_seconds: Optional[float] = None
+        self._listeners: List[Callable[[T], None]] = []
+        with _registry_lock:
+            _datasets[name] = self
+    
+    def get(self) -> T:
+        """Return the current snapshot, loading it on first use."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load_locked()
+        return self._snapshot
+    
+    @property
+    def version(self) -> str:
+        """
+        Content hash (shortened) of the files behind the current snapshot,
+        and of the versions of the upstream snapshots it was built from.
+        """
+        self.get()
+        return self._version
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+    
+    def add_listener(self, callback: Callable[[T], None]) -> None:
+        """Register a callback invoked with the new snapshot after each reload."""
+        self._listeners.append(callback)
+    
+    def _upstream(self) -> List["ReloadableDataset"]:
+        with _registry_lock:
+            return [_datasets[name] for name in self.depends_on]
+    
+    def _current_upstream_versions(self) -> Dict[str, str]:
+        return {dataset.name: dataset.version for dataset in self._upstream()}
+    
+    def _version_of(self, upstream_versions: Dict[str, str]) -> str:
+        version = fingerprint_files(self.paths)[:16]
+        if not upstream_versions:
+            return version
+        combined = ",".join([version] + [f"{name}={v}" for name, v in sorted(upstream_versions.items())])
+        return hashlib.sha256(combined.encode("utf-8")).hexdigest()[:16]
+    
+    def _load_locked(self) -> None:
+        """Build a snapshot and swap it in. Caller must hold self._lock."""
+        stats = [_file_stat(p) for p in self.paths]
+        # Taken before the loader runs: if an upstream reload lands while
+        # it runs, the recorded versions are the older ones and the next
+        # check rebuilds this dataset
+        upstream_versions = self._current_upstream_versions()
+        version = self._version_of(upstream_versions)
+        start = time.perf_counter()
+        snapshot = self._loader()
+        self.load_seconds = time.perf_counter() - start
+        # Single reference assignment: readers see either old or new snapshot
+        self._snapshot = snapshot
+        self._version = version
+        self._stats = stats
+        self._upstream_versions = upstream_versions
+        self._loaded = True
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the snapshot if its source files or upstream datasets changed.
+        
+        Upstream datasets are checked first. Files whose mtime and size
+        are unchanged are skipped without hashing; a touched file with
+        identical content does not trigger a rebuild. If rebuilding fails
+        (e.g. a half-written file), the current snapshot is kept and the
+        check is retried next time.
+        
+        Returns:
+            True if a new snapshot was swapped in.
+        """
+        if not self._loaded:
+            return False
+        for dataset in self._upstream():
+            dataset.reload_if_changed()
+        stats = [_file_stat(p) for p in self.paths]
+        if stats == self._stats and self._current_upstream_versions() == self._upstream_versions:
+            return False
+        
+        with self._lock:
+            upstream_versions = self._current_upstream_versions()
+            version = self._version_of(upstream_versions)
+            if version == self._version:
+                self._stats = stats
+                return False
+            try:
+                self._load_locked()
+            except Exception as e:
+                logger.warning(f"Reload of dataset '{self.name}' failed, keeping version {self._version}: {e}")
+                return False
+            snapshot = self._snapshot
+        
+        logger.info(f"Dataset '{self.name}' reloaded (version {self._version})")
+        self._notify(snapshot)
+        return True
+    
+    def apply_update(self, update: Callable[[T], T]) -> bool:
+        """
+        Swap in a snapshot derived from the current one instead of reloading.
+        
+        For writers that append to a source file and know what they
+        appended: update(snapshot) must equal what the loader would build
+        from the files now. The caller must make sure the snapshot was
+        current when it changed the files (e.g. by checking for changes
+        under the same writer lock it appends under).
+        
+        Args:
+            update: Function from the current snapshot to the new one
+        
+        Returns:
+            True if a new snapshot was swapped in (False if the dataset is
+            not loaded yet; its first get() reads the files).
+        """
+        if not self._loaded:
+            return False
+        with self._lock:
+            stats = [_file_stat(p) for p in self.paths]
+            upstream_versions = self._current_upstream_versions()
+            snapshot = update(self._snapshot)
+            self._snapshot = snapshot
+            self._version = self._version_of(upstream_versions)
+            self._stats = stats
+            self._upstream_versions = upstream_versions
+        
+        logger.info(f"Dataset '{self.name}' updated in place (version {self._version})")
+        self._notify(snapshot)
+        return True
+    
+    def _notify(self, snapshot: T) -> None:
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.warning(f"Reload listener for '{self.name}' failed: {e}")
+
+
+def get_datasets() -> Dict[str, "ReloadableDataset"]:
+    """Return the datasets created in this process, by name."""
+    with _registry_lock:
+        return dict(_datasets)
+
+
+def check_for_changes() -> List[str]:
+    """
+    Check every loaded dataset once and reload the ones that changed.
+    
+    Returns:
+        Names of the datasets that were reloaded.
+    """
+    with _registry_lock:
+        datasets = list(_datasets.values())
+    return [ds.name for ds in datasets if ds.reload_if_changed()]
+
+
+def get_data_versions(names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """
+    Get dataset versions, for use in cache keys.
+    
+    Args:
+        names: Dataset names (default: every dataset); unknown names are
+            skipped
+    
+    Returns:
+        Dict of dataset name -> content version of the loaded snapshot
+        (loading the dataset if needed).
+    """
+    with _registry_lock:
+        datasets = dict(_datasets)
+    if names is None:
+        names = list(datasets)
+    return {name: datasets[name].version for name in names if name in datasets}
+
+
+def start_watcher(interval: float = 5.0) -> None:
+    """
+    Start the background thread that reloads changed datasets.
+    
+    Args:
+        interval: Seconds between checks
+    """
+    global _watcher
+    if _watcher is not None and _watcher.is_alive():
+        return
+    
+    def _run() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                check_for_changes()
+            except Exception as e:
+                logger.warning(f"Data watcher check failed: {e}")
+    
+    _watcher = threading.Thread(target=_run, name="data-reload-watcher", daemon=True)
+    _watcher.start()
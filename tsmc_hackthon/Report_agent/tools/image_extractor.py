@@ -0,0 +1,249 @@
+"""
+PDF Image Extraction
+
+This module extracts embedded images from a directory of PDFs with a
+worker pool and stores them once per distinct content:
+
+- Images are written to a content-addressed store,
+  <store>/objects/<sha[:2]>/<sha>.<ext>, so a logo or header repeated on
+  every page (or in every deck) is stored once.
+- A manifest (<store>/manifest.json) records, per source PDF (keyed by
+  file hash), every image occurrence with its page and original name, and
+  per stored object its size and how often it occurs. PDFs already in the
+  manifest are skipped on re-runs.
+
+Usage:
+    python -m tools.image_extractor decks/ --workers 4
+    python -m tools.image_extractor report.pdf --store data/image_store
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from tools.pdf_extractor import _open_reader, file_sha256, find_pdfs
+
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = Path(__file__).parent.parent / "data" / "image_store"
+MANIFEST_VERSION = 1
+
+
+def object_path(store_dir: Path, digest: str, ext: str) -> Path:
+    """Location of a stored image in the content-addressed store."""
+    return Path(store_dir) / "objects" / digest[:2] / f"{digest}{ext}"
+
+
+def _write_object(store_dir: Path, digest: str, ext: str, data: bytes) -> bool:
+    """
+    Store image bytes under their hash, unless already present.
+    
+    Returns:
+        True if the object was written, False if it already existed.
+    """
+    path = object_path(store_dir, digest, ext)
+    if path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    # Concurrent writers of the same object write identical bytes
+    os.replace(tmp_name, path)
+    return True
+
+
+def _extract_file(path: str, store_dir: str) -> Dict:
+    """
+    Worker: extract every image of one PDF into the store.
+    
+    Returns:
+        Dict with 'num_pages', 'images' (page, name, sha256, ext, bytes per
+        occurrence), 'page_errors' (pages whose images could not be read)
+        and 'written' (objects newly stored).
+    """
+    reader = _open_reader(path)
+    images = []
+    page_errors = []
+    written = 0
+    for number, page in enumerate(reader.pages, start=1):
+        try:
+            page_images = list(page.images)
+        except ImportError:
+            raise  # Missing image dependency: fail the file so it is retried
+        except Exception as e:
+            logger.warning(f"{path}: images on page {number} unreadable: {e}")
+            page_errors.append(number)
+            continue
+        for image in page_images:
+            data = image.data
+            digest = hashlib.sha256(data).hexdigest()
+            ext = Path(image.name).suffix.lower() or ".bin"
+            written += _write_object(Path(store_dir), digest, ext, data)
+            images.append({"page": number, "name": image.name, "sha256": digest, "ext": ext, "bytes": len(data)})
+    return {"num_pages": len(reader.pages), "images": images, "page_errors": page_errors, "written": written}
+
+
+def load_manifest(store_dir: Path = STORE_DIR) -> Dict:
+    """Read the store manifest (an empty one if missing or from another version)."""
+    try:
+        with open(Path(store_dir) / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {"version": MANIFEST_VERSION, "files": {}, "objects": {}}
+
+
+def _save_manifest(store_dir: Path, manifest: Dict) -> None:
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = store_dir / "manifest.json.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, store_dir / "manifest.json")
+
+
+def _record(manifest: Dict, store_dir: Path, path: Path, file_hash: str, result: Dict) -> None:
+    """Add one extracted PDF to the manifest."""
+    manifest["files"][file_hash] = {
+        "source_file": path.name,
+        "source_path": str(path),
+        "num_pages": result["num_pages"],
+        "page_errors": result["page_errors"],
+        "images": [
+            {**{k: v for k, v in image.items() if k != "bytes"},
+             "path": str(object_path(store_dir, image["sha256"], image["ext"]).relative_to(store_dir))}
+            for image in result["images"]
+        ],
+    }
+    for image in result["images"]:
+        entry = manifest["objects"].setdefault(
+            image["sha256"], {"ext": image["ext"], "bytes": image["bytes"], "occurrences": 0, "sources": []}
+        )
+        entry["occurrences"] += 1
+        if path.name not in entry["sources"]:
+            entry["sources"].append(path.name)
+
+
+def extract_images(
+    paths: Iterable[Path],
+    store_dir: Path = STORE_DIR,
+    workers: Optional[int] = None,
+    force: bool = False
+) -> Dict[str, int]:
+    """
+    Extract images from PDFs in parallel into the content-addressed store.
+    
+    The manifest is saved after every finished PDF, so an interrupted run
+    resumes where it stopped.
+    
+    Args:
+        paths: PDF files or folders
+        store_dir: Image store directory
+        workers: Worker processes (default: CPU count)
+        force: Re-extract PDFs that are already in the manifest
+    
+    Returns:
+        Counts: 'files', 'skipped_files', 'failed_files', 'images'
+        (occurrences found) and 'stored' (new objects written).
+    """
+    store_dir = Path(store_dir)
+    manifest = load_manifest(store_dir)
+    summary = {"files": 0, "skipped_files": 0, "failed_files": 0, "images": 0, "stored": 0}
+    
+    todo: Dict[str, Path] = {}
+    for path in find_pdfs(paths):
+        summary["files"] += 1
+        file_hash = file_sha256(path)
+        if (file_hash in manifest["files"] and not force) or file_hash in todo:
+            summary["skipped_files"] += 1
+            continue
+        if force and file_hash in manifest["files"]:
+            # Drop the old occurrences so re-extraction does not double count
+            for image in manifest["files"].pop(file_hash)["images"]:
+                entry = manifest["objects"].get(image["sha256"])
+                if entry:
+                    entry["occurrences"] -= 1
+        todo[file_hash] = path
+    
+    if not todo:
+        return summary
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_extract_file, str(path), str(store_dir)): file_hash for file_hash, path in todo.items()}
+        for future in as_completed(futures):
+            file_hash = futures[future]
+            path = todo[file_hash]
+            try:
+                result = future.result()
+            except Exception as e:
+                summary["failed_files"] += 1
+                logger.warning(f"{path}: image extraction failed: {e}")
+                continue
+            _record(manifest, store_dir, path, file_hash, result)
+            _save_manifest(store_dir, manifest)
+            summary["images"] += len(result["images"])
+            summary["stored"] += result["written"]
+            logger.info(f"{path.name}: {len(result['images'])} images, {result['written']} new")
+    return summary
+
+
+def images_for(source_file: str, store_dir: Path = STORE_DIR, min_occurrences: int = 1, max_occurrences: Optional[int] = None) -> List[Dict]:
+    """
+    Image occurrences of a source PDF, with absolute paths.
+    
+    Args:
+        source_file: PDF file name as recorded in the manifest
+        store_dir: Image store directory
+        min_occurrences: Skip objects seen fewer times than this
+        max_occurrences: Skip objects seen more often than this (e.g. 1 to
+            drop logos and headers repeated across pages or decks)
+    
+    Returns:
+        List of image dicts ('page', 'name', 'sha256', 'ext', 'path').
+    """
+    store_dir = Path(store_dir)
+    manifest = load_manifest(store_dir)
+    images = []
+    for entry in manifest["files"].values():
+        if entry["source_file"] != source_file:
+            continue
+        for image in entry["images"]:
+            occurrences = manifest["objects"].get(image["sha256"], {}).get("occurrences", 0)
+            if occurrences < min_occurrences or (max_occurrences is not None and occurrences > max_occurrences):
+                continue
+            images.append({**image, "path": str(store_dir / image["path"])})
+    return images
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Extract PDF images in parallel into a content-addressed store.")
+    parser.add_argument("paths", nargs="+", type=Path, help="PDF files or folders")
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help="Image store directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-extract PDFs already in the manifest")
+    args = parser.parse_args(argv)
+    
+    missing = [str(p) for p in args.paths if not p.exists()]
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        sys.exit(1)
+    
+    summary = extract_images(args.paths, store_dir=args.store, workers=args.workers, force=args.force)
+    print(f"🖼️  {summary['files']} PDFs ({summary['skipped_files']} already processed, "
+          f"{summary['failed_files']} failed): {summary['images']} images, {summary['stored']} new objects")
+
+
+if __name__ == "__main__":
+    main()
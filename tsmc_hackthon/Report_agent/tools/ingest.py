@@ -0,0 +1,267 @@
+"""
+Incremental Document Ingestion
+
+This module adds new news articles, earnings calls and PDF pages
+(tools.pdf_extractor) without rewriting
+data/news.json or data/earnings_calls.json and without re-indexing the
+corpus:
+
+1. Records are read from JSONL/JSON files or folders of them.
+2. Duplicates are dropped by content hash and by document ID (article
+   'id', or company + date for earnings calls), so re-running an
+   ingestion is a no-op.
+3. New records are appended to the document store (tools.document_store).
+4. Only the new documents are chunked and embedded, and written to the
+   vector index as one new segment. Opening the index reads the persisted
+   BM25 statistics instead of re-tokenizing the corpus, and the index
+   merges its segments once there are more than MAX_SEGMENTS.
+
+This process's loaded news and earnings call snapshots are extended
+with the new documents only (NewsIndex.extended), without re-reading the
+ingestion log; other running processes pick the new documents up through
+the hot-reload watcher.
+
+Usage:
+    python -m tools.ingest incoming/news_2026-01-21.jsonl
+    python -m tools.ingest incoming/ --kind earnings_calls
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tools import document_store
+from tools.hot_reload import check_for_changes, fingerprint_files
+from tools.mock_rag import (
+    _VECTOR_INDEX_DIR, _load_earnings_data, _load_news_index, _read_earnings_data, _read_news_data,
+    add_ingested_documents, rag_sources
+)
+from tools.vector_store import VectorIndex, earnings_call_documents, news_documents, pdf_page_documents
+
+
+logger = logging.getLogger(__name__)
+
+_INPUT_SUFFIXES = (".jsonl", ".json")
+
+
+def read_records(paths: Iterable[Path]) -> List[Tuple[Dict, str]]:
+    """
+    Read records from JSONL / JSON files, or folders containing them.
+    
+    A JSON file may hold one object or a list of objects. Folders are
+    read recursively in file-name order.
+    
+    Args:
+        paths: Files or folders
+    
+    Returns:
+        List of (record, source file name).
+    """
+    files: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix in _INPUT_SUFFIXES))
+        else:
+            files.append(path)
+    
+    records = []
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            if file.suffix == ".jsonl":
+                items = [json.loads(line) for line in f if line.strip()]
+            else:
+                data = json.load(f)
+                items = data if isinstance(data, list) else [data]
+        records.extend((item, file.name) for item in items if isinstance(item, dict))
+    return records
+
+
+def detect_kind(record: Dict) -> Optional[str]:
+    """Guess whether a record is a news article, an earnings call or a PDF page."""
+    if "related_companies" in record:
+        return "news"
+    if "page" in record and "text" in record:
+        return "pdf_pages"
+    if "company_id" in record and any(k in record for k in ("key_points", "transcript", "outlook")):
+        return "earnings_calls"
+    return None
+
+
+def _document_id(kind: str, record: Dict) -> str:
+    if kind in ("news", "pdf_pages"):
+        return str(record["id"])
+    return f"{record['company_id']}:{record.get('date')}"
+
+
+def _is_default_store(store_dir: Path) -> bool:
+    """Whether store_dir is the store the loaded datasets are built from."""
+    return Path(store_dir).resolve() == document_store.STORE_DIR.resolve()
+
+
+def _existing_ids(kind: str, store_dir: Path = document_store.STORE_DIR) -> set:
+    """IDs of documents already in the base data or the store."""
+    if kind == "pdf_pages":
+        # Page IDs are derived from the file hash, so the content hash covers them
+        return set()
+    # The loaded snapshots cover the default store; another store is read here
+    default = _is_default_store(store_dir)
+    if kind == "news":
+        return set((_load_news_index() if default else _read_news_data(store_dir)).id_positions)
+    return {
+        f"{company_id}:{call.get('date')}"
+        for company_id, calls in (_load_earnings_data() if default else _read_earnings_data(store_dir)).items()
+        for call in calls
+    }
+
+
+def _prepare(kind: str, record: Dict, source_file: str) -> Optional[Dict]:
+    """Validate a record and add its ID, content hash and provenance."""
+    record = dict(record)
+    if kind == "news":
+        if not isinstance(record.get("related_companies"), list):
+            return None
+        if record.get("id") is None:
+            record["id"] = f"news_{document_store.content_hash(record)[:12]}"
+    elif kind == "pdf_pages":
+        if not record.get("id") or not isinstance(record.get("text"), str):
+            return None
+    elif not record.get("company_id") or not record.get("date"):
+        return None
+    record["content_hash"] = document_store.content_hash(record)
+    record.setdefault("source_file", source_file)
+    record["ingested_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return record
+
+
+def ingest_records(
+    records: Iterable[Tuple[Dict, str]],
+    kind: Optional[str] = None,
+    store_dir: Path = document_store.STORE_DIR,
+    index_dir: Path = _VECTOR_INDEX_DIR,
+    embed: bool = True
+) -> Dict[str, Dict[str, int]]:
+    """
+    Ingest new documents into the store and update the indexes incrementally.
+    
+    Args:
+        records: (record, source file name) pairs
+        kind: "news", "earnings_calls" or "pdf_pages" (default: detect per record)
+        store_dir: Document store directory
+        index_dir: Vector index directory
+        embed: Embed new documents into the vector index now (otherwise
+            the index is rebuilt on its next load)
+    
+    Returns:
+        Dict of kind -> counts ('added', 'duplicate', 'invalid'); records of
+        unrecognized kind are counted as invalid under "unknown".
+    """
+    stats = {k: {"added": 0, "duplicate": 0, "invalid": 0} for k in (*document_store.KINDS, "unknown")}
+    added: Dict[str, List[Dict]] = {k: [] for k in document_store.KINDS}
+    sources = rag_sources(store_dir)
+    
+    with document_store.locked(store_dir):
+        # Pick up documents another process ingested since we loaded
+        check_for_changes()
+        
+        # Only extend the vector index if it is current before this batch
+        index = VectorIndex.load(index_dir) if embed else None
+        if index is not None and index.source_fingerprint != fingerprint_files(sources):
+            logger.info("Vector index is stale; it will be rebuilt on next load")
+            index = None
+        
+        seen_hashes = {k: document_store.read_hashes(k, store_dir) for k in document_store.KINDS}
+        seen_ids: Dict[str, set] = {}
+        for record, source_file in records:
+            record_kind = kind or detect_kind(record)
+            if record_kind not in document_store.KINDS:
+                stats["unknown"]["invalid"] += 1
+                continue
+            prepared = _prepare(record_kind, record, source_file)
+            if prepared is None:
+                stats[record_kind]["invalid"] += 1
+                continue
+            if record_kind not in seen_ids:
+                seen_ids[record_kind] = _existing_ids(record_kind, store_dir)
+            document_id = _document_id(record_kind, prepared)
+            if prepared["content_hash"] in seen_hashes[record_kind] or document_id in seen_ids[record_kind]:
+                stats[record_kind]["duplicate"] += 1
+                continue
+            seen_hashes[record_kind].add(prepared["content_hash"])
+            seen_ids[record_kind].add(document_id)
+            added[record_kind].append(prepared)
+            stats[record_kind]["added"] += 1
+        
+        for record_kind, kind_records in added.items():
+            document_store.append_documents(record_kind, kind_records, store_dir)
+        
+        if index is not None and any(added.values()):
+            calls: Dict[str, List[Dict]] = {}
+            for call in added["earnings_calls"]:
+                calls.setdefault(call["company_id"], []).append(call)
+            index.add_documents(earnings_call_documents(calls))
+            index.add_documents(news_documents(added["news"]))
+            index.add_documents(pdf_page_documents(added["pdf_pages"]))
+            index.source_fingerprint = fingerprint_files(sources)
+            index.save(index_dir)
+        
+        # Still under the lock, so the loaded snapshots plus this batch are
+        # exactly what the files now hold
+        if _is_default_store(store_dir) and any(added.values()):
+            serves_index = Path(index_dir).resolve() == _VECTOR_INDEX_DIR.resolve()
+            add_ingested_documents(added, index if serves_index else None)
+    
+    # Anything not updated in place (e.g. a stale vector index) reloads here
+    check_for_changes()
+    return stats
+
+
+def ingest(
+    paths: Iterable[Path],
+    kind: Optional[str] = None,
+    store_dir: Path = document_store.STORE_DIR,
+    index_dir: Path = _VECTOR_INDEX_DIR,
+    embed: bool = True
+) -> Dict[str, Dict[str, int]]:
+    """
+    Ingest documents from JSONL/JSON files or folders (see ingest_records).
+    
+    Args:
+        paths: JSONL/JSON files or folders
+        kind: Document kind (default: detect per record)
+        store_dir: Document store directory
+        index_dir: Vector index directory
+        embed: Embed new documents into the vector index now
+    
+    Returns:
+        Dict of kind -> counts ('added', 'duplicate', 'invalid').
+    """
+    return ingest_records(read_records(paths), kind, store_dir, index_dir, embed)
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Ingest news articles and earnings calls from JSONL/JSON files.")
+    parser.add_argument("paths", nargs="+", type=Path, help="JSONL/JSON files or folders")
+    parser.add_argument("--kind", choices=document_store.KINDS, help="Document kind (default: detect per record)")
+    parser.add_argument("--no-embed", action="store_true", help="Skip embedding; rebuild the vector index on next load")
+    args = parser.parse_args(argv)
+    
+    missing = [str(p) for p in args.paths if not p.exists()]
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        sys.exit(1)
+    
+    stats = ingest(args.paths, kind=args.kind, embed=not args.no_embed)
+    for kind, counts in stats.items():
+        if any(counts.values()):
+            print(f"📥 {kind}: {counts['added']} added, {counts['duplicate']} duplicate, {counts['invalid']} invalid")
+    if not any(any(c.values()) for c in stats.values()):
+        print("📥 No records found")
+
+
+if __name__ == "__main__":
+    main()
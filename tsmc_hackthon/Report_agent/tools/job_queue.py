@@ -0,0 +1,416 @@
+"""
+Durable Job Queue
+
+SQLite-backed queue of report jobs (data/job_queue.sqlite), shared by any
+number of worker processes (worker.py) on one host, or on several hosts
+that share the database file.
+
+- A job is a company and the query its report is generated for. An
+  active (queued or running) job is enqueued only once per company and
+  query, so enqueueing the coverage list twice does not duplicate work.
+- Workers claim the oldest available job in an immediate transaction,
+  so exactly one worker gets it. The claim is a lease: a random token
+  and an expiry that the worker extends with heartbeats while the
+  report runs.
+- A job whose lease expires (the worker crashed or hung) is claimed
+  again by the next worker. Failed attempts are retried with exponential
+  backoff, up to the job's maximum attempts; errors a retry would repeat
+  fail the job at once.
+- Heartbeats and completion name the lease token, so a worker that lost
+  its lease cannot overwrite the result of the worker that took over.
+  Completing the same lease twice is a no-op.
+
+Leases compare wall-clock times, so hosts sharing the queue need
+synchronized clocks. SQLite's WAL mode needs shared memory and does not
+work on network file systems: set JOB_QUEUE_JOURNAL=DELETE on every host
+when the file is on a network share.
+
+Usage:
+    python -m tools.job_queue enqueue                 # every company in the graph
+    python -m tools.job_queue enqueue 2330 NVDA --query "分析 {name} 的供應鏈"
+    python -m tools.job_queue watch                   # progress until the queue drains
+    python -m tools.job_queue status
+    python -m tools.job_queue requeue                 # retry failed jobs
+    python worker.py                                  # run jobs (any number of workers)
+"""
+
+import contextlib
+import os
+import secrets
+import socket
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from tools.graph_reader import get_graph
+
+
+QUEUE_PATH = Path(os.getenv("JOB_QUEUE_PATH", Path(__file__).parent.parent / "data" / "job_queue.sqlite"))
+JOURNAL_MODE = os.getenv("JOB_QUEUE_JOURNAL", "WAL").upper()
+
+# Seconds a claim is valid without a heartbeat
+LEASE_SECONDS = 120.0
+MAX_ATTEMPTS = 3
+# Delay before retry n is RETRY_BASE_SECONDS * 2 ** (n - 1)
+RETRY_BASE_SECONDS = 30.0
+
+# Query of coverage jobs; {name} and {company_id} are filled in
+COVERAGE_QUERY = "分析 {name}"
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY,
+    company_id TEXT NOT NULL,
+    query TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    worker TEXT,
+    lease_token TEXT,
+    lease_until REAL,
+    heartbeat_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_available ON jobs(status, available_at, job_id);
+CREATE INDEX IF NOT EXISTS jobs_lease ON jobs(status, lease_until);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_active ON jobs(company_id, query) WHERE status IN ('queued', 'running');
+"""
+
+_JOB_COLUMNS = (
+    "job_id", "company_id", "query", "status", "attempts", "max_attempts", "available_at", "created_at",
+    "worker", "lease_token", "lease_until", "heartbeat_at", "started_at", "finished_at", "result", "error",
+)
+
+
+def worker_name() -> str:
+    """Identifies this process in the queue: host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _job_dict(row: sqlite3.Row) -> Dict:
+    return dict(zip(_JOB_COLUMNS, row))
+
+
+class JobQueue:
+    """
+    Report job queue in a SQLite file.
+    
+    Connections are opened per operation, so a queue object can be
+    shared between threads (e.g. a worker and its heartbeat thread).
+    
+    Args:
+        path: Database file (created if missing)
+        lease_seconds: Lease length of claimed jobs
+        journal_mode: SQLite journal mode ("WAL", or "DELETE" on network
+            file systems); use the same mode on every host
+    """
+    
+    def __init__(self, path: Path = QUEUE_PATH, lease_seconds: float = LEASE_SECONDS, journal_mode: str = JOURNAL_MODE):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.journal_mode = journal_mode
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            # Persistent for WAL; DELETE converts a WAL file back
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.executescript(_SCHEMA)
+    
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        A connection inside BEGIN IMMEDIATE: the write lock is taken up
+        front, so a read-then-update (claiming a job) cannot interleave
+        with another worker's.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
+    def enqueue(self, jobs: Iterable[Dict], max_attempts: int = MAX_ATTEMPTS) -> int:
+        """
+        Add jobs, skipping those already queued or running.
+        
+        Args:
+            jobs: Dicts with 'company_id' and 'query'
+            max_attempts: Attempts before a job is marked failed
+        
+        Returns:
+            Number of jobs added.
+        """
+        now = time.time()
+        rows = [(job["company_id"], job["query"], QUEUED, max_attempts, now, now) for job in jobs]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (company_id, query, status, max_attempts, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return conn.total_changes - before
+    
+    def claim(self, worker: Optional[str] = None) -> Optional[Dict]:
+        """
+        Lease the next available job.
+        
+        Queued jobs whose retry time has come are taken oldest first, then
+        running jobs whose lease expired. An expired job that already used
+        all its attempts is marked failed instead.
+        
+        Args:
+            worker: Name recorded on the job (default: host:pid)
+        
+        Returns:
+            The claimed job (with its 'lease_token'), or None if no job
+            is available.
+        """
+        worker = worker or worker_name()
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_token = NULL, error = 'lease expired' "
+                "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                (FAILED, now, RUNNING, now),
+            )
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ? AND available_at <= ? ORDER BY available_at, job_id LIMIT 1",
+                (QUEUED, now),
+            ).fetchone()
+            if row is None:
+                row = conn.execute(
+                    "SELECT job_id FROM jobs WHERE status = ? AND lease_until < ? ORDER BY lease_until LIMIT 1",
+                    (RUNNING, now),
+                ).fetchone()
+            if row is None:
+                return None
+            token = secrets.token_hex(8)
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_token = ?, "
+                "lease_until = ?, heartbeat_at = ?, started_at = ?, error = NULL WHERE job_id = ?",
+                (RUNNING, worker, token, now + self.lease_seconds, now, now, row[0]),
+            )
+            return _job_dict(conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE job_id = ?", row).fetchone())
+    
+    def heartbeat(self, job_id: int, lease_token: str) -> bool:
+        """
+        Extend a lease.
+        
+        Returns:
+            False if the lease was lost (expired and claimed by another
+            worker, or the job finished).
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, heartbeat_at = ? WHERE job_id = ? AND lease_token = ? AND status = ?",
+                (now + self.lease_seconds, now, job_id, lease_token, RUNNING),
+            )
+            return cursor.rowcount == 1
+    
+    def complete(self, job_id: int, lease_token: str, result: str) -> bool:
+        """
+        Mark a leased job done.
+        
+        Args:
+            job_id: Job ID
+            lease_token: Token returned by claim()
+            result: Where the output went (e.g. the report path)
+        
+        Returns:
+            True if the job is done under this lease (also when it
+            already was); False if the lease was lost.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, lease_until = NULL "
+                "WHERE job_id = ? AND lease_token = ? AND status = ?",
+                (DONE, time.time(), result, job_id, lease_token, RUNNING),
+            )
+            if cursor.rowcount == 1:
+                return True
+            row = conn.execute(
+                "SELECT 1 FROM jobs WHERE job_id = ? AND lease_token = ? AND status = ?", (job_id, lease_token, DONE)
+            ).fetchone()
+            return row is not None
+    
+    def fail(self, job_id: int, lease_token: str, error: str, retry: bool = True) -> Optional[str]:
+        """
+        Record a failed attempt: retry later, or mark the job failed when
+        it used all its attempts.
+        
+        Args:
+            job_id: Job ID
+            lease_token: Token returned by claim()
+            error: Error message
+            retry: False for errors every attempt would repeat (the job is
+                marked failed right away)
+        
+        Returns:
+            The job's new status, or None if the lease was lost.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND lease_token = ? AND status = ?",
+                (job_id, lease_token, RUNNING),
+            ).fetchone()
+            if row is None:
+                return None
+            attempts, max_attempts = row
+            if attempts >= max_attempts or not retry:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, error = ?, lease_until = NULL WHERE job_id = ?",
+                    (FAILED, now, error, job_id),
+                )
+                return FAILED
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, error = ?, lease_token = NULL, lease_until = NULL "
+                "WHERE job_id = ?",
+                (QUEUED, now + RETRY_BASE_SECONDS * 2 ** (attempts - 1), error, job_id),
+            )
+            return QUEUED
+    
+    def requeue_failed(self) -> int:
+        """Queue every failed job again with fresh attempts; returns how many."""
+        with self._transaction() as conn:
+            # OR IGNORE: skip jobs whose company and query are already active
+            cursor = conn.execute(
+                "UPDATE OR IGNORE jobs SET status = ?, attempts = 0, available_at = ?, finished_at = NULL "
+                "WHERE status = ?",
+                (QUEUED, time.time(), FAILED),
+            )
+            return cursor.rowcount
+    
+    def job(self, job_id: int) -> Optional[Dict]:
+        """One job, or None."""
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _job_dict(row) if row else None
+    
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Jobs (optionally of one status), newest first."""
+        where, params = ("WHERE status = ?", (status,)) if status else ("", ())
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs {where} ORDER BY job_id DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [_job_dict(row) for row in rows]
+    
+    def stats(self) -> Dict:
+        """
+        Queue progress.
+        
+        Returns:
+            Dict with a count per status, 'total', 'expired' (running jobs
+            past their lease), 'done_last_minute' and 'workers' (distinct
+            workers holding leases).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            expired, workers = conn.execute(
+                "SELECT COALESCE(SUM(lease_until < ?), 0), COUNT(DISTINCT worker) FROM jobs WHERE status = ?",
+                (now, RUNNING),
+            ).fetchone()
+            recent = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND finished_at >= ?", (DONE, now - 60)
+            ).fetchone()[0]
+        stats = {status: counts.get(status, 0) for status in STATUSES}
+        stats.update(total=sum(counts.values()), expired=expired, done_last_minute=recent, workers=workers)
+        return stats
+
+
+def coverage_jobs(company_ids: Optional[Iterable[str]] = None, query: str = COVERAGE_QUERY) -> List[Dict]:
+    """
+    Jobs for the coverage list.
+    
+    Args:
+        company_ids: Companies to cover (default: every graph company)
+        query: Query template; {name} and {company_id} are filled in
+    
+    Returns:
+        List of {'company_id', 'query'}.
+    """
+    graph = get_graph()
+    names = dict(zip(graph.ids, graph.names))
+    ids = list(company_ids) if company_ids is not None else list(graph.ids)
+    return [{"company_id": cid, "query": query.format(name=names.get(cid) or cid, company_id=cid)} for cid in ids]
+
+
+def format_stats(stats: Dict) -> str:
+    """One progress line."""
+    finished = stats[DONE] + stats[FAILED]
+    percent = 100.0 * finished / stats["total"] if stats["total"] else 100.0
+    line = (f"{datetime.now():%H:%M:%S}  queued {stats[QUEUED]}  running {stats[RUNNING]} "
+            f"({stats['workers']} workers)  done {stats[DONE]}  failed {stats[FAILED]}  {percent:.1f}%")
+    if stats["done_last_minute"]:
+        line += f"  {stats['done_last_minute']}/min"
+    if stats["expired"]:
+        line += f"  ⚠️ {stats['expired']} expired leases"
+    return line
+
+
+def _format_job(job: Dict) -> str:
+    extra = job["result"] or job["error"] or job["worker"] or ""
+    return f"#{job['job_id']:<6} {job['status']:<8} {job['company_id']:<8} attempt {job['attempts']}/{job['max_attempts']}  {extra}"
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("enqueue", "watch", "status", "requeue"):
+        print(__doc__)
+        sys.exit(1)
+    command, args = argv[0], argv[1:]
+    queue = JobQueue()
+    
+    if command == "enqueue":
+        query = COVERAGE_QUERY
+        if "--query" in args:
+            position = args.index("--query")
+            query = args[position + 1]
+            args = args[:position] + args[position + 2:]
+        jobs = coverage_jobs(args or None, query)
+        added = queue.enqueue(jobs)
+        print(f"✅ Enqueued {added} jobs ({len(jobs) - added} already queued or running)")
+    elif command == "requeue":
+        print(f"✅ Requeued {queue.requeue_failed()} failed jobs")
+    elif command == "status":
+        print(format_stats(queue.stats()))
+        for job in queue.jobs(RUNNING) + queue.jobs(FAILED, limit=20):
+            print(_format_job(job))
+    else:
+        interval = float(args[0]) if args else 5.0
+        while True:
+            stats = queue.stats()
+            print(format_stats(stats), flush=True)
+            if stats[QUEUED] == 0 and stats[RUNNING] == 0:
+                break
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,24 +3,87 @@ Mock BigQuery Tool
 
 This module simulates BigQuery queries for financial data.
 In production, this would connect to actual BigQuery.
+
+Quarterly history (financials_extended.json) is served from a columnar
+FinancialStore (tools.financial_store); FX rates can be overridden in
+data/fx_rates.json.
+
+Set FINANCIAL_BACKEND=warehouse to answer query_financial_data from the
+local SQL warehouse (tools.warehouse) instead of the in-memory JSON data.
+Range and aggregate queries always go through the warehouse.
 """
 
 import json
-from typing import Dict, Optional
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
 from pathlib import Path
 
+from tools import prefetch
+from tools.financial_store import FinancialStore
+from tools.hot_reload import ReloadableDataset
+from tools.snapshot import load_or_parse
+from tools.warehouse import get_warehouse
+
 
 _DATA_PATH = Path(__file__).parent.parent / "data" / "financials.json"
-_financial_data: Optional[Dict] = None
+_EXTENDED_PATH = Path(__file__).parent.parent / "data" / "financials_extended.json"
+_RATES_PATH = Path(__file__).parent.parent / "data" / "fx_rates.json"
+
+# "json" (in-memory snapshot) or "warehouse" (tools.warehouse)
+FINANCIAL_BACKEND = os.getenv("FINANCIAL_BACKEND", "json")
+
+
+def _parse_json(path: Path) -> Dict:
+    """Read a JSON data file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read_financial_data() -> Dict:
+    """Read financial data from the binary snapshot, or JSON if it is stale."""
+    return load_or_parse("financials", _DATA_PATH, _parse_json)
+
+
+def _parse_financial_store(path: Path) -> FinancialStore:
+    """Read financials_extended.json and build the columnar store."""
+    return FinancialStore(_parse_json(path))
+
+
+def _read_financial_store() -> FinancialStore:
+    """Read the columnar store (snapshot or JSON) and apply FX rate overrides."""
+    store = load_or_parse("financials_extended", _EXTENDED_PATH, _parse_financial_store)
+    if _RATES_PATH.exists():
+        store = FinancialStore(store.records, _parse_json(_RATES_PATH))
+    return store
+
+
+_financial_dataset = ReloadableDataset("financials", [_DATA_PATH], _read_financial_data)
+FINANCIAL_STORE_DATASET = "financials_extended"
+_extended_dataset = ReloadableDataset(FINANCIAL_STORE_DATASET, [_EXTENDED_PATH, _RATES_PATH], _read_financial_store)
+_financial_dataset.add_listener(lambda _: prefetch.invalidate("financials"))
 
 
 def _load_data() -> Dict:
-    """Load financial data from JSON file."""
-    global _financial_data
-    if _financial_data is None:
-        with open(_DATA_PATH, "r", encoding="utf-8") as f:
-            _financial_data = json.load(f)
-    return _financial_data
+    """Return the current financial data snapshot."""
+    return _financial_dataset.get()
+
+
+def get_financial_store() -> FinancialStore:
+    """Return the current columnar store of quarterly financials."""
+    return _extended_dataset.get()
+
+
+def query_extended_financial_data(company_id: str) -> Dict:
+    """
+    Query quarterly financial history for a company.
+    
+    Args:
+        company_id: The company ID (e.g., "2330")
+    
+    Returns:
+        The company's financials_extended.json record, or {} if not found.
+    """
+    return get_financial_store().get(company_id)
 
 
 def query_financial_data(company_id: str) -> Optional[Dict]:
@@ -36,10 +99,91 @@ def query_financial_data(company_id: str) -> Optional[Dict]:
     Note: This is a mock implementation. In production, this would execute
     a BigQuery SQL query.
     """
+    cached = prefetch.get("financials", (company_id,))
+    if cached is not prefetch.MISSING:
+        return cached
+    if FINANCIAL_BACKEND == "warehouse":
+        return get_warehouse().get_financials(company_id)
     data = _load_data()
     return data.get(company_id)
 
 
+def query_financial_data_many(company_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Query financial data for several companies in one pass.
+    
+    Inside a prefetch.prefetching() block the results are also registered
+    for query_financial_data.
+    
+    Args:
+        company_ids: Company IDs (e.g., ["2330", "NVDA"])
+    
+    Returns:
+        Dict of company ID -> financial data dict (None if not found).
+    """
+    company_ids = list(dict.fromkeys(company_ids))
+    if FINANCIAL_BACKEND == "warehouse":
+        results = get_warehouse().get_financials_many(company_ids)
+    else:
+        data = _load_data()
+        results = {company_id: data.get(company_id) for company_id in company_ids}
+    for company_id, result in results.items():
+        prefetch.put("financials", (company_id,), result)
+    return results
+
+
+def query_quarterly_metrics(
+    company_id: str,
+    start_quarter: Optional[str] = None,
+    end_quarter: Optional[str] = None,
+    metrics: Optional[Sequence[str]] = None
+) -> List[Dict]:
+    """
+    Query a company's quarterly metrics within a quarter range.
+    
+    Args:
+        company_id: The company ID (e.g., "2330")
+        start_quarter: First quarter, inclusive (e.g., "2024Q4")
+        end_quarter: Last quarter, inclusive
+        metrics: Only these metrics (e.g., ["revenue", "gross_margin"])
+    
+    Returns:
+        Rows with 'quarter', 'metric', 'value' and 'unit', by quarter.
+    """
+    return get_warehouse().get_quarterly_metrics(company_id, start_quarter, end_quarter, metrics)
+
+
+def query_metric_aggregate(
+    metric: str,
+    agg: str = "avg",
+    group_by: str = "quarter",
+    start_quarter: Optional[str] = None,
+    end_quarter: Optional[str] = None,
+    company_ids: Optional[Sequence[str]] = None
+) -> List[Dict]:
+    """
+    Aggregate a metric across companies (group_by="quarter") or quarters
+    (group_by="company").
+    
+    Args:
+        metric: Metric name (e.g., "gross_margin")
+        agg: "avg", "sum", "min", "max" or "count"
+        group_by: "quarter" or "company"
+        start_quarter: First quarter, inclusive
+        end_quarter: Last quarter, inclusive
+        company_ids: Only these companies
+    
+    Returns:
+        Rows with the group key, 'value' and 'n' (values aggregated).
+    """
+    return get_warehouse().aggregate_metric(metric, agg, group_by, start_quarter, end_quarter, company_ids)
+
+
+def _format_amount(value) -> str:
+    """Thousands-separated amount, or the value as is if it is not a number."""
+    return f"{value:,}" if isinstance(value, (int, float)) else str(value)
+
+
 def format_financial_summary(data: Dict) -> str:
     """
     Format financial data into a readable summary.
@@ -62,10 +206,10 @@ def format_financial_summary(data: Dict) -> str:
 
 | Metric | Value | Change |
 |--------|-------|--------|
-| Revenue | {revenue.get('value', 'N/A'):,} {revenue.get('unit', '')} | YoY {revenue.get('yoy_growth', 'N/A')} |
+| Revenue | {_format_amount(revenue.get('value', 'N/A'))} {revenue.get('unit', '')} | YoY {revenue.get('yoy_growth', 'N/A')} |
 | Gross Margin | {gross_margin.get('value', 'N/A')}% | QoQ {gross_margin.get('qoq_change', 'N/A')} |
 | Operating Margin | {data.get('operating_margin', {}).get('value', 'N/A')}% | - |
-| Net Income | {net_income.get('value', 'N/A'):,} {net_income.get('unit', '')} | YoY {net_income.get('yoy_growth', 'N/A')} |
+| Net Income | {_format_amount(net_income.get('value', 'N/A'))} {net_income.get('unit', '')} | YoY {net_income.get('yoy_growth', 'N/A')} |
 | EPS | {data.get('eps', {}).get('value', 'N/A')} {data.get('eps', {}).get('unit', '')} | - |
 
 **Revenue by Platform:**
@@ -0,0 +1,232 @@
+"""
+News Inverted Index
+
+This module builds a company -> articles index over news.json, sorted by
+date at load time, so that news queries do not scan the whole corpus.
+
+The index is stored in CSR form: for each company, a contiguous slice of
+article dates (as day ordinals, ascending) and the matching article
+positions. Time windows are resolved with binary search (np.searchsorted)
+and sentiment filters are vectorized over the selected slice.
+
+New articles can be merged into an existing index with `extended()`,
+which inserts their postings into the sorted arrays (binary search + one
+copy) instead of re-sorting the whole corpus.
+"""
+
+import copy
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+SENTIMENTS = ("positive", "neutral", "negative")
+_SENTIMENT_CODES = {name: code for code, name in enumerate(SENTIMENTS)}
+_UNKNOWN_SENTIMENT = len(SENTIMENTS)
+
+DateLike = Union[str, date, None]
+
+# Dates are below 2**20 as ordinals; (company, date) packs into one int64 sort key
+_DATE_BITS = 20
+
+
+def _to_ordinal(value: DateLike, default: int) -> int:
+    """Convert 'YYYY-MM-DD' / date to a day ordinal (default if empty or invalid)."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return default
+
+
+class NewsIndex:
+    """
+    Date-ordered inverted index from company ID to news articles.
+    
+    Args:
+        articles: List of article dicts as stored in news.json
+    """
+    
+    def __init__(self, articles: List[Dict]):
+        self.articles = articles
+        self.company_codes: Dict[str, int] = {}
+        self.id_positions: Dict[str, int] = {}
+        self.ordinals, self.sentiments, companies, positions = self._encode(articles, 0)
+        dates = self.ordinals[positions]
+        
+        # Sort postings by company, then date; ties in reverse file order so
+        # that reading a slice backwards gives newest first, file order within a day
+        order = np.lexsort((-positions, dates, companies))
+        self.posting_articles = positions[order]
+        self.posting_dates = dates[order]
+        self.indptr = np.zeros(len(self.company_codes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(companies, minlength=len(self.company_codes)), out=self.indptr[1:])
+        
+        valid = self.ordinals[self.ordinals > 0]
+        self.latest_ordinal = int(valid.max()) if valid.size else 0
+    
+    def _encode(self, articles: List[Dict], offset: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Encode articles stored at positions offset, offset + 1, ...
+        
+        Registers new company codes and article IDs as a side effect.
+        
+        Returns:
+            (ordinals, sentiments, posting companies, posting positions).
+        """
+        num_articles = len(articles)
+        ordinals = np.fromiter(
+            (_to_ordinal(a.get("date"), 0) for a in articles), dtype=np.int32, count=num_articles
+        )
+        sentiments = np.fromiter(
+            (_SENTIMENT_CODES.get(a.get("sentiment", "neutral"), _UNKNOWN_SENTIMENT) for a in articles),
+            dtype=np.int8, count=num_articles
+        )
+        
+        # Flatten (company, article) postings
+        posting_company: List[int] = []
+        posting_article: List[int] = []
+        for position, article in enumerate(articles, start=offset):
+            if article.get("id") is not None:
+                self.id_positions[str(article["id"])] = position
+            for company_id in dict.fromkeys(article.get("related_companies", [])):
+                code = self.company_codes.setdefault(company_id, len(self.company_codes))
+                posting_company.append(code)
+                posting_article.append(position)
+        return (
+            ordinals,
+            sentiments,
+            np.asarray(posting_company, dtype=np.int32),
+            np.asarray(posting_article, dtype=np.int32),
+        )
+    
+    def extended(self, articles: List[Dict]) -> "NewsIndex":
+        """
+        Return a new index with articles appended, leaving this one unchanged.
+        
+        The new postings are sorted among themselves and inserted into the
+        existing sorted arrays at positions found by binary search, so the
+        cost is one copy of the arrays rather than a full re-sort.
+        
+        Args:
+            articles: Articles to append (after the existing ones)
+        
+        Returns:
+            The extended NewsIndex.
+        """
+        index = copy.copy(self)
+        index.articles = self.articles + list(articles)
+        index.company_codes = dict(self.company_codes)
+        index.id_positions = dict(self.id_positions)
+        ordinals, sentiments, companies, positions = index._encode(articles, len(self.articles))
+        index.ordinals = np.concatenate([self.ordinals, ordinals])
+        index.sentiments = np.concatenate([self.sentiments, sentiments])
+        
+        dates = ordinals[positions - len(self.articles)]
+        order = np.lexsort((-positions, dates, companies))
+        companies, dates, positions = companies[order], dates[order], positions[order]
+        
+        # Existing postings expanded to (company, date) keys; new positions are
+        # all larger, so they go before existing ties (side="left")
+        num_old = len(self.indptr) - 1
+        old_companies = np.repeat(np.arange(num_old, dtype=np.int64), np.diff(self.indptr))
+        old_keys = (old_companies << _DATE_BITS) | self.posting_dates.astype(np.int64)
+        new_keys = (companies.astype(np.int64) << _DATE_BITS) | dates.astype(np.int64)
+        insert_at = np.searchsorted(old_keys, new_keys, side="left")
+        index.posting_articles = np.insert(self.posting_articles, insert_at, positions)
+        index.posting_dates = np.insert(self.posting_dates, insert_at, dates)
+        
+        counts = np.bincount(companies, minlength=len(index.company_codes))
+        counts[:num_old] += np.diff(self.indptr)
+        index.indptr = np.zeros(len(index.company_codes) + 1, dtype=np.int64)
+        np.cumsum(counts, out=index.indptr[1:])
+        
+        valid = ordinals[ordinals > 0]
+        if valid.size:
+            index.latest_ordinal = max(self.latest_ordinal, int(valid.max()))
+        return index
+    
+    def __len__(self) -> int:
+        return len(self.articles)
+    
+    def get(self, article_id: str) -> Optional[Dict]:
+        """Look up an article by its ID."""
+        position = self.id_positions.get(str(article_id))
+        return self.articles[position] if position is not None else None
+    
+    @property
+    def latest_date(self) -> Optional[date]:
+        """Date of the newest article in the corpus."""
+        return date.fromordinal(self.latest_ordinal) if self.latest_ordinal else None
+    
+    def query(
+        self,
+        company_id: str,
+        limit: Optional[int] = 5,
+        since: DateLike = None,
+        until: DateLike = None,
+        sentiments: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Get articles mentioning a company, newest first.
+        
+        Args:
+            company_id: The company ID (e.g., "2330")
+            limit: Maximum number of articles (None for no limit)
+            since: Earliest date to include (inclusive)
+            until: Latest date to include (inclusive)
+            sentiments: Only include these sentiments (e.g. ["negative"])
+        
+        Returns:
+            List of article dicts.
+        """
+        code = self.company_codes.get(company_id)
+        if code is None:
+            return []
+        start, end = int(self.indptr[code]), int(self.indptr[code + 1])
+        dates = self.posting_dates[start:end]
+        
+        # Binary search the date window within this company's slice
+        lo = int(np.searchsorted(dates, _to_ordinal(since, 0), side="left"))
+        hi = int(np.searchsorted(dates, _to_ordinal(until, date.max.toordinal()), side="right"))
+        candidates = self.posting_articles[start + lo:start + hi][::-1]
+        
+        if sentiments is not None:
+            codes = [_SENTIMENT_CODES[s] for s in sentiments if s in _SENTIMENT_CODES]
+            candidates = candidates[np.isin(self.sentiments[candidates], codes)]
+        
+        if limit is not None:
+            candidates = candidates[:limit]
+        return [self.articles[i] for i in candidates.tolist()]
+    
+    def query_recent(
+        self,
+        company_id: str,
+        days: int = 30,
+        limit: Optional[int] = 20,
+        as_of: DateLike = None,
+        sentiments: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Get the latest articles within a trailing window, newest first.
+        
+        Args:
+            company_id: The company ID
+            days: Window length in days (inclusive of as_of)
+            limit: Maximum number of articles
+            as_of: End of the window (default: newest article in the corpus)
+            sentiments: Optional sentiment filter
+        
+        Returns:
+            List of article dicts.
+        """
+        end_ordinal = _to_ordinal(as_of, self.latest_ordinal)
+        if not end_ordinal:
+            return self.query(company_id, limit=limit, sentiments=sentiments)
+        end = date.fromordinal(end_ordinal)
+        start = end - timedelta(days=days - 1)
+        return self.query(company_id, limit=limit, since=start, until=end, sentiments=sentiments)
@@ -0,0 +1,137 @@
+"""
+Graph Node Memoization
+
+Opt-in cache for LangGraph nodes that are pure functions of a few state
+fields and the data files. A node's output is stored under a hash of
+(node name, those state fields, the versions of the datasets it reads),
+so it is reused until one of its inputs or data files changes.
+
+Tiers:
+    memory  in-process LRU
+    disk    memory LRU backed by data/node_cache/ (shared across runs)
+
+The disk tier is an LRU on file modification time (tools.disk_lru):
+entries unused for NODE_CACHE_MAX_AGE_DAYS (default 7) are dropped, and
+the least recently used entries are removed once the directory exceeds
+NODE_CACHE_MAX_MB (default 512). Outputs are unpickled on every hit, so
+callers get fresh copies.
+
+Enable with NODE_CACHE=memory or NODE_CACHE=disk (default: off). Hits
+are logged and recorded in the state's `cache_hits` list, which the run
+trace prints.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence
+
+from tools.disk_lru import DiskLRU
+from tools.hot_reload import get_data_versions
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent.parent / "data" / "node_cache"
+MODE = os.getenv("NODE_CACHE", "off").lower()
+MAX_DISK_BYTES = int(float(os.getenv("NODE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+MAX_AGE_SECONDS = float(os.getenv("NODE_CACHE_MAX_AGE_DAYS", "7")) * 86400
+
+# Bump when node outputs change shape, so old entries are not reused
+CACHE_VERSION = 1
+
+NodeFunction = Callable[[Dict], Dict]
+
+
+class NodeCache(DiskLRU):
+    """
+    LRU of pickled node outputs, optionally backed by a directory.
+    
+    Args:
+        directory: Disk tier directory (None for memory only)
+        max_entries: Outputs kept in memory
+        max_disk_bytes: Size the disk tier is pruned down to
+        max_age: Seconds an unused disk entry is kept
+    """
+    
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_entries: int = 128,
+        max_disk_bytes: int = MAX_DISK_BYTES,
+        max_age: float = MAX_AGE_SECONDS
+    ):
+        super().__init__(
+            directory, ".pickle", functools.partial(pickle.dumps, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads,
+            max_entries, max_disk_bytes, max_age, label="node cache"
+        )
+
+
+_cache: Optional[NodeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_node_cache() -> Optional[NodeCache]:
+    """The process-wide node cache for the configured mode (None if off)."""
+    global _cache
+    if MODE not in ("memory", "disk"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = NodeCache(CACHE_DIR if MODE == "disk" else None)
+        return _cache
+
+
+def memoize_node(
+    name: str,
+    node: NodeFunction,
+    fields: Sequence[str],
+    datasets: Sequence[str],
+    cacheable: Optional[Callable[[Dict], bool]] = None
+) -> NodeFunction:
+    """
+    Wrap a graph node so its output is reused for the same inputs.
+    
+    Args:
+        name: Node name (part of the key and shown in the trace)
+        node: The node function
+        fields: State fields the node reads
+        datasets: Datasets (tools.hot_reload) the node reads
+        cacheable: Predicate on the output; outputs it rejects (e.g. a
+            rule-based fallback after an LLM error) are not stored
+    
+    Returns:
+        The wrapped node (the node itself when caching is off).
+    """
+    if get_node_cache() is None:
+        return node
+    
+    @functools.wraps(node)
+    def cached_node(state: Dict) -> Dict:
+        cache = get_node_cache()
+        key_source = {
+            "node": name,
+            "version": CACHE_VERSION,
+            "state": {field: state.get(field) for field in fields},
+            "data": get_data_versions(datasets),
+        }
+        key = hashlib.sha256(
+            json.dumps(key_source, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+        
+        output = cache.get(key)
+        if output is not None:
+            logger.info(f"Node cache hit: {name}")
+            return {**output, "cache_hits": [name]}
+        
+        output = node(state)
+        if cacheable is None or cacheable(output):
+            cache.put(key, output)
+        return output
+    
+    return cached_node
@@ -0,0 +1,347 @@
+"""
+PDF Extraction Pipeline
+
+This module extracts text from directories of earnings call transcripts
+and report PDFs and streams it into the RAG document store:
+
+- Pages are extracted in a process pool, in page ranges, so large
+  transcripts are split across workers.
+- Extracted text is cached per page under data/pdf_cache/, keyed by the
+  file's SHA-256 and the page number. Unchanged files are served from the
+  cache without opening the PDF; a partially extracted file only
+  re-extracts its missing pages.
+- Finished files are ingested (tools.ingest) as one record per page with
+  its source file, page number and file hash, in batches of
+  INGEST_BATCH_FILES files, so results become searchable while the run
+  continues without opening and extending the vector index once per file.
+
+Usage:
+    python -m tools.pdf_extractor transcripts/ --company 2330
+    python -m tools.pdf_extractor report.pdf --workers 4 --no-ingest
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent.parent / "data" / "pdf_cache"
+
+# Pages handed to a worker per task (each task opens the PDF once)
+PAGES_PER_TASK = 8
+
+# Finished files ingested together (one vector index update per batch)
+INGEST_BATCH_FILES = 16
+
+
+def file_sha256(path: Path) -> str:
+    """Hex SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _open_reader(path: str):
+    """Open a PDF with pypdf, or PyPDF2 if only the older package is installed."""
+    if importlib.util.find_spec("pypdf"):
+        from pypdf import PdfReader
+    elif importlib.util.find_spec("PyPDF2"):
+        from PyPDF2 import PdfReader
+    else:
+        raise ImportError("No suitable PDF library found (pypdf, PyPDF2)")
+    return PdfReader(path)
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Worker: extract pages [start, end) of a PDF.
+    
+    Returns:
+        List of (page number starting at 1, text). Pages that fail to
+        extract are returned as empty text.
+    """
+    reader = _open_reader(path)
+    pages = []
+    for number in range(start, end):
+        try:
+            text = reader.pages[number].extract_text() or ""
+        except Exception as e:
+            logger.warning(f"{path}: page {number + 1} failed to extract: {e}")
+            text = ""
+        pages.append((number + 1, text))
+    return pages
+
+
+def _page_ranges(pages: List[int], max_pages: int) -> List[Tuple[int, int]]:
+    """Group sorted 0-based page numbers into [start, end) runs of at most max_pages."""
+    ranges: List[Tuple[int, int]] = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page and page - ranges[-1][0] < max_pages:
+            ranges[-1] = (ranges[-1][0], page + 1)
+        else:
+            ranges.append((page, page + 1))
+    return ranges
+
+
+class PageCache:
+    """
+    Per-page text cache keyed by file hash and page number.
+    
+    Layout: <cache_dir>/<hash[:2]>/<hash>/page_NNNN.txt, plus meta.json
+    once every page of the file has been stored.
+    
+    Args:
+        cache_dir: Cache root directory
+    """
+    
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+    
+    def _file_dir(self, file_hash: str) -> Path:
+        return self.cache_dir / file_hash[:2] / file_hash
+    
+    def get(self, file_hash: str, page: int) -> Optional[str]:
+        """Cached text of a page, or None."""
+        try:
+            return (self._file_dir(file_hash) / f"page_{page:04d}.txt").read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+    
+    def put(self, file_hash: str, page: int, text: str) -> None:
+        """Store the text of a page."""
+        file_dir = self._file_dir(file_hash)
+        file_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_dir / f"page_{page:04d}.txt.tmp"
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, file_dir / f"page_{page:04d}.txt")
+    
+    def num_pages(self, file_hash: str) -> Optional[int]:
+        """Page count of a fully cached file, or None if incomplete."""
+        try:
+            with open(self._file_dir(file_hash) / "meta.json", "r", encoding="utf-8") as f:
+                return json.load(f)["num_pages"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+    
+    def mark_complete(self, file_hash: str, num_pages: int) -> None:
+        """Record that every page of a file is cached."""
+        file_dir = self._file_dir(file_hash)
+        file_dir.mkdir(parents=True, exist_ok=True)
+        with open(file_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"num_pages": num_pages}, f)
+
+
+def find_pdfs(paths: Iterable[Path]) -> List[Path]:
+    """Expand files and folders (recursively) into a sorted list of PDFs."""
+    pdfs: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            pdfs.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() == ".pdf"))
+        elif path.suffix.lower() == ".pdf":
+            pdfs.append(path)
+    return pdfs
+
+
+def extract_pdfs(
+    paths: Iterable[Path],
+    workers: Optional[int] = None,
+    cache_dir: Path = CACHE_DIR,
+    pages_per_task: int = PAGES_PER_TASK
+) -> Iterator[Dict]:
+    """
+    Extract page text from PDFs in a process pool, yielding files as they finish.
+    
+    Args:
+        paths: PDF files or folders
+        workers: Worker processes (default: CPU count)
+        cache_dir: Page cache directory
+        pages_per_task: Pages extracted per worker task
+    
+    Yields:
+        Dicts with 'path', 'file_hash', 'pages' (list of text, page 1
+        first), 'cached' (True if served entirely from the cache) and
+        'error' (None on success).
+    """
+    cache = PageCache(cache_dir)
+    pending: Dict[str, Dict] = {}
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        seen = set()
+        for path in find_pdfs(paths):
+            file_hash = file_sha256(path)
+            if file_hash in seen:
+                logger.info(f"{path}: identical to a file already in this batch, skipped")
+                continue
+            seen.add(file_hash)
+            result = {"path": path, "file_hash": file_hash, "pages": [], "cached": False, "error": None}
+            
+            num_pages = cache.num_pages(file_hash)
+            if num_pages is not None:
+                result["pages"] = [cache.get(file_hash, n) or "" for n in range(1, num_pages + 1)]
+                result["cached"] = True
+                yield result
+                continue
+            
+            try:
+                num_pages = len(_open_reader(str(path)).pages)
+            except Exception as e:
+                result["error"] = str(e)
+                yield result
+                continue
+            
+            result["pages"] = [cache.get(file_hash, n) for n in range(1, num_pages + 1)]
+            missing = [n for n, text in enumerate(result["pages"]) if text is None]
+            result["remaining"] = 0
+            for start, end in _page_ranges(missing, pages_per_task):
+                futures[pool.submit(_extract_page_range, str(path), start, end)] = file_hash
+                result["remaining"] += 1
+            if not result["remaining"]:
+                cache.mark_complete(file_hash, num_pages)
+                del result["remaining"]
+                yield result
+                continue
+            pending[file_hash] = result
+        
+        for future in as_completed(futures):
+            result = pending[futures[future]]
+            try:
+                for page, text in future.result():
+                    cache.put(result["file_hash"], page, text)
+                    result["pages"][page - 1] = text
+            except Exception as e:
+                result["error"] = str(e)
+            result["remaining"] -= 1
+            if result["remaining"] == 0:
+                pending.pop(result["file_hash"])
+                del result["remaining"]
+                if result["error"] is None:
+                    cache.mark_complete(result["file_hash"], len(result["pages"]))
+                result["pages"] = [text or "" for text in result["pages"]]
+                yield result
+
+
+def page_records(result: Dict, company_ids: Optional[List[str]] = None) -> List[Tuple[Dict, str]]:
+    """
+    Turn an extract_pdfs() result into page records for tools.ingest.
+    
+    Args:
+        result: One result yielded by extract_pdfs
+        company_ids: Companies the document is about (for filtered search)
+    
+    Returns:
+        List of (record, source file name), skipping empty pages.
+    """
+    path = Path(result["path"])
+    return [
+        (
+            {
+                "id": f"pdf_{result['file_hash'][:16]}_p{page:04d}",
+                "page": page,
+                "num_pages": len(result["pages"]),
+                "text": text,
+                "title": path.stem,
+                "file_hash": result["file_hash"],
+                "company_ids": list(company_ids or []),
+                "source_file": path.name,
+            },
+            path.name,
+        )
+        for page, text in enumerate(result["pages"], start=1)
+        if text.strip()
+    ]
+
+
+def run_pipeline(
+    paths: Iterable[Path],
+    company_ids: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    ingest: bool = True,
+    cache_dir: Path = CACHE_DIR,
+    ingest_every: int = INGEST_BATCH_FILES
+) -> Dict[str, int]:
+    """
+    Extract PDFs and stream the finished files into the RAG document store.
+    
+    Args:
+        paths: PDF files or folders
+        company_ids: Companies the documents are about
+        workers: Worker processes (default: CPU count)
+        ingest: Ingest pages into the store (False: only fill the cache)
+        cache_dir: Page cache directory
+        ingest_every: Finished files ingested per batch
+    
+    Returns:
+        Counts: 'files', 'cached_files', 'failed_files', 'pages', 'pages_added'.
+    """
+    # Imported here so worker processes do not load the retrieval stack
+    from tools.ingest import ingest_records
+    
+    summary = {"files": 0, "cached_files": 0, "failed_files": 0, "pages": 0, "pages_added": 0}
+    pending: List[Tuple[Dict, str]] = []
+    pending_files = 0
+    
+    def _flush() -> None:
+        nonlocal pending, pending_files
+        if pending:
+            stats = ingest_records(pending, kind="pdf_pages")
+            summary["pages_added"] += stats["pdf_pages"]["added"]
+        pending, pending_files = [], 0
+    
+    for result in extract_pdfs(paths, workers=workers, cache_dir=cache_dir):
+        summary["files"] += 1
+        if result["error"] is not None:
+            summary["failed_files"] += 1
+            logger.warning(f"{result['path']}: extraction failed: {result['error']}")
+            continue
+        summary["cached_files"] += result["cached"]
+        summary["pages"] += len(result["pages"])
+        if ingest:
+            pending.extend(page_records(result, company_ids))
+            pending_files += 1
+            if pending_files >= ingest_every:
+                _flush()
+        logger.info(f"{result['path'].name}: {len(result['pages'])} pages{' (cached)' if result['cached'] else ''}")
+    _flush()
+    return summary
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Extract PDF text in parallel and ingest it into the RAG store.")
+    parser.add_argument("paths", nargs="+", type=Path, help="PDF files or folders")
+    parser.add_argument("--company", action="append", default=[], help="Company ID the PDFs are about (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-ingest", action="store_true", help="Only extract into the page cache")
+    parser.add_argument(
+        "--ingest-every", type=int, default=INGEST_BATCH_FILES,
+        help=f"Finished files ingested per batch (default: {INGEST_BATCH_FILES})"
+    )
+    args = parser.parse_args(argv)
+    
+    missing = [str(p) for p in args.paths if not p.exists()]
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        sys.exit(1)
+    
+    summary = run_pipeline(
+        args.paths, company_ids=args.company, workers=args.workers,
+        ingest=not args.no_ingest, ingest_every=args.ingest_every
+    )
+    print(f"📄 {summary['files']} PDFs ({summary['cached_files']} unchanged, {summary['failed_files']} failed), "
+          f"{summary['pages']} pages, {summary['pages_added']} new pages ingested")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Peer Comparison Statistics
+
+This module places every company in the financial store among its peers,
+the companies sharing its `category` in the supply chain graph (Foundry,
+Fabless, ...). For revenue growth (YoY), gross margin and days of
+inventory it precomputes, for all companies at once:
+
+- the company's latest value,
+- its percentile within the category ("better than X% of peers", so a
+  lower DOI ranks higher),
+- the category median and the number of peers with a value.
+
+The table is a hot-reloadable dataset that depends on the financial store
+and graph datasets, so it is rebuilt when either snapshot is replaced.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from tools.financial_store import FinancialStore
+from tools.graph_reader import GRAPH_DATASET, get_graph
+from tools.hot_reload import ReloadableDataset
+from tools.mock_bigquery import FINANCIAL_STORE_DATASET, get_financial_store
+
+
+# (key, store metric, statistic, label, higher is better)
+PEER_METRICS = (
+    ("revenue_growth", "revenue", "yoy", "Revenue Growth (YoY)", True),
+    ("gross_margin", "gross_margin", "value", "Gross Margin", True),
+    ("doi_days", "doi_days", "value", "DOI", False),
+)
+
+
+def _percentiles(values: np.ndarray, higher_is_better: bool) -> np.ndarray:
+    """
+    Share of the other values (in %) that each value beats; ties count half.
+    
+    NaN values get NaN; with a single valid value the result is NaN.
+    """
+    result = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    count = int(valid.sum())
+    if count < 2:
+        return result
+    ordered = np.sort(values[valid])
+    below = np.searchsorted(ordered, values[valid], side="left")
+    ties = np.searchsorted(ordered, values[valid], side="right") - below - 1
+    beaten = below if higher_is_better else count - below - ties - 1
+    result[valid] = (beaten + 0.5 * ties) / (count - 1) * 100.0
+    return result
+
+
+class PeerStats:
+    """
+    Per-category peer statistics for every company in a financial store.
+    
+    Args:
+        store: The columnar financial store
+        categories: Category of each company, aligned with store.companies
+            ("" or None for companies without one)
+    """
+    
+    def __init__(self, store: FinancialStore, categories: Sequence[Optional[str]]):
+        self.companies: List[str] = list(store.companies)
+        self.company_index = dict(store.company_index)
+        self.categories: List[str] = [c or "" for c in categories]
+        self.keys = [key for key, *_ in PEER_METRICS]
+        self.labels = {key: label for key, _, _, label, _ in PEER_METRICS}
+        self.units = {key: ("%" if stat == "yoy" else store.units.get(metric, ""))
+                      for key, metric, stat, _, _ in PEER_METRICS}
+        
+        num_companies, num_metrics = len(self.companies), len(PEER_METRICS)
+        self.values = np.full((num_companies, num_metrics), np.nan)
+        table = store.window_table(1)
+        for k, (_, metric, stat, _, _) in enumerate(PEER_METRICS):
+            m = store.metric_index.get(metric)
+            if m is None:
+                continue
+            # Ratios and levels are currency-free; growth is in local currency
+            self.values[:, k] = table["yoy"][:, m] if stat == "yoy" else table["values"][:, 0, m]
+        
+        self.category_names: List[str] = sorted({c for c in self.categories if c})
+        codes = np.array([self.category_names.index(c) if c else -1 for c in self.categories], dtype=np.int64)
+        self.percentiles = np.full((num_companies, num_metrics), np.nan)
+        self.medians = np.full((len(self.category_names), num_metrics), np.nan)
+        self.counts = np.zeros((len(self.category_names), num_metrics), dtype=np.int64)
+        for g in range(len(self.category_names)):
+            members = np.flatnonzero(codes == g)
+            group = self.values[members]
+            valid = ~np.isnan(group)
+            self.counts[g] = valid.sum(axis=0)
+            for k, (*_, higher_is_better) in enumerate(PEER_METRICS):
+                if self.counts[g, k]:
+                    self.medians[g, k] = np.median(group[valid[:, k], k])
+                self.percentiles[members, k] = _percentiles(group[:, k], higher_is_better)
+    
+    def company(self, company_id: str) -> Optional[Dict]:
+        """
+        Peer statistics of one company.
+        
+        Returns:
+            Dict with 'category', 'peers' (companies in the category) and
+            'metrics' (key -> 'label', 'unit', 'value', 'percentile',
+            'median', 'count'), or None if the company is not in the
+            store or has no category.
+        """
+        c = self.company_index.get(company_id)
+        if c is None or not self.categories[c]:
+            return None
+        g = self.category_names.index(self.categories[c])
+        metrics = {}
+        for k, key in enumerate(self.keys):
+            metrics[key] = {
+                "label": self.labels[key],
+                "unit": self.units[key],
+                "value": float(self.values[c, k]),
+                "percentile": float(self.percentiles[c, k]),
+                "median": float(self.medians[g, k]),
+                "count": int(self.counts[g, k]),
+            }
+        return {
+            "category": self.categories[c],
+            "peers": [cid for cid, cat in zip(self.companies, self.categories) if cat == self.categories[c]],
+            "metrics": metrics,
+        }
+
+
+def _build_peer_stats() -> PeerStats:
+    """Build the peer table from the current financial store and graph."""
+    store = get_financial_store()
+    graph = get_graph()
+    categories = []
+    for company_id in store.companies:
+        index = graph.id_index.get(company_id)
+        categories.append(graph.categories[int(graph.category_codes[index])] if index is not None else None)
+    return PeerStats(store, categories)
+
+
+# Rebuilt whenever the graph or the financial store snapshot is replaced
+_peer_dataset = ReloadableDataset(
+    "peer_stats", [], _build_peer_stats, depends_on=(GRAPH_DATASET, FINANCIAL_STORE_DATASET)
+)
+
+
+def get_peer_stats() -> PeerStats:
+    """Return the current peer statistics table."""
+    return _peer_dataset.get()
@@ -0,0 +1,74 @@
+"""
+Prefetched Query Results
+
+Batch runs fetch the data of every company up front through the bulk
+query APIs (query_financial_data_many, query_news_many, ...) and register
+the per-company results here. The single-company query functions look
+here first, so the agents pick up prefetched data without changes.
+
+Results are only kept inside a `prefetching()` block, and a kind is
+dropped as soon as the dataset it was read from is reloaded.
+"""
+
+import contextlib
+import threading
+from typing import Any, Dict, Hashable, Iterator, Tuple
+
+
+_lock = threading.Lock()
+_results: Dict[str, Dict[Hashable, Any]] = {}
+_depth = 0
+
+# Returned by get() when nothing was prefetched (None is a valid result)
+MISSING = object()
+
+
+def freeze(value: Any) -> Hashable:
+    """Make query arguments usable as part of a cache key."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value) if isinstance(value, (set, frozenset)) else value
+        return tuple(freeze(v) for v in items)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    return value if isinstance(value, Hashable) else str(value)
+
+
+def is_active() -> bool:
+    """Whether a prefetching() block is open."""
+    return _depth > 0
+
+
+def put(kind: str, key: Tuple, value: Any) -> None:
+    """Register a prefetched result (ignored outside a prefetching() block)."""
+    with _lock:
+        if _depth:
+            _results.setdefault(kind, {})[key] = value
+
+
+def get(kind: str, key: Tuple) -> Any:
+    """Return a prefetched result, or MISSING."""
+    if not _depth:
+        return MISSING
+    with _lock:
+        return _results.get(kind, {}).get(key, MISSING)
+
+
+def invalidate(kind: str) -> None:
+    """Drop the prefetched results of one kind (e.g. after a data reload)."""
+    with _lock:
+        _results.pop(kind, None)
+
+
+@contextlib.contextmanager
+def prefetching() -> Iterator[None]:
+    """Keep prefetched results for the duration of the block (blocks may nest)."""
+    global _depth
+    with _lock:
+        _depth += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _depth -= 1
+            if not _depth:
+                _results.clear()
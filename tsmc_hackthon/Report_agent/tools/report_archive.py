@@ -0,0 +1,377 @@
+"""
+Report Archive
+
+Content-addressed history of generated reports in data/report_archive.sqlite.
+
+- A report is split into chunks at its Markdown structure (headings and
+  `---` rules), so every section, news item and table is its own chunk.
+  Chunks are stored once, zlib-compressed, under their hash; a report
+  is the list of its chunk hashes, stored under the hash of its text.
+  Regenerating a report only stores the chunks that changed.
+- Every run is indexed by (company_id, created_at, data_version, query),
+  which makes "latest report for X", a company's history and "diff
+  against previous" single index lookups.
+- `find()` returns a report built from the same data version (and query),
+  so callers can serve it instead of regenerating it.
+
+main.py (and so batch.py) archives every report it generates; set
+REPORT_ARCHIVE=0 to disable that.
+
+Usage:
+    python -m tools.report_archive latest 2330
+    python -m tools.report_archive history 2330
+    python -m tools.report_archive show <run_id>
+    python -m tools.report_archive diff <run_id> [<other_run_id>]
+    python -m tools.report_archive stats
+"""
+
+import contextlib
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from tools.hot_reload import get_data_versions
+
+
+ARCHIVE_PATH = Path(__file__).parent.parent / "data" / "report_archive.sqlite"
+ENABLED = os.getenv("REPORT_ARCHIVE", "1") != "0"
+
+# Datasets a report is built from; their versions form the data version
+REPORT_DATASETS = ("financials", "financials_extended", "earnings_calls", "news", "supply_chain_graph")
+
+# Chunk hashes are truncated SHA-256 digests
+_DIGEST_SIZE = 16
+
+# Chunks start at a heading or a horizontal rule
+_CHUNK_BOUNDARY = re.compile(r"^(?=#{1,6} |---$)", re.MULTILINE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    hash BLOB PRIMARY KEY,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reports (
+    report_id TEXT PRIMARY KEY,
+    chunks BLOB NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    report_id TEXT NOT NULL REFERENCES reports(report_id),
+    company_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data_version TEXT,
+    query TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_company ON runs(company_id, created_at, run_id);
+CREATE INDEX IF NOT EXISTS runs_data_version ON runs(company_id, data_version);
+"""
+
+_RUN_COLUMNS = "run_id, report_id, company_id, created_at, data_version, query"
+
+
+def split_chunks(report: str) -> List[str]:
+    """Split a Markdown report at headings and rules; the chunks concatenate back to it."""
+    bounds = [m.start() for m in _CHUNK_BOUNDARY.finditer(report)]
+    if not bounds or bounds[0] != 0:
+        bounds.insert(0, 0)
+    bounds.append(len(report))
+    return [report[start:end] for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def current_data_version(datasets: Sequence[str] = REPORT_DATASETS) -> str:
+    """
+    Combined version of the datasets reports are built from.
+    
+    Args:
+        datasets: Dataset names (tools.hot_reload); unknown names are skipped
+    
+    Returns:
+        16-hex-digit hash of the dataset versions.
+    """
+    versions = get_data_versions(datasets)
+    return hashlib.sha256(json.dumps(versions, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _run_dict(row: sqlite3.Row) -> Dict:
+    return dict(zip(("run_id", "report_id", "company_id", "created_at", "data_version", "query"), row))
+
+
+class ReportArchive:
+    """
+    Content-addressed report store with an index of runs.
+    
+    Connections are opened per operation, so an archive object can be
+    shared between threads; the database runs in WAL mode so readers do
+    not block the writer.
+    
+    Args:
+        path: SQLite database file
+    """
+    
+    def __init__(self, path: Path = ARCHIVE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+    
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def put(
+        self,
+        report: str,
+        company_id: str,
+        query: str = "",
+        data_version: Optional[str] = None,
+        created_at: Optional[str] = None
+    ) -> Dict:
+        """
+        Archive a report.
+        
+        Args:
+            report: Report text
+            company_id: Company the report is about
+            query: Query that produced it
+            data_version: Version of the data it was built from
+                (default: current_data_version())
+            created_at: ISO timestamp (default: now)
+        
+        Returns:
+            The run entry: 'run_id', 'report_id', 'company_id',
+            'created_at', 'data_version', 'query'.
+        """
+        if data_version is None:
+            data_version = current_data_version()
+        if created_at is None:
+            created_at = datetime.now().isoformat(timespec="seconds")
+        encoded = report.encode("utf-8")
+        report_id = hashlib.sha256(encoded).hexdigest()
+        
+        with self._connect() as conn:
+            known = conn.execute("SELECT 1 FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+            if known is None:
+                digests = []
+                new_chunks = {}
+                for chunk in split_chunks(report):
+                    data = chunk.encode("utf-8")
+                    digest = hashlib.sha256(data).digest()[:_DIGEST_SIZE]
+                    digests.append(digest)
+                    new_chunks[digest] = data
+                unique = list(new_chunks)
+                existing = set()
+                for start in range(0, len(unique), 500):
+                    batch = unique[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    existing.update(row[0] for row in conn.execute(
+                        f"SELECT hash FROM chunks WHERE hash IN ({placeholders})", batch
+                    ))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO chunks (hash, data) VALUES (?, ?)",
+                    [(digest, zlib.compress(data)) for digest, data in new_chunks.items() if digest not in existing]
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO reports (report_id, chunks, size) VALUES (?, ?, ?)",
+                    (report_id, b"".join(digests), len(encoded))
+                )
+            cursor = conn.execute(
+                "INSERT INTO runs (report_id, company_id, created_at, data_version, query) VALUES (?, ?, ?, ?, ?)",
+                (report_id, company_id, created_at, data_version, query)
+            )
+            run_id = cursor.lastrowid
+        return {
+            "run_id": run_id,
+            "report_id": report_id,
+            "company_id": company_id,
+            "created_at": created_at,
+            "data_version": data_version,
+            "query": query,
+        }
+    
+    def get(self, report_id: str) -> Optional[str]:
+        """Report text by report ID, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT chunks FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+            if row is None:
+                return None
+            digests = [row[0][i:i + _DIGEST_SIZE] for i in range(0, len(row[0]), _DIGEST_SIZE)]
+            unique = list(dict.fromkeys(digests))
+            data = {}
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                data.update(conn.execute(f"SELECT hash, data FROM chunks WHERE hash IN ({placeholders})", batch))
+        return "".join(zlib.decompress(data[digest]).decode("utf-8") for digest in digests)
+    
+    def run(self, run_id: int) -> Optional[Dict]:
+        """Run entry by ID, or None."""
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {_RUN_COLUMNS} FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return _run_dict(row) if row else None
+    
+    def history(self, company_id: str, limit: int = 20) -> List[Dict]:
+        """Run entries of a company, newest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_RUN_COLUMNS} FROM runs WHERE company_id = ? "
+                "ORDER BY created_at DESC, run_id DESC LIMIT ?",
+                (company_id, limit)
+            ).fetchall()
+        return [_run_dict(row) for row in rows]
+    
+    def latest(self, company_id: str) -> Optional[Dict]:
+        """Latest run entry of a company, with its text under 'report', or None."""
+        entries = self.history(company_id, limit=1)
+        if not entries:
+            return None
+        return {**entries[0], "report": self.get(entries[0]["report_id"])}
+    
+    def previous(self, entry: Dict) -> Optional[Dict]:
+        """The run before `entry` for the same company, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_RUN_COLUMNS} FROM runs WHERE company_id = ? "
+                "AND (created_at < ? OR (created_at = ? AND run_id < ?)) "
+                "ORDER BY created_at DESC, run_id DESC LIMIT 1",
+                (entry["company_id"], entry["created_at"], entry["created_at"], entry["run_id"])
+            ).fetchone()
+        return _run_dict(row) if row else None
+    
+    def find(self, company_id: str, data_version: str, query: Optional[str] = None) -> Optional[Dict]:
+        """
+        Latest run of a company built from the given data version.
+        
+        Args:
+            company_id: Company ID
+            data_version: Data version (see current_data_version())
+            query: Also require this query (None: any query)
+        
+        Returns:
+            The run entry with its text under 'report', or None.
+        """
+        sql = f"SELECT {_RUN_COLUMNS} FROM runs WHERE company_id = ? AND data_version = ?"
+        params = [company_id, data_version]
+        if query is not None:
+            sql += " AND query = ?"
+            params.append(query)
+        with self._connect() as conn:
+            row = conn.execute(sql + " ORDER BY created_at DESC, run_id DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        entry = _run_dict(row)
+        return {**entry, "report": self.get(entry["report_id"])}
+    
+    def diff(self, run_id: int, against: Optional[int] = None, context: int = 3) -> Optional[str]:
+        """
+        Unified diff of a run's report against another run.
+        
+        Args:
+            run_id: Run to compare
+            against: Run to compare with (default: the company's previous run)
+            context: Lines of context
+        
+        Returns:
+            The diff ("" when the reports are identical), or None if a
+            run does not exist or there is no previous run.
+        """
+        entry = self.run(run_id)
+        other = self.run(against) if against is not None else (entry and self.previous(entry))
+        if entry is None or other is None:
+            return None
+        if entry["report_id"] == other["report_id"]:
+            return ""
+        return "".join(difflib.unified_diff(
+            self.get(other["report_id"]).splitlines(keepends=True),
+            self.get(entry["report_id"]).splitlines(keepends=True),
+            fromfile=f"run {other['run_id']} ({other['created_at']})",
+            tofile=f"run {entry['run_id']} ({entry['created_at']})",
+            n=context
+        ))
+    
+    def stats(self) -> Dict:
+        """Run, report and chunk counts, and report bytes vs stored bytes."""
+        with self._connect() as conn:
+            runs = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            reports, report_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+            run_bytes = conn.execute(
+                "SELECT COALESCE(SUM(r.size), 0) FROM runs JOIN reports r USING (report_id)"
+            ).fetchone()[0]
+            chunks, chunk_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM chunks").fetchone()
+        return {
+            "runs": runs,
+            "reports": reports,
+            "chunks": chunks,
+            "report_bytes": run_bytes,
+            "unique_report_bytes": report_bytes,
+            "stored_chunk_bytes": chunk_bytes,
+            "file_bytes": self.path.stat().st_size,
+        }
+
+
+_archive: Optional[ReportArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> ReportArchive:
+    """The process-wide archive at ARCHIVE_PATH."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = ReportArchive()
+        return _archive
+
+
+def _format_entry(entry: Dict) -> str:
+    return (f"#{entry['run_id']:<6} {entry['created_at']}  {entry['company_id']:<8} "
+            f"data {entry['data_version']}  report {entry['report_id'][:12]}  {entry['query']}")
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("latest", "history", "show", "diff", "stats"):
+        print(__doc__)
+        sys.exit(1)
+    command, args = argv[0], argv[1:]
+    archive = get_archive()
+    
+    if command == "stats":
+        for key, value in archive.stats().items():
+            print(f"{key:<20} {value:,}")
+    elif command == "history":
+        for entry in archive.history(args[0], limit=int(args[1]) if len(args) > 1 else 20):
+            print(_format_entry(entry))
+    elif command in ("latest", "show"):
+        entry = archive.latest(args[0]) if command == "latest" else archive.run(int(args[0]))
+        if entry is None:
+            print("❌ No such report")
+            sys.exit(1)
+        print(_format_entry(entry))
+        print()
+        print(entry.get("report") or archive.get(entry["report_id"]))
+    else:
+        diff = archive.diff(int(args[0]), int(args[1]) if len(args) > 1 else None)
+        if diff is None:
+            print("❌ Nothing to compare")
+            sys.exit(1)
+        print(diff or "(identical)")
+
+
+if __name__ == "__main__":
+    main()
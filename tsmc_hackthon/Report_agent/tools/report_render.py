@@ -0,0 +1,304 @@
+"""
+Report Rendering
+
+Shared rendering layer for the report agents and the summary formatters:
+
+- A report is a plain section model (a dict) built once by
+  `report_model()`: header fields plus an ordered list of sections with
+  their headings, placeholders and bodies. `render_markdown()` and
+  `render_json()` turn the same model into either output.
+- Section headings and the fixed report layout live here, so every
+  reporter renders the same template. Per-item templates are f-strings,
+  which are compiled once with the module rather than parsed per call.
+- Bodies are built by appending to lists and joining once (`table`,
+  `company_entries`, ...), instead of repeated string concatenation.
+  Graph node fields are read once per entry (`pick`).
+"""
+
+import functools
+import json
+import unicodedata
+from collections import abc
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+
+REPORT_TITLE = "AI Supply Chain Analysis Report"
+DISCLAIMER = "*此報告由 Multi-Agent System 自動生成，結合結構化數據與 AI 分析，僅供參考。*"
+
+# Standard sections: (key, heading, heading level, placeholder, rule before)
+SECTIONS = (
+    ("financial_status", "Financial Status:", 2, None, True),
+    ("peer_comparison", "Peer Comparison:", 3, None, False),
+    ("ai_analysis", "AI Analysis:", 2, None, True),
+    ("earnings_call", "● Latest Earnings Call Transcript - QA Session Summary:", 3, "<5 key points>", False),
+    ("news", "● News Summary:", 3, "<Latest key news within 30 days, around 20 news>", True),
+    ("supply_chain", "● Supply Chain Analysis:", 3, None, True),
+)
+
+# Part headings of the supply chain section
+SUPPLY_CHAIN_PARTS = (
+    "**<1. Summary target company status>**",
+    "**<2. Supply chain analysis - vertical>**",
+    "**<3. Supply chain analysis - horizontal>**",
+)
+
+# Fixed template lines, which state nothing about the company
+TEMPLATE_LINES = frozenset(
+    [placeholder for _, _, _, placeholder, _ in SECTIONS if placeholder] + list(SUPPLY_CHAIN_PARTS)
+)
+
+SENTIMENT_EMOJI = {"positive": "🟢", "neutral": "🟡", "negative": "🔴"}
+
+
+def report_model(
+    company_name: str,
+    latest_earnings_call: str,
+    created: str,
+    bodies: Mapping[str, Optional[str]],
+    reused_sections: Sequence[str] = ()
+) -> Dict:
+    """
+    Build the section model of a report.
+    
+    Args:
+        company_name: Company display name
+        latest_earnings_call: e.g. "2025 Q3"
+        created: Creation date, e.g. "2026/01/20"
+        bodies: Section key (see SECTIONS) -> rendered body; sections
+            missing from it (or None) are left out, except "ai_analysis",
+            which is a heading only
+        reused_sections: Names of sections reused from a cache
+    
+    Returns:
+        Dict with 'title', 'created', 'company', 'latest_earnings_call',
+        'sections' (list of 'key', 'heading', 'level', 'placeholder',
+        'rule_before', 'body'), 'reused_sections' and 'disclaimer'.
+    """
+    sections = []
+    for key, heading, level, placeholder, rule_before in SECTIONS:
+        body = bodies.get(key)
+        if body is None and key != "ai_analysis":
+            continue
+        sections.append({
+            "key": key,
+            "heading": heading,
+            "level": level,
+            "placeholder": placeholder,
+            "rule_before": rule_before,
+            "body": body,
+        })
+    return {
+        "title": REPORT_TITLE,
+        "created": created,
+        "company": company_name,
+        "latest_earnings_call": latest_earnings_call,
+        "sections": sections,
+        "reused_sections": list(reused_sections),
+        "disclaimer": DISCLAIMER,
+    }
+
+
+def render_markdown(model: Dict) -> str:
+    """Render a report model as Markdown."""
+    parts = [
+        f"# {model['title']}",
+        f"**Create date:** {model['created']}",
+        "---",
+        f"**Company:** {model['company']}",
+        f"**Latest Earnings Call (Calendar Year):** {model['latest_earnings_call']}",
+    ]
+    for section in model["sections"]:
+        if section["rule_before"]:
+            parts.append("---")
+        parts.append(f"{'#' * section['level']} {section['heading']}")
+        if section["placeholder"]:
+            parts.append(section["placeholder"])
+        if section["body"] is not None:
+            parts.append(section["body"])
+    parts.append("---")
+    if model["reused_sections"]:
+        parts.append(f"*Sections reused from cache: {', '.join(model['reused_sections'])}*")
+    parts.append(model["disclaimer"])
+    return "\n\n".join(parts) + "\n"
+
+
+def render_json(model: Dict, indent: Optional[int] = None) -> str:
+    """
+    Render a report model as JSON (section bodies stay Markdown).
+
+    Compact by default: with an indent, json falls back from its C
+    encoder to the pure-Python one, which is several times slower.
+    """
+    return json.dumps(model, ensure_ascii=False, indent=indent)
+
+
+def display_width(text: str) -> int:
+    """Terminal width of a string (wide CJK characters count as two)."""
+    return sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+@functools.lru_cache(maxsize=256)
+def _table_rule(headers: tuple) -> str:
+    return f"|{'|'.join('-' * (display_width(h) + 2) for h in headers)}|"
+
+
+def table(headers: Sequence[str], rows: Iterable[Sequence]) -> str:
+    """
+    Markdown table; the rule under each header is as wide as the header
+    cell, padding included.
+    
+    Args:
+        headers: Column headers
+        rows: Row cells (converted with str)
+    
+    Returns:
+        Table lines joined by newlines, with a trailing newline.
+    """
+    lines = [f"| {' | '.join(headers)} |", _table_rule(tuple(headers))]
+    lines.extend(f"| {' | '.join(map(str, row))} |" for row in rows)
+    return "\n".join(lines) + "\n"
+
+
+def pick(node: Mapping, keys: Sequence[str]) -> Dict:
+    """
+    Copy some fields of a node into a dict, skipping missing ones.
+    
+    Graph node views compute each field on access, so sections read the
+    fields they need once instead of materializing whole nodes.
+    """
+    fields = {}
+    for key in keys:
+        try:
+            fields[key] = node[key]
+        except KeyError:
+            pass
+    return fields
+
+
+_ENTRY_FIELDS = ("name", "country", "category", "tags")
+_ENTRY_FIELDS_WITH_DESCRIPTION = _ENTRY_FIELDS + ("relationship_description",)
+
+
+def company_entries(companies: Sequence, limit: int, with_description: bool = True) -> List[str]:
+    """
+    Bullet lines for related companies: name, country and category, then
+    tags and (optionally) the relationship description as sub-bullets.
+    
+    Args:
+        companies: Node dicts / views (anything else is printed as is)
+        limit: Maximum number of companies
+        with_description: Include 'relationship_description'
+    
+    Returns:
+        List of lines.
+    """
+    keys = _ENTRY_FIELDS_WITH_DESCRIPTION if with_description else _ENTRY_FIELDS
+    lines = []
+    for company in companies[:limit]:
+        if not isinstance(company, abc.Mapping):
+            lines.append(f"- {company}")
+            continue
+        company = pick(company, keys)
+        lines.append(f"- **{company.get('name', 'Unknown')}** ({company.get('country', '')}, {company.get('category', '')})")
+        tags = ", ".join(company.get("tags", []))
+        if tags:
+            lines.append(f"  - *Tags:* {tags}")
+        description = company.get("relationship_description", "")
+        if description:
+            lines.append(f"  - {description}")
+    return lines
+
+
+# Supply chain groups: (analysis key, heading, limit, include description)
+_VERTICAL_GROUPS = (
+    ("customers", "**Key Customers (Downstream):**", 8, True),
+    ("suppliers", "**Key Suppliers (Upstream):**", 8, True),
+)
+_HORIZONTAL_GROUPS = (
+    ("competitors", "**Main Competitors:**", 6, False),
+    ("partners", "**Strategic Partners:**", 6, True),
+)
+
+
+def _company_groups(sc_analysis: Dict, groups: Sequence, empty_note: str) -> List[str]:
+    lines = []
+    for key, heading, limit, with_description in groups:
+        companies = sc_analysis.get(key, [])
+        if companies:
+            lines.append(f"{heading}\n")
+            lines.extend(company_entries(companies, limit, with_description))
+            lines.append("")
+    if not lines:
+        lines.append(f"{empty_note}\n")
+    return lines
+
+
+def format_supply_chain_analysis(sc_analysis: Dict) -> str:
+    """
+    Format supply chain analysis into three sections:
+    1. Summary of target company status
+    2. Vertical analysis (upstream suppliers, downstream customers)
+    3. Horizontal analysis (competitors, partners)
+    """
+    summary = sc_analysis.get("summary", "")
+    lines = [
+        f"{SUPPLY_CHAIN_PARTS[0]}\n",
+        summary if summary else "*No summary available.*",
+        "",
+        f"{SUPPLY_CHAIN_PARTS[1]}\n",
+        "*Analysis of upstream suppliers and downstream customers in the value chain.*\n",
+    ]
+    lines.extend(_company_groups(sc_analysis, _VERTICAL_GROUPS, "*No vertical supply chain data available.*"))
+    lines.append(f"{SUPPLY_CHAIN_PARTS[2]}\n")
+    lines.append("*Analysis of competitors and partners in the same industry segment.*\n")
+    lines.extend(_company_groups(sc_analysis, _HORIZONTAL_GROUPS, "*No horizontal supply chain data available.*"))
+    return "\n".join(lines) + "\n"
+
+
+def format_news_summary(articles: List[Dict]) -> str:
+    """
+    Format news data into a readable summary.
+    
+    Args:
+        articles: List of news article dicts
+    
+    Returns:
+        Formatted string summary.
+    """
+    if not articles:
+        return "No recent news available."
+    items = []
+    for article in articles:
+        emoji = SENTIMENT_EMOJI.get(article.get("sentiment", "neutral"), "🟡")
+        items.append(
+            f"### {emoji} {article.get('title', 'N/A')}\n"
+            f"*{article.get('source', 'N/A')} | {article.get('date', 'N/A')}*\n\n"
+            f"{article.get('summary', 'N/A')}\n\n---"
+        )
+    return "## 近期新聞摘要\n\n" + "\n\n".join(items)
+
+
+def format_earnings_call_summary(calls: List[Dict]) -> str:
+    """
+    Format earnings call data into a readable summary.
+    
+    Args:
+        calls: List of earnings call dicts
+    
+    Returns:
+        Formatted string summary.
+    """
+    if not calls:
+        return "No earnings call data available."
+    lines = ["## 法說會重點摘要\n"]
+    for call in calls:
+        lines.append(f"### {call.get('title', 'N/A')} ({call.get('date', 'N/A')})\n")
+        lines.append("**Key Points:**")
+        lines.extend(f"- {point}" for point in call.get("key_points", []))
+        lines.append(f"\n**Outlook:** {call.get('outlook', 'N/A')}\n")
+        quotes = call.get("management_quotes", [])
+        if quotes:
+            lines.append("**Management Quotes:**")
+            lines.extend(f"> {quote}\n" for quote in quotes)
+        lines.append("---\n")
+    return "\n".join(lines).strip()
@@ -0,0 +1,77 @@
+"""
+Report Section Cache
+
+Rendered report sections keyed by a hash of everything they are built
+from. The reporter looks each section up before rendering it, so a
+regeneration after, say, a news update only re-renders (and re-runs the
+LLM for) the sections whose inputs changed.
+
+Entries are kept in a small in-memory LRU and on disk under
+data/section_cache/<key[:2]>/<key>.md, so they survive restarts.
+Set REPORT_SECTION_CACHE=0 to disable the cache.
+
+The disk tier is an LRU too (tools.disk_lru): entries unused for
+REPORT_SECTION_CACHE_MAX_AGE_DAYS (default 30) are dropped, and the
+least recently used entries are removed once the directory exceeds
+REPORT_SECTION_CACHE_MAX_MB (default 256).
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Optional
+
+from tools.disk_lru import DiskLRU
+
+
+CACHE_DIR = Path(__file__).parent.parent / "data" / "section_cache"
+ENABLED = os.getenv("REPORT_SECTION_CACHE", "1") != "0"
+MAX_DISK_BYTES = int(float(os.getenv("REPORT_SECTION_CACHE_MAX_MB", "256")) * 1024 * 1024)
+MAX_AGE_SECONDS = float(os.getenv("REPORT_SECTION_CACHE_MAX_AGE_DAYS", "30")) * 86400
+
+
+def _json_default(value: Any) -> Any:
+    # Graph node views hash by their fields; anything else by its str()
+    return dict(value) if isinstance(value, Mapping) else str(value)
+
+
+def section_key(name: str, inputs: Any) -> str:
+    """
+    Hash a section name and its inputs into a cache key.
+    
+    Args:
+        name: Section name
+        inputs: JSON-serializable inputs (mappings such as graph node
+            views are hashed by their items, other values are stringified)
+    
+    Returns:
+        Hex SHA-256 digest.
+    """
+    payload = json.dumps([name, inputs], sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SectionCache(DiskLRU):
+    """
+    Two-tier (memory LRU + disk) store of rendered sections.
+    
+    Args:
+        directory: Cache directory (None for memory only)
+        max_entries: Sections kept in memory
+        max_disk_bytes: Size the disk tier is pruned down to
+        max_age: Seconds an unused disk entry is kept
+    """
+    
+    def __init__(
+        self,
+        directory: Optional[Path] = CACHE_DIR,
+        max_entries: int = 256,
+        max_disk_bytes: int = MAX_DISK_BYTES,
+        max_age: float = MAX_AGE_SECONDS
+    ):
+        super().__init__(
+            directory, ".md", lambda text: text.encode("utf-8"), lambda blob: blob.decode("utf-8"),
+            max_entries, max_disk_bytes, max_age, label="section cache"
+        )
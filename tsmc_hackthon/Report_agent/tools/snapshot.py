@@ -0,0 +1,281 @@
+"""
+Binary Data Snapshot
+
+This module compiles the JSON data files into a versioned binary snapshot
+so that cold starts do not have to re-parse large JSON documents:
+
+- supply_chain_graph.json is stored as CompactGraph .npy arrays, which are
+  memory-mapped on load (the CSR indexes are prebuilt).
+- data/*.json are stored as pickles (protocol 5), which load several
+  times faster than json.load. Datasets with a prebuilt index (news,
+  extended financials) are pickled in indexed form.
+
+A manifest records the snapshot format version and the size, mtime and
+content hash of every source file. The loaders in tools/ open the snapshot
+lazily and fall back to JSON whenever the entry is missing or stale.
+
+Usage:
+    python -m tools.snapshot build
+    python -m tools.snapshot status
+"""
+
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from tools.compact_graph import CompactGraph
+from tools.financial_store import FinancialStore
+from tools.hot_reload import fingerprint_files
+from tools.news_index import NewsIndex
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk layout or any stored structure changes
+FORMAT_VERSION = 4
+
+_ROOT = Path(__file__).parent.parent
+SNAPSHOT_DIR = _ROOT / "data" / "snapshot"
+
+# Dataset name -> source JSON file
+SOURCES: Dict[str, Path] = {
+    "supply_chain_graph": _ROOT / "supply_chain_graph.json",
+    "financials": _ROOT / "data" / "financials.json",
+    "financials_extended": _ROOT / "data" / "financials_extended.json",
+    "earnings_calls": _ROOT / "data" / "earnings_calls.json",
+    "news": _ROOT / "data" / "news.json",
+}
+
+# Datasets stored in compact graph form instead of a pickle
+_GRAPH_DATASETS = {"supply_chain_graph"}
+
+# Datasets whose index is built at compile time and pickled with the data
+_INDEX_BUILDERS: Dict[str, Callable[[Any], Any]] = {
+    "news": NewsIndex,
+    "financials_extended": FinancialStore,
+}
+
+# Set to "0" to ignore snapshots entirely (always parse JSON)
+_ENV_SWITCH = "REPORT_AGENT_SNAPSHOT"
+
+
+def _read_json(path: Path) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _source_stat(path: Path) -> Dict[str, int]:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_manifest(snapshot_dir: Path) -> Optional[Dict]:
+    try:
+        with open(snapshot_dir / "manifest.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def build_snapshot(
+    names: Optional[Iterable[str]] = None,
+    sources: Optional[Dict[str, Path]] = None,
+    snapshot_dir: Path = SNAPSHOT_DIR
+) -> Dict:
+    """
+    Compile JSON data files into a binary snapshot.
+    
+    The snapshot is written to a temporary directory and moved into place,
+    so readers never see a half-written snapshot. When only some datasets
+    are compiled, the fresh entries of the others are carried over from
+    the current snapshot; stale ones are dropped.
+    
+    Args:
+        names: Datasets to compile (default: all sources)
+        sources: Dataset name -> JSON path (default: SOURCES)
+        snapshot_dir: Output directory
+    
+    Returns:
+        The written manifest.
+    """
+    sources = sources or SOURCES
+    names = list(names or sources.keys())
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".snapshot-", dir=snapshot_dir.parent))
+    
+    manifest = {"format_version": FORMAT_VERSION, "datasets": {}}
+    try:
+        for name in names:
+            path = Path(sources[name])
+            stat = _source_stat(path)
+            data = _read_json(path)
+            if name in _GRAPH_DATASETS:
+                CompactGraph(data).save(tmp_dir / name)
+                kind = "compact_graph"
+            else:
+                if name in _INDEX_BUILDERS:
+                    data = _INDEX_BUILDERS[name](data)
+                with open(tmp_dir / f"{name}.pickle", "wb") as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                kind = "pickle"
+            manifest["datasets"][name] = {
+                "kind": kind,
+                "source": str(path),
+                "sha256": fingerprint_files([path]),
+                **stat
+            }
+        
+        # Keep the other datasets' entries that still match their sources
+        current = _read_manifest(snapshot_dir)
+        for name, path in sources.items():
+            if name in manifest["datasets"] or not is_fresh(name, path, snapshot_dir, current):
+                continue
+            entry = current["datasets"][name]
+            if entry["kind"] == "compact_graph":
+                shutil.copytree(snapshot_dir / name, tmp_dir / name)
+            else:
+                shutil.copy2(snapshot_dir / f"{name}.pickle", tmp_dir / f"{name}.pickle")
+            manifest["datasets"][name] = entry
+        
+        with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        
+        # Swap directories; readers with open mmaps keep their old files
+        if snapshot_dir.exists():
+            old_dir = snapshot_dir.with_name(snapshot_dir.name + ".old")
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(snapshot_dir, old_dir)
+            os.replace(tmp_dir, snapshot_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, snapshot_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    return manifest
+
+
+def is_fresh(name: str, source: Path, snapshot_dir: Path = SNAPSHOT_DIR, manifest: Optional[Dict] = None) -> bool:
+    """
+    Check whether the snapshot entry for a dataset matches its source file.
+    
+    Size and mtime are compared first; only when they differ is the
+    content hash recomputed (e.g. after a checkout that touched the file).
+    
+    Args:
+        name: Dataset name
+        source: Source JSON path
+        snapshot_dir: Snapshot directory
+        manifest: Already-read manifest (optional)
+    
+    Returns:
+        True if the snapshot can be used instead of the JSON file.
+    """
+    manifest = manifest if manifest is not None else _read_manifest(Path(snapshot_dir))
+    if not manifest or manifest.get("format_version") != FORMAT_VERSION:
+        return False
+    entry = manifest.get("datasets", {}).get(name)
+    if not entry:
+        return False
+    try:
+        stat = _source_stat(Path(source))
+    except FileNotFoundError:
+        return False
+    if stat["size"] == entry.get("size") and stat["mtime_ns"] == entry.get("mtime_ns"):
+        return True
+    return stat["size"] == entry.get("size") and fingerprint_files([Path(source)]) == entry.get("sha256")
+
+
+def load_dataset(
+    name: str,
+    source: Optional[Path] = None,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    mmap: bool = True
+) -> Optional[Any]:
+    """
+    Load a dataset from the snapshot, if a fresh entry exists.
+    
+    Args:
+        name: Dataset name
+        source: Source JSON path (default: SOURCES[name])
+        snapshot_dir: Snapshot directory
+        mmap: Memory-map graph arrays
+    
+    Returns:
+        The dataset (CompactGraph for the graph, NewsIndex for news,
+        FinancialStore for extended financials, parsed JSON otherwise),
+        or None if the snapshot is missing, stale or disabled.
+    """
+    if os.environ.get(_ENV_SWITCH, "1") == "0":
+        return None
+    snapshot_dir = Path(snapshot_dir)
+    source = Path(source or SOURCES[name])
+    manifest = _read_manifest(snapshot_dir)
+    if not is_fresh(name, source, snapshot_dir, manifest):
+        return None
+    try:
+        if manifest["datasets"][name]["kind"] == "compact_graph":
+            return CompactGraph.load(snapshot_dir / name, mmap=mmap)
+        with open(snapshot_dir / f"{name}.pickle", "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Snapshot entry '{name}' unreadable, falling back to JSON: {e}")
+        return None
+
+
+def load_or_parse(name: str, source: Path, parse: Callable[[Path], Any]) -> Any:
+    """
+    Load a dataset from the snapshot, falling back to parsing its JSON source.
+    
+    Args:
+        name: Dataset name
+        source: Source JSON path
+        parse: Fallback function that builds the dataset from the JSON path
+    
+    Returns:
+        The dataset.
+    """
+    data = load_dataset(name, source)
+    if data is None:
+        data = parse(source)
+    return data
+
+
+def snapshot_status(sources: Optional[Dict[str, Path]] = None, snapshot_dir: Path = SNAPSHOT_DIR) -> Dict[str, bool]:
+    """Return dataset name -> whether its snapshot entry is fresh."""
+    sources = sources or SOURCES
+    manifest = _read_manifest(Path(snapshot_dir))
+    return {name: is_fresh(name, path, snapshot_dir, manifest) for name, path in sources.items()}
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point: `build` or `status`."""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "build"
+    if command == "build":
+        names = argv[1:] or None
+        unknown = [name for name in names or () if name not in SOURCES]
+        if unknown:
+            print(f"Unknown dataset(s): {', '.join(unknown)} (available: {', '.join(SOURCES)})")
+            sys.exit(1)
+        manifest = build_snapshot(names)
+        print(f"📦 Snapshot v{FORMAT_VERSION} written to {SNAPSHOT_DIR}")
+        for name in manifest["datasets"]:
+            print(f"   └─ {name}{'' if names is None or name in names else ' (kept)'}")
+    elif command == "status":
+        for name, fresh in snapshot_status().items():
+            print(f"{'✅' if fresh else '⚠️ '} {name}: {'fresh' if fresh else 'stale or missing'}")
+    else:
+        print("Usage: python -m tools.snapshot [build [dataset ...] | status]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
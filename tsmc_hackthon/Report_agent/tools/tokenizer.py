@@ -0,0 +1,53 @@
+"""
+Text Tokenizer
+
+Shared tokenization for the retrieval tools. Handles mixed Chinese and
+English financial text:
+
+- Latin/number runs are lowercased and kept whole, so exact tokens such as
+  "cowos", "n2", "2nm" or "3.5" survive.
+- CJK runs have no word boundaries, so they are split into character
+  unigrams and bigrams ("台積電" -> 台, 積, 電, 台積, 積電).
+"""
+
+import re
+from typing import List
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-_][a-z0-9]+)*|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_CJK_START = "\u3400"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into search tokens.
+    
+    Args:
+        text: Input text (any mix of Chinese and English)
+    
+    Returns:
+        List of tokens, in order of appearance.
+    """
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.findall(text.lower()):
+        if match[0] >= _CJK_START:
+            tokens.extend(match)
+            tokens.extend(match[i:i + 2] for i in range(len(match) - 1))
+        else:
+            tokens.append(match)
+    return tokens
+
+
+def char_ngrams(token: str, n: int = 3) -> List[str]:
+    """
+    Character n-grams of a Latin token, padded with boundary markers.
+    
+    Args:
+        token: A single token
+        n: N-gram size
+    
+    Returns:
+        List of n-grams (empty for tokens shorter than n - 1).
+    """
+    padded = f"<{token}>"
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
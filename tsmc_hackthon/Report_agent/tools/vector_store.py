@@ -0,0 +1,583 @@
+"""
+Local Vector Store
+
+This module provides offline semantic retrieval over earnings call
+transcripts and news articles, without an external vector database:
+
+- Documents are split into overlapping chunks on sentence boundaries.
+- Chunks are embedded with a hashed-feature embedding (word tokens, CJK
+  bigrams and character trigrams hashed into a fixed-size signed vector),
+  so no model download is needed.
+- Chunks are also indexed for BM25 keyword search (tools.bm25), and
+  hybrid search fuses both rankings with reciprocal-rank fusion.
+- Vectors live in a NumPy matrix and are persisted as append-only segments
+  (seg_NNNN.npy + seg_NNNN.jsonl metadata + seg_NNNN.bm25.npz keyword
+  statistics) with a manifest, so the index can be memory-mapped on load
+  without re-tokenizing the corpus, and extended without a rebuild. A
+  rebuilt index is written to a temporary directory and swapped in whole,
+  as one segment; so is an index that has grown past MAX_SEGMENTS.
+
+Every chunk keeps its `source_file`, `doc_id`, `kind`, `company_ids` and
+`date` metadata so results can be cited.
+"""
+
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from tools.bm25 import BM25Index, reciprocal_rank_fusion
+from tools.tokenizer import char_ngrams, tokenize
+
+
+FORMAT_VERSION = 2
+
+# Saving merges the segments into one once there are more than this many
+# (each incremental add writes a segment)
+MAX_SEGMENTS = 16
+
+# Default reciprocal-rank fusion weights for hybrid search; the hashed
+# embedding ranks far below BM25, so it only breaks ties between BM25 hits
+DEFAULT_FUSION_WEIGHTS = {"bm25": 1.0, "vector": 0.1}
+
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;\n])|(?<=\.)(?=\s)")
+
+
+def chunk_text(text: str, max_chars: int = 500, overlap: int = 100) -> List[str]:
+    """
+    Split text into chunks of at most max_chars, on sentence boundaries.
+    
+    Args:
+        text: Input text
+        max_chars: Maximum characters per chunk
+        overlap: Characters of the previous chunk repeated at the start of the next
+    
+    Returns:
+        List of chunk strings (a single chunk for short text).
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+    
+    sentences = [s for s in _SENTENCE_END.split(text) if s and s.strip()]
+    chunks: List[str] = []
+    current = ""
+    for sentence in sentences:
+        # Hard-split sentences that are longer than a chunk on their own
+        while len(sentence) > max_chars:
+            if current:
+                chunks.append(current)
+                current = current[-overlap:] if overlap else ""
+            room = max_chars - len(current)
+            chunks.append(current + sentence[:room])
+            current = (current + sentence[:room])[-overlap:] if overlap else ""
+            sentence = sentence[room:]
+        if len(current) + len(sentence) > max_chars and current:
+            chunks.append(current)
+            current = current[-overlap:] if overlap else ""
+        current += sentence
+    if current.strip():
+        chunks.append(current)
+    return [c.strip() for c in chunks if c.strip()]
+
+
+class HashingEmbedder:
+    """
+    Hashed-feature text embedding.
+    
+    Features are word tokens (weight 1), CJK bigrams (from the tokenizer)
+    and character trigrams of Latin tokens (weight `ngram_weight`). Each
+    feature is hashed (CRC32) into one of `dim` buckets with a hash-derived
+    sign; term frequencies are log-scaled and each vector is L2-normalized,
+    so the dot product is cosine similarity.
+    
+    Args:
+        dim: Embedding dimension
+        ngram_weight: Weight of character trigram features (0 disables them)
+    """
+    
+    def __init__(self, dim: int = 1024, ngram_weight: float = 0.5):
+        self.dim = dim
+        self.ngram_weight = ngram_weight
+    
+    def config(self) -> Dict:
+        return {"type": "hashing", "dim": self.dim, "ngram_weight": self.ngram_weight}
+    
+    def _features(self, text: str) -> Counter:
+        features: Counter = Counter()
+        for token in tokenize(text):
+            features[token] += 1.0
+            if self.ngram_weight and token.isascii() and len(token) > 3:
+                for gram in char_ngrams(token):
+                    features["#" + gram] += self.ngram_weight
+        return features
+    
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Embed texts.
+        
+        Args:
+            texts: Strings to embed
+        
+        Returns:
+            float32 array of shape (len(texts), dim), rows L2-normalized.
+        """
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            buckets = np.empty(len(features), dtype=np.int64)
+            weights = np.empty(len(features), dtype=np.float32)
+            for i, (feature, count) in enumerate(features.items()):
+                h = zlib.crc32(feature.encode("utf-8"))
+                buckets[i] = h % self.dim
+                sign = -1.0 if (h // self.dim) & 1 else 1.0
+                weights[i] = sign * (1.0 + math.log(count)) if count >= 1 else sign * count
+            vectors[row] = np.bincount(buckets, weights=weights, minlength=self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+def earnings_call_documents(earnings_data: Dict[str, List[Dict]], source_file: str = "earnings_calls.json") -> List[Dict]:
+    """
+    Turn earnings_calls.json content into retrievable documents.
+    
+    Args:
+        earnings_data: Dict of company_id -> list of call dicts
+        source_file: Source file name recorded in metadata
+    
+    Returns:
+        List of documents with 'doc_id', 'text' and metadata fields.
+    """
+    documents = []
+    for company_id, calls in earnings_data.items():
+        for position, call in enumerate(calls):
+            parts = [call.get("title", "")]
+            parts.extend(call.get("key_points", []))
+            parts.append(call.get("outlook", ""))
+            parts.extend(call.get("management_quotes", []))
+            parts.append(call.get("transcript", ""))
+            documents.append({
+                "doc_id": call.get("doc_id") or f"earnings:{company_id}:{call.get('date', position)}",
+                "text": "\n".join(p for p in parts if p),
+                "kind": "earnings_call",
+                "company_ids": [company_id],
+                "date": call.get("date"),
+                "title": call.get("title"),
+                "source_file": call.get("source_file", source_file),
+            })
+    return documents
+
+
+def news_documents(articles: List[Dict], source_file: str = "news.json") -> List[Dict]:
+    """
+    Turn news.json articles into retrievable documents.
+    
+    Args:
+        articles: List of article dicts
+        source_file: Source file name recorded in metadata
+    
+    Returns:
+        List of documents with 'doc_id', 'text' and metadata fields.
+    """
+    return [
+        {
+            "doc_id": f"news:{article.get('id', position)}",
+            "text": f"{article.get('title', '')}\n{article.get('summary', '')}",
+            "kind": "news",
+            "company_ids": list(article.get("related_companies", [])),
+            "date": article.get("date"),
+            "title": article.get("title"),
+            "source_file": article.get("source_file", source_file),
+        }
+        for position, article in enumerate(articles)
+    ]
+
+
+def pdf_page_documents(pages: List[Dict]) -> List[Dict]:
+    """
+    Turn extracted PDF pages (tools.pdf_extractor) into retrievable documents.
+    
+    Args:
+        pages: List of page records with 'id', 'text', 'page' and 'source_file'
+    
+    Returns:
+        List of documents with 'doc_id', 'text' and metadata fields.
+    """
+    return [
+        {
+            "doc_id": page["id"],
+            "text": page.get("text", ""),
+            "kind": "report",
+            "company_ids": list(page.get("company_ids", [])),
+            "date": page.get("date"),
+            "title": f"{page.get('title') or page.get('source_file')} (p.{page.get('page')})",
+            "source_file": page.get("source_file"),
+            "page": page.get("page"),
+        }
+        for page in pages
+    ]
+
+
+class VectorIndex:
+    """
+    In-memory vector index with segment-based persistence.
+    
+    Args:
+        embedder: Embedder used for documents and queries
+        max_chars: Chunk size passed to chunk_text
+        overlap: Chunk overlap passed to chunk_text
+    """
+    
+    def __init__(self, embedder: Optional[HashingEmbedder] = None, max_chars: int = 500, overlap: int = 100):
+        self.embedder = embedder or HashingEmbedder()
+        self.max_chars = max_chars
+        self.overlap = overlap
+        self.chunks: List[Dict] = []
+        self.source_fingerprint: Optional[str] = None
+        self._segments: List[np.ndarray] = []
+        self._persisted_segments = 0
+        # Directory the persisted segments live in (set by load() and save())
+        self._directory: Optional[Path] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._by_company: Dict[str, List[int]] = {}
+        self._by_doc: Dict[str, List[int]] = {}
+        self._by_kind: Dict[str, List[int]] = {}
+        self.bm25 = BM25Index()
+        # BM25 statistics per segment, kept until the segment is saved
+        self._bm25_segments: List[Optional[Dict[str, np.ndarray]]] = []
+    
+    def __len__(self) -> int:
+        return len(self.chunks)
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        """All chunk vectors as one (N, dim) matrix."""
+        if self._matrix is None:
+            if not self._segments:
+                self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+            elif len(self._segments) == 1:
+                self._matrix = self._segments[0]
+            else:
+                self._matrix = np.concatenate(self._segments)
+        return self._matrix
+    
+    def _register(self, chunk: Dict) -> None:
+        position = len(self.chunks)
+        self.chunks.append(chunk)
+        for company_id in chunk.get("company_ids", []):
+            self._by_company.setdefault(company_id, []).append(position)
+        self._by_doc.setdefault(chunk["doc_id"], []).append(position)
+        self._by_kind.setdefault(chunk.get("kind", ""), []).append(position)
+    
+    def has_document(self, doc_id: str) -> bool:
+        return doc_id in self._by_doc
+    
+    def add_documents(self, documents: Iterable[Dict]) -> int:
+        """
+        Chunk, embed and append documents as a new segment.
+        
+        Args:
+            documents: Dicts with 'doc_id', 'text' and metadata fields
+        
+        Returns:
+            Number of chunks added.
+        """
+        new_chunks = []
+        for document in documents:
+            metadata = {k: v for k, v in document.items() if k != "text"}
+            for number, text in enumerate(chunk_text(document.get("text", ""), self.max_chars, self.overlap)):
+                new_chunks.append({**metadata, "chunk": number, "text": text})
+        if not new_chunks:
+            return 0
+        self._segments.append(self.embedder.embed(c["text"] for c in new_chunks))
+        self._matrix = None
+        for chunk in new_chunks:
+            self._register(chunk)
+        segment_bm25 = BM25Index(self.bm25.k1, self.bm25.b)
+        segment_bm25.add(c["text"] for c in new_chunks)
+        self._bm25_segments.append(segment_bm25.to_arrays())
+        self.bm25.add_arrays(self._bm25_segments[-1])
+        return len(new_chunks)
+    
+    def _candidates(
+        self,
+        company_id: Optional[str],
+        kind: Optional[str],
+        doc_ids: Optional[Iterable[str]]
+    ) -> Optional[np.ndarray]:
+        """Chunk positions passing the filters (None = all chunks)."""
+        selected: Optional[np.ndarray] = None
+        
+        def _narrow(positions: List[int]) -> np.ndarray:
+            array = np.asarray(positions, dtype=np.int64)
+            return array if selected is None else np.intersect1d(selected, array, assume_unique=True)
+        
+        if company_id is not None:
+            selected = _narrow(self._by_company.get(company_id, []))
+        if kind is not None:
+            selected = _narrow(self._by_kind.get(kind, []))
+        if doc_ids is not None:
+            positions = [p for doc_id in doc_ids for p in self._by_doc.get(doc_id, [])]
+            selected = _narrow(sorted(set(positions)))
+        return selected
+    
+    def _vector_ranking(self, query: str, k: int, candidates: Optional[np.ndarray]) -> List[Tuple[int, float]]:
+        """Top-k (position, cosine score) pairs among the candidates."""
+        query_vector = self.embedder.embed([query])[0]
+        if candidates is None:
+            scores = self.vectors @ query_vector
+            positions = np.arange(len(self.chunks))
+        else:
+            scores = self.vectors[candidates] @ query_vector
+            positions = candidates
+        
+        if scores.size > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(positions[i]), float(scores[i])) for i in top.tolist()]
+    
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        company_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        doc_ids: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Top-k chunks by cosine similarity to the query.
+        
+        Args:
+            query: Query text
+            k: Number of results
+            company_id: Only chunks related to this company
+            kind: Only chunks of this kind ("earnings_call" or "news")
+            doc_ids: Only chunks of these documents
+        
+        Returns:
+            List of chunk dicts (metadata + 'text') with a 'score', best first.
+        """
+        if not self.chunks or k <= 0:
+            return []
+        candidates = self._candidates(company_id, kind, doc_ids)
+        if candidates is not None and candidates.size == 0:
+            return []
+        return [
+            {**self.chunks[position], "score": score}
+            for position, score in self._vector_ranking(query, k, candidates)
+        ]
+    
+    def keyword_search(
+        self,
+        query: str,
+        k: int = 5,
+        company_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        doc_ids: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Top-k chunks by BM25 score. Arguments as in search().
+        
+        Returns:
+            List of chunk dicts with a 'score', best first (only chunks
+            sharing at least one token with the query).
+        """
+        if not self.chunks or k <= 0:
+            return []
+        candidates = self._candidates(company_id, kind, doc_ids)
+        if candidates is not None and candidates.size == 0:
+            return []
+        return [
+            {**self.chunks[position], "score": score}
+            for position, score in self.bm25.search(query, k, candidates)
+        ]
+    
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 5,
+        company_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        doc_ids: Optional[Iterable[str]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        rrf_k: int = 60,
+        depth: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Top-k chunks by reciprocal-rank fusion of BM25 and vector rankings.
+        
+        Args:
+            query: Query text
+            k: Number of results
+            company_id: Only chunks related to this company
+            kind: Only chunks of this kind ("earnings_call" or "news")
+            doc_ids: Only chunks of these documents
+            weights: {"bm25": w, "vector": w} (default DEFAULT_FUSION_WEIGHTS);
+                a weight of 0 turns that retriever off
+            rrf_k: RRF rank offset
+            depth: Candidates taken from each retriever before fusion
+                (default max(4 * k, 20))
+        
+        Returns:
+            List of chunk dicts with the fused 'score' and the per-retriever
+            'bm25_rank' / 'vector_rank' (None if not retrieved), best first.
+        """
+        if not self.chunks or k <= 0:
+            return []
+        candidates = self._candidates(company_id, kind, doc_ids)
+        if candidates is not None and candidates.size == 0:
+            return []
+        weights = {**DEFAULT_FUSION_WEIGHTS, **(weights or {})}
+        depth = depth or max(4 * k, 20)
+        
+        rankings: Dict[str, List[int]] = {}
+        if weights.get("bm25", 0) > 0:
+            rankings["bm25"] = [p for p, _ in self.bm25.search(query, depth, candidates)]
+        if weights.get("vector", 0) > 0:
+            rankings["vector"] = [p for p, _ in self._vector_ranking(query, depth, candidates)]
+        ranks = {name: {p: r for r, p in enumerate(ranking, start=1)} for name, ranking in rankings.items()}
+        
+        return [
+            {
+                **self.chunks[position],
+                "score": score,
+                "bm25_rank": ranks.get("bm25", {}).get(position),
+                "vector_rank": ranks.get("vector", {}).get(position),
+            }
+            for position, score in reciprocal_rank_fusion(rankings, weights, rrf_k)[:k]
+        ]
+    
+    def save(self, directory: Path) -> None:
+        """
+        Persist the index.
+        
+        An index loaded from (or last saved to) the same directory only
+        writes its new segments, then swaps in the new manifest, so saving
+        after an incremental add only writes the new data. Any other save
+        (a full rebuild), and a save that would leave more than
+        MAX_SEGMENTS segments, merges the index into one segment, writes
+        it to a temporary directory and swaps that in whole, like the data
+        snapshot: processes that have the old segments memory-mapped keep
+        reading their files, and no segment of the previous index is left
+        behind.
+        
+        Args:
+            directory: Index directory
+        """
+        directory = Path(directory).resolve()
+        if (
+            self._persisted_segments
+            and self._directory == directory
+            and len(self._segments) <= MAX_SEGMENTS
+        ):
+            self._write_segments(directory, self._persisted_segments)
+            self._write_manifest(directory)
+            # Segments no manifest lists (e.g. left by an interrupted save)
+            listed = {f"seg_{n:04d}" for n in range(len(self._segments))}
+            for path in directory.glob("seg_*.*"):
+                if path.name.split(".")[0] not in listed:
+                    path.unlink(missing_ok=True)
+        else:
+            if len(self._segments) > 1:
+                self._segments = [self.vectors]
+                self._bm25_segments = [self.bm25.to_arrays()]
+            elif self._segments and self._bm25_segments[0] is None:
+                self._bm25_segments = [self.bm25.to_arrays()]
+            directory.parent.mkdir(parents=True, exist_ok=True)
+            tmp_dir = Path(tempfile.mkdtemp(prefix=f".{directory.name}-", dir=directory.parent))
+            try:
+                self._write_segments(tmp_dir, 0)
+                self._write_manifest(tmp_dir)
+                if directory.exists():
+                    old_dir = directory.with_name(directory.name + ".old")
+                    shutil.rmtree(old_dir, ignore_errors=True)
+                    os.replace(directory, old_dir)
+                    os.replace(tmp_dir, directory)
+                    shutil.rmtree(old_dir, ignore_errors=True)
+                else:
+                    os.replace(tmp_dir, directory)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        self._persisted_segments = len(self._segments)
+        self._bm25_segments = [None] * len(self._segments)
+        self._directory = directory
+    
+    def _write_segments(self, directory: Path, first: int) -> None:
+        """Write segments first, first + 1, ... (vectors, chunk metadata, BM25 statistics)."""
+        chunk_offset = sum(len(s) for s in self._segments[:first])
+        for number in range(first, len(self._segments)):
+            vectors = self._segments[number]
+            np.save(directory / f"seg_{number:04d}.npy", vectors, allow_pickle=False)
+            with open(directory / f"seg_{number:04d}.jsonl", "w", encoding="utf-8") as f:
+                for chunk in self.chunks[chunk_offset:chunk_offset + len(vectors)]:
+                    f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+            np.savez(directory / f"seg_{number:04d}.bm25.npz", **self._bm25_segments[number])
+            chunk_offset += len(vectors)
+    
+    def _write_manifest(self, directory: Path) -> None:
+        """Replace the manifest atomically; it defines which segments are live."""
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "embedder": self.embedder.config(),
+            "max_chars": self.max_chars,
+            "overlap": self.overlap,
+            "source_fingerprint": self.source_fingerprint,
+            "segments": [f"seg_{n:04d}" for n in range(len(self._segments))],
+        }
+        tmp_path = directory / "manifest.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, directory / "manifest.json")
+    
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> Optional["VectorIndex"]:
+        """
+        Load a persisted index.
+        
+        Args:
+            directory: Index directory written by save()
+            mmap: Memory-map the vector segments
+        
+        Returns:
+            VectorIndex, or None if missing or written by another format version.
+        """
+        directory = Path(directory)
+        try:
+            with open(directory / "manifest.json", "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if manifest.get("format_version") != FORMAT_VERSION:
+            return None
+        embedder_config = manifest.get("embedder", {})
+        index = cls(
+            HashingEmbedder(embedder_config.get("dim", 1024), embedder_config.get("ngram_weight", 0.5)),
+            manifest.get("max_chars", 500),
+            manifest.get("overlap", 100),
+        )
+        index.source_fingerprint = manifest.get("source_fingerprint")
+        for name in manifest.get("segments", []):
+            index._segments.append(np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None))
+            with open(directory / f"{name}.jsonl", "r", encoding="utf-8") as f:
+                for line in f:
+                    index._register(json.loads(line))
+            with np.load(directory / f"{name}.bm25.npz") as bm25_arrays:
+                index.bm25.add_arrays(bm25_arrays)
+            index._bm25_segments.append(None)
+        index._persisted_segments = len(index._segments)
+        index._directory = directory.resolve()
+        return index
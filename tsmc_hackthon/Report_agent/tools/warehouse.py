@@ -0,0 +1,515 @@
+"""
+Local SQL Warehouse
+
+This module provides a SQLite stand-in for the BigQuery warehouse. The
+data/*.json files are loaded into proper tables, with indexes, in
+data/warehouse.sqlite; queries are parameterized and run on a
+thread-safe pool of read-only connections.
+
+Tables:
+    companies          (company_id PK, company_name, currency)
+    financials         (company_id PK, fiscal_year, fiscal_quarter, payload)
+    quarterly_metrics  (company_id, quarter, quarter_ordinal, metric, value, unit)
+                       clustered on (company_id, quarter, metric)
+    earnings_calls     (company_id, date, quarter, title, payload)
+    news               (news_id PK, date, title, source, sentiment, payload)
+    news_companies     (company_id, date, news_id), indexed on (company_id, date)
+
+`Warehouse` is the interface the tools use; SQLiteWarehouse implements it
+locally, and a BigQuery-backed class can implement it later without
+changing callers.
+
+Usage:
+    python -m tools.warehouse build
+    python -m tools.warehouse sql "SELECT metric, AVG(value) FROM quarterly_metrics GROUP BY metric"
+"""
+
+import abc
+import contextlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from tools.financial_store import format_quarter, parse_quarter
+from tools.hot_reload import ReloadableDataset, fingerprint_files
+
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = Path(__file__).parent.parent / "data"
+DB_PATH = _DATA_DIR / "warehouse.sqlite"
+SOURCES = [
+    _DATA_DIR / "financials.json",
+    _DATA_DIR / "financials_extended.json",
+    _DATA_DIR / "earnings_calls.json",
+    _DATA_DIR / "news.json",
+]
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE companies (
+    company_id TEXT PRIMARY KEY,
+    company_name TEXT,
+    currency TEXT
+);
+CREATE TABLE financials (
+    company_id TEXT PRIMARY KEY,
+    fiscal_year TEXT,
+    fiscal_quarter TEXT,
+    payload TEXT NOT NULL
+);
+CREATE TABLE quarterly_metrics (
+    company_id TEXT NOT NULL,
+    quarter TEXT NOT NULL,
+    quarter_ordinal INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    unit TEXT,
+    PRIMARY KEY (company_id, quarter, metric)
+) WITHOUT ROWID;
+CREATE INDEX idx_quarterly_metrics_metric_quarter ON quarterly_metrics (metric, quarter_ordinal);
+CREATE TABLE earnings_calls (
+    company_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    quarter TEXT,
+    title TEXT,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (company_id, date)
+) WITHOUT ROWID;
+CREATE TABLE news (
+    news_id TEXT PRIMARY KEY,
+    date TEXT,
+    title TEXT,
+    source TEXT,
+    sentiment TEXT,
+    payload TEXT NOT NULL
+);
+CREATE TABLE news_companies (
+    company_id TEXT NOT NULL,
+    date TEXT,
+    news_id TEXT NOT NULL REFERENCES news (news_id)
+);
+CREATE INDEX idx_news_companies_company_date ON news_companies (company_id, date);
+"""
+
+# Aggregates allowed in aggregate_metric (never interpolated from user input)
+_AGGREGATES = {"avg": "AVG", "sum": "SUM", "min": "MIN", "max": "MAX", "count": "COUNT"}
+_GROUPINGS = {"quarter": "quarter", "company": "company_id"}
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {} if path.name != "news.json" else []
+
+
+def build_database(db_path: Path = DB_PATH, sources: Sequence[Path] = SOURCES) -> Path:
+    """
+    Load the JSON data files into a fresh SQLite database.
+    
+    The database is written to a temporary file and moved into place, so
+    open connections keep reading the previous version.
+    
+    Args:
+        db_path: Output database file
+        sources: financials, financials_extended, earnings_calls and news JSON paths
+    
+    Returns:
+        The database path.
+    """
+    financials_path, extended_path, earnings_path, news_path = map(Path, sources)
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_name(db_path.name + f".tmp{os.getpid()}")
+    tmp_path.unlink(missing_ok=True)
+    
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(_SCHEMA)
+        financials = _read_json(financials_path)
+        extended = _read_json(extended_path)
+        
+        company_rows = {}
+        for company_id, record in {**financials, **extended}.items():
+            company_rows[company_id] = (company_id, record.get("company_name"), record.get("currency"))
+        conn.executemany("INSERT INTO companies VALUES (?, ?, ?)", company_rows.values())
+        conn.executemany(
+            "INSERT INTO financials VALUES (?, ?, ?, ?)",
+            (
+                (cid, r.get("fiscal_year"), r.get("fiscal_quarter"), json.dumps(r, ensure_ascii=False))
+                for cid, r in financials.items()
+            ),
+        )
+        
+        metric_rows = []
+        for company_id, record in extended.items():
+            for label, metrics in record.get("quarterly_data", {}).items():
+                try:
+                    ordinal = parse_quarter(label)
+                except (ValueError, IndexError):
+                    continue
+                for metric, entry in metrics.items():
+                    metric_rows.append(
+                        (company_id, format_quarter(ordinal), ordinal, metric, entry.get("value"), entry.get("unit"))
+                    )
+        conn.executemany("INSERT OR REPLACE INTO quarterly_metrics VALUES (?, ?, ?, ?, ?, ?)", metric_rows)
+        
+        conn.executemany(
+            "INSERT OR REPLACE INTO earnings_calls VALUES (?, ?, ?, ?, ?)",
+            (
+                (cid, call.get("date", ""), call.get("quarter"), call.get("title"), json.dumps(call, ensure_ascii=False))
+                for cid, calls in _read_json(earnings_path).items()
+                for call in calls
+            ),
+        )
+        
+        articles = _read_json(news_path)
+        conn.executemany(
+            "INSERT OR REPLACE INTO news VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (str(a.get("id")), a.get("date"), a.get("title"), a.get("source"), a.get("sentiment"),
+                 json.dumps(a, ensure_ascii=False))
+                for a in articles
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO news_companies VALUES (?, ?, ?)",
+            (
+                (company_id, a.get("date"), str(a.get("id")))
+                for a in articles
+                for company_id in dict.fromkeys(a.get("related_companies", []))
+            ),
+        )
+        
+        conn.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [("schema_version", str(SCHEMA_VERSION)), ("source_fingerprint", fingerprint_files(sources))],
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+def _database_fingerprint(db_path: Path) -> Optional[Dict[str, str]]:
+    """Read the meta table of an existing database (None if missing/unreadable)."""
+    if not Path(db_path).exists():
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of read-only SQLite connections, safe to share across threads.
+    
+    SQLite connections must not cross a fork: a forked child (e.g. a batch
+    worker) drops the connections it inherited and opens its own.
+    
+    A closed pool stops pooling: connections still borrowed are closed
+    when they are returned, and a late borrower (e.g. a thread still
+    holding the warehouse a reload replaced) gets a one-off connection.
+    
+    Args:
+        db_path: Database file
+        size: Number of connections
+        timeout: Seconds to wait for a free connection
+    """
+    
+    def __init__(self, db_path: Path, size: int = 4, timeout: float = 30.0):
+        self.db_path = Path(db_path)
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._pid = os.getpid()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False, timeout=self.timeout
+        )
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; it is returned to the pool on exit."""
+        if self._closed:
+            conn = self._connect()
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+        if self._pid != os.getpid():
+            # Inherited from the parent process; left open for the parent
+            self._idle = queue.Queue()
+            self._all = []
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                conn = self._connect() if len(self._all) < self.size else None
+                if conn is not None:
+                    self._all.append(conn)
+            if conn is None:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No free warehouse connection after {self.timeout}s")
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                closed = self._closed
+                if not closed:
+                    self._idle.put(conn)
+            if closed:
+                conn.close()
+    
+    def close(self) -> None:
+        """Close every idle connection; borrowed ones are closed when returned."""
+        with self._lock:
+            self._closed = True
+            if self._pid != os.getpid():
+                # Inherited from the parent process; left open for the parent
+                return
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._all.clear()
+
+
+class Warehouse(abc.ABC):
+    """
+    Query interface of the financial data warehouse.
+    
+    Implementations run the same named, parameterized queries against a
+    backend (SQLite locally, BigQuery in production).
+    """
+    
+    @abc.abstractmethod
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict]:
+        """Run a read-only parameterized query and return rows as dicts."""
+    
+    def close(self) -> None:
+        """Release the backend's connections (no-op by default)."""
+    
+    def get_financials(self, company_id: str) -> Optional[Dict]:
+        """Latest-quarter financial record of a company (as in financials.json)."""
+        rows = self.query("SELECT payload FROM financials WHERE company_id = ?", (company_id,))
+        return json.loads(rows[0]["payload"]) if rows else None
+    
+    def get_financials_many(self, company_ids: Sequence[str]) -> Dict[str, Optional[Dict]]:
+        """Latest-quarter financial records of several companies in one query."""
+        result: Dict[str, Optional[Dict]] = {cid: None for cid in company_ids}
+        if result:
+            rows = self.query(
+                f"SELECT company_id, payload FROM financials WHERE company_id IN ({', '.join('?' * len(result))})",
+                list(result),
+            )
+            for row in rows:
+                result[row["company_id"]] = json.loads(row["payload"])
+        return result
+    
+    def get_quarterly_metrics(
+        self,
+        company_id: str,
+        start_quarter: Optional[str] = None,
+        end_quarter: Optional[str] = None,
+        metrics: Optional[Sequence[str]] = None
+    ) -> List[Dict]:
+        """
+        Quarterly metric rows of a company within a quarter range.
+        
+        Args:
+            company_id: The company ID
+            start_quarter: First quarter, inclusive (e.g. "2024Q4")
+            end_quarter: Last quarter, inclusive
+            metrics: Only these metrics
+        
+        Returns:
+            Rows with 'quarter', 'metric', 'value' and 'unit', by quarter.
+        """
+        sql = "SELECT quarter, metric, value, unit FROM quarterly_metrics WHERE company_id = ?"
+        params: List[Any] = [company_id]
+        if start_quarter:
+            sql += " AND quarter >= ?"
+            params.append(format_quarter(parse_quarter(start_quarter)))
+        if end_quarter:
+            sql += " AND quarter <= ?"
+            params.append(format_quarter(parse_quarter(end_quarter)))
+        if metrics:
+            sql += f" AND metric IN ({', '.join('?' * len(metrics))})"
+            params.extend(metrics)
+        return self.query(sql + " ORDER BY quarter, metric", params)
+    
+    def aggregate_metric(
+        self,
+        metric: str,
+        agg: str = "avg",
+        group_by: str = "quarter",
+        start_quarter: Optional[str] = None,
+        end_quarter: Optional[str] = None,
+        company_ids: Optional[Sequence[str]] = None
+    ) -> List[Dict]:
+        """
+        Aggregate a metric across companies or quarters.
+        
+        Args:
+            metric: Metric name (e.g. "gross_margin")
+            agg: "avg", "sum", "min", "max" or "count"
+            group_by: "quarter" (one row per quarter) or "company"
+            start_quarter: First quarter, inclusive
+            end_quarter: Last quarter, inclusive
+            company_ids: Only these companies
+        
+        Returns:
+            Rows with the group key ('quarter' or 'company_id'), 'value' and 'n'.
+        """
+        if agg not in _AGGREGATES or group_by not in _GROUPINGS:
+            raise ValueError(f"Unsupported aggregate {agg!r} or grouping {group_by!r}")
+        key = _GROUPINGS[group_by]
+        sql = f"SELECT {key}, {_AGGREGATES[agg]}(value) AS value, COUNT(value) AS n FROM quarterly_metrics WHERE metric = ?"
+        params: List[Any] = [metric]
+        if start_quarter:
+            sql += " AND quarter_ordinal >= ?"
+            params.append(parse_quarter(start_quarter))
+        if end_quarter:
+            sql += " AND quarter_ordinal <= ?"
+            params.append(parse_quarter(end_quarter))
+        if company_ids:
+            sql += f" AND company_id IN ({', '.join('?' * len(company_ids))})"
+            params.extend(company_ids)
+        return self.query(sql + f" GROUP BY {key} ORDER BY {key}", params)
+    
+    def get_news(
+        self,
+        company_id: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = 5
+    ) -> List[Dict]:
+        """News articles mentioning a company, newest first, within a date range."""
+        sql = ("SELECT n.payload FROM news_companies nc JOIN news n ON n.news_id = nc.news_id "
+               "WHERE nc.company_id = ?")
+        params: List[Any] = [company_id]
+        if since:
+            sql += " AND nc.date >= ?"
+            params.append(str(since)[:10])
+        if until:
+            sql += " AND nc.date <= ?"
+            params.append(str(until)[:10])
+        sql += " ORDER BY nc.date DESC, nc.rowid ASC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(row["payload"]) for row in self.query(sql, params)]
+    
+    def get_earnings_calls(self, company_id: str, limit: Optional[int] = 2) -> List[Dict]:
+        """Earnings calls of a company, latest first."""
+        sql = "SELECT payload FROM earnings_calls WHERE company_id = ? ORDER BY date DESC"
+        params: List[Any] = [company_id]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(row["payload"]) for row in self.query(sql, params)]
+
+
+class SQLiteWarehouse(Warehouse):
+    """
+    Warehouse backed by a local SQLite file.
+    
+    Args:
+        db_path: Database file (built with build_database)
+        pool_size: Number of pooled connections
+    """
+    
+    def __init__(self, db_path: Path = DB_PATH, pool_size: int = 4):
+        self.db_path = Path(db_path)
+        self.pool = ConnectionPool(self.db_path, size=pool_size)
+    
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict]:
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, tuple(params))]
+    
+    def close(self) -> None:
+        self.pool.close()
+
+
+# Warehouses opened in this process, oldest first; after a reload every
+# one but the current snapshot is closed
+_opened: List[SQLiteWarehouse] = []
+
+
+def _open_warehouse() -> SQLiteWarehouse:
+    """Open the local warehouse, rebuilding the database if the JSON sources changed."""
+    meta = _database_fingerprint(DB_PATH)
+    fresh = (
+        meta is not None
+        and meta.get("schema_version") == str(SCHEMA_VERSION)
+        and meta.get("source_fingerprint") == fingerprint_files(SOURCES)
+    )
+    if not fresh:
+        logger.info(f"Building local warehouse at {DB_PATH}")
+        build_database(DB_PATH, SOURCES)
+    warehouse = SQLiteWarehouse(DB_PATH)
+    _opened.append(warehouse)
+    return warehouse
+
+
+def _close_replaced(current: SQLiteWarehouse) -> None:
+    """Reload listener: close the connection pools of replaced warehouses."""
+    while _opened and _opened[0] is not current:
+        _opened.pop(0).close()
+
+
+_warehouse_dataset = ReloadableDataset("warehouse", SOURCES, _open_warehouse)
+_warehouse_dataset.add_listener(_close_replaced)
+
+
+def get_warehouse() -> Warehouse:
+    """Return the current warehouse (rebuilt when data/*.json change)."""
+    return _warehouse_dataset.get()
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point: `build` or `sql <query>`."""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "build"
+    if command == "build":
+        build_database()
+        print(f"🗄️  Warehouse written to {DB_PATH}")
+    elif command == "sql" and len(argv) > 1:
+        for row in get_warehouse().query(argv[1], argv[2:]):
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        print("Usage: python -m tools.warehouse [build | sql <query> [params ...]]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
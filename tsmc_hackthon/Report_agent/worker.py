@@ -0,0 +1,193 @@
+"""
+Job Queue Worker
+
+Runs report jobs from the job queue (tools/job_queue.py) until it is
+stopped, or until the queue has nothing left to claim. Start as many
+workers as there are CPU cores, on one host or on several hosts sharing
+the queue file; each claims one job at a time, so no two workers
+generate the same report.
+
+While a report runs, a heartbeat thread extends the job's lease. A
+worker that is killed stops heartbeating, and its job is claimed again
+once the lease expires. Reports are written to a temporary file, the
+job is completed under its lease, and only then is the file renamed into
+place: a report file is never half-written, and a report whose lease was
+lost meanwhile is discarded without touching the file of the worker that
+took over. Queries whose company cannot be resolved fail at once instead
+of being retried.
+
+Usage:
+    python -m tools.job_queue enqueue
+    python worker.py                          # run jobs until stopped
+    python worker.py --exit-when-idle --out reports/queue
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from main import run_analysis
+from tools.hot_reload import start_watcher
+from tools.job_queue import JobQueue, worker_name
+
+
+# Reports starting with these did not analyse the company
+FAILED_REPORT_PREFIXES = ("Error", "# 無法確定")
+# Failures that every retry would repeat (the query names no known company)
+PERMANENT_FAILURE_PREFIXES = ("# 無法確定",)
+
+
+def report_path(out_dir: Path, job: Dict) -> Path:
+    """Where a job's report is written."""
+    return out_dir / f"{job['job_id']:05d}_{job['company_id']}.md"
+
+
+def publish_report(queue: JobQueue, job: Dict, path: Path, report: str) -> bool:
+    """
+    Complete a job under its lease and write its report.
+    
+    The report goes to a temporary file first and is renamed into place
+    only once the job is completed, so a worker that lost its lease
+    never replaces the report of the worker that took over.
+    
+    Returns:
+        True if the job was completed and the report written; False if
+        the lease was lost (the temporary file is removed).
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(report, encoding="utf-8")
+    if not queue.complete(job["job_id"], job["lease_token"], str(path)):
+        tmp.unlink(missing_ok=True)
+        return False
+    os.replace(tmp, path)
+    return True
+
+
+class Heartbeat(threading.Thread):
+    """
+    Extends a job's lease in the background while its report runs.
+    
+    Args:
+        queue: The job queue
+        job: Claimed job (with 'lease_token')
+        interval: Seconds between heartbeats
+    """
+    
+    def __init__(self, queue: JobQueue, job: Dict, interval: float):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job = job
+        self.interval = interval
+        self.lost = False
+        self._stopped = threading.Event()
+    
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if not self.queue.heartbeat(self.job["job_id"], self.job["lease_token"]):
+                self.lost = True
+                return
+    
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def run_job(queue: JobQueue, job: Dict, out_dir: Path) -> str:
+    """
+    Generate one job's report and record the outcome.
+    
+    Args:
+        queue: The job queue
+        job: Claimed job
+        out_dir: Directory the report is written to
+    
+    Returns:
+        The job's status afterwards ("done", "queued", "failed"), or
+        "lost" if the lease was lost before the report finished.
+    """
+    heartbeat = Heartbeat(queue, job, queue.lease_seconds / 4)
+    heartbeat.start()
+    try:
+        report = run_analysis(job["query"])
+        error = report.splitlines()[0] if report.startswith(FAILED_REPORT_PREFIXES) else None
+    except Exception as e:
+        report, error = None, f"{type(e).__name__}: {e}"
+    finally:
+        heartbeat.stop()
+    
+    if heartbeat.lost:
+        return "lost"
+    if error:
+        retry = not error.startswith(PERMANENT_FAILURE_PREFIXES)
+        return queue.fail(job["job_id"], job["lease_token"], error, retry=retry) or "lost"
+    return "done" if publish_report(queue, job, report_path(out_dir, job), report) else "lost"
+
+
+def run_worker(
+    queue: JobQueue,
+    out_dir: Path,
+    poll: float = 5.0,
+    exit_when_idle: bool = False,
+    max_jobs: Optional[int] = None,
+) -> int:
+    """
+    Claim and run jobs.
+    
+    Args:
+        queue: The job queue
+        out_dir: Directory reports are written to
+        poll: Seconds to wait when no job is available
+        exit_when_idle: Return when no job is available instead of waiting
+        max_jobs: Return after this many jobs (None: no limit)
+    
+    Returns:
+        Number of jobs run.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = worker_name()
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = queue.claim(name)
+        if job is None:
+            if exit_when_idle:
+                break
+            time.sleep(poll)
+            continue
+        
+        print(f"▶️  [{name}] #{job['job_id']} {job['company_id']} (attempt {job['attempts']}/{job['max_attempts']})", flush=True)
+        status = run_job(queue, job, out_dir)
+        count += 1
+        if status == "lost":
+            print(f"⚠️  [{name}] #{job['job_id']} lease lost; result discarded", flush=True)
+        else:
+            print(f"{'✅' if status == 'done' else '❌'} [{name}] #{job['job_id']} {status}", flush=True)
+    return count
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Run report jobs from the job queue.")
+    parser.add_argument("--out", type=Path, default=Path("reports") / "queue", help="Output directory")
+    parser.add_argument("--poll", type=float, default=5.0, help="Seconds between polls of an empty queue")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Exit when no job is available")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs")
+    args = parser.parse_args(argv)
+    
+    # Long-running workers pick up data files that change between jobs
+    start_watcher()
+    queue = JobQueue()
+    try:
+        count = run_worker(queue, args.out, args.poll, args.exit_when_idle, args.max_jobs)
+    except KeyboardInterrupt:
+        # The current job's lease expires and another worker retries it
+        print("\n⏹️  Stopped", file=sys.stderr)
+        sys.exit(130)
+    print(f"🏁 {count} jobs run")
+
+
+if __name__ == "__main__":
+    main()